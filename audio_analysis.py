@@ -0,0 +1,166 @@
+import json
+import shutil
+import subprocess
+
+import librosa
+import numpy as np
+
+STREAM_SAMPLE_RATE = 11025
+STREAM_N_FFT = 1024
+STREAM_HOP_LENGTH = 256
+STREAM_N_MELS = 64
+STREAM_BLOCK_SECONDS = 10
+STREAM_MAX_LAG = 384
+
+
+def probe_duration(file_path):
+    # Reads the duration from the container header instead of decoding audio.
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe:
+        try:
+            output = subprocess.run(
+                [ffprobe, '-v', 'error', '-show_entries', 'format=duration', '-of', 'json', file_path],
+                capture_output=True, check=True, timeout=10
+            ).stdout
+            duration = json.loads(output).get('format', {}).get('duration')
+            if duration is not None:
+                return float(duration)
+        except (subprocess.SubprocessError, ValueError, OSError):
+            pass
+    try:
+        return float(librosa.get_duration(path=file_path))
+    except Exception:
+        return None
+
+
+def decode_blocks(file_path, sr=STREAM_SAMPLE_RATE, block_seconds=STREAM_BLOCK_SECONDS):
+    # Yields mono float32 blocks decoded and resampled by ffmpeg, so the full
+    # track is never held in memory at its original rate.
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        yield from _decode_blocks_soundfile(file_path, sr, block_seconds)
+        return
+    process = subprocess.Popen(
+        [ffmpeg, '-v', 'error', '-i', file_path, '-f', 'f32le', '-ac', '1', '-ar', str(sr), '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    block_bytes = int(sr * block_seconds) * 4
+    try:
+        pending = b''
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            data = pending + data
+            usable = len(data) - len(data) % 4
+            pending = data[usable:]
+            if usable:
+                yield np.frombuffer(data[:usable], dtype=np.float32)
+    finally:
+        process.stdout.close()
+        process.wait()
+    if process.returncode not in (0, None):
+        raise RuntimeError(f"ffmpeg exited with status {process.returncode} while decoding {file_path}")
+
+
+def _decode_blocks_soundfile(file_path, sr, block_seconds):
+    native_sr = librosa.get_samplerate(file_path)
+    frame_length = 4096
+    block_length = max(1, int(native_sr * block_seconds) // frame_length)
+    for block in librosa.stream(file_path, block_length=block_length, frame_length=frame_length,
+                                hop_length=frame_length, mono=True):
+        yield librosa.resample(block, orig_sr=native_sr, target_sr=sr).astype(np.float32)
+
+
+class OnsetEnvelope:
+    # Incremental spectral-flux onset envelope over log-mel frames. Samples
+    # that do not yet fill a whole frame and the previous mel frame are carried
+    # between blocks, so the result does not depend on block boundaries.
+    def __init__(self, sr=STREAM_SAMPLE_RATE, n_fft=STREAM_N_FFT, hop_length=STREAM_HOP_LENGTH, n_mels=STREAM_N_MELS):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels)
+        self.window = np.hanning(n_fft).astype(np.float32)
+        self.carry = np.zeros(0, dtype=np.float32)
+        self.previous = None
+        self.values = []
+        self.samples = 0
+        # Running autocorrelation of the envelope for global tempo estimation,
+        # so the full tempogram never has to be materialised.
+        self.max_lag = STREAM_MAX_LAG
+        self.acf = np.zeros(self.max_lag, dtype=np.float64)
+        self.tail = np.zeros(0, dtype=np.float64)
+
+    def push(self, block):
+        self.samples += len(block)
+        buffer = np.concatenate([self.carry, block])
+        if len(buffer) < self.n_fft:
+            self.carry = buffer
+            return
+        n_frames = 1 + (len(buffer) - self.n_fft) // self.hop_length
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, self.n_fft)[::self.hop_length][:n_frames]
+        spectrum = np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2
+        mel = librosa.power_to_db(self.mel_basis @ spectrum.T, ref=1.0)
+        if self.previous is not None:
+            mel = np.concatenate([self.previous, mel], axis=1)
+            flux = np.maximum(0.0, np.diff(mel, axis=1)).mean(axis=0)
+        else:
+            flux = np.concatenate([[0.0], np.maximum(0.0, np.diff(mel, axis=1)).mean(axis=0)])
+        self.values.append(flux.astype(np.float32))
+        self.previous = mel[:, -1:]
+        self.carry = buffer[n_frames * self.hop_length:]
+        self._accumulate_acf(flux.astype(np.float64))
+
+    def _accumulate_acf(self, values):
+        combined = np.concatenate([self.tail, values])
+        start = len(self.tail)
+        for lag in range(self.max_lag):
+            first = max(start, lag)
+            if first >= len(combined):
+                break
+            self.acf[lag] += np.dot(combined[first:], combined[first - lag:len(combined) - lag])
+        self.tail = combined[-self.max_lag:]
+
+    def tempo(self, start_bpm=120.0, std_bpm=1.0, max_tempo=320.0):
+        if self.acf[0] <= 0:
+            return start_bpm
+        acf = self.acf / self.acf[0]
+        bpms = librosa.tempo_frequencies(self.max_lag, sr=self.sr, hop_length=self.hop_length)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logprior = -0.5 * ((np.log2(bpms) - np.log2(start_bpm)) / std_bpm) ** 2
+        score = np.log1p(1e6 * np.maximum(acf, 0.0)) + logprior
+        score[~np.isfinite(score) | (bpms >= max_tempo)] = -np.inf
+        return float(bpms[int(np.argmax(score))])
+
+    def envelope(self):
+        if not self.values:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(self.values)
+
+
+def analyze_streaming(file_path, sr=STREAM_SAMPLE_RATE, hop_length=STREAM_HOP_LENGTH):
+    onsets = OnsetEnvelope(sr=sr, hop_length=hop_length)
+    for block in decode_blocks(file_path, sr=sr):
+        onsets.push(block)
+    envelope = onsets.envelope()
+    # Passing the tempo in skips librosa's tempogram, which is the largest
+    # allocation of the whole analysis on long tracks.
+    tempo, beat_frames = librosa.beat.beat_track(onset_envelope=envelope, sr=sr, hop_length=hop_length,
+                                                 bpm=onsets.tempo())
+    # Frames are not centred, so each one describes the audio half a window later.
+    offset = onsets.n_fft / (2.0 * sr)
+    beat_times = librosa.frames_to_time(beat_frames, sr=sr, hop_length=hop_length) + offset
+    onset_times = librosa.onset.onset_detect(onset_envelope=envelope, sr=sr, hop_length=hop_length, units='time') + offset
+    duration = probe_duration(file_path)
+    if duration is None:
+        duration = onsets.samples / float(sr)
+    return {
+        'bpm': float(np.atleast_1d(tempo)[0]),
+        'duration': float(duration),
+        'beat_frames': [int(frame) for frame in beat_frames],
+        'beat_times': [round(float(t), 4) for t in beat_times],
+        'onset_times': [round(float(t), 4) for t in onset_times],
+        'sr': sr,
+        'hop_length': hop_length
+    }
@@ -0,0 +1,233 @@
+import argparse
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSET_REFERENCE = re.compile(r'(?:src|href)="(static/[^"]+)"')
+SEEK_BYTES = 64 * 1024
+
+
+def start_server(port, source):
+    env = dict(os.environ, GESTURE_PORT=str(port), GESTURE_OPEN_BROWSER='0', GESTURE_FRAME_SOURCE=source)
+    server = subprocess.Popen([sys.executable, 'main.py'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Server exited with {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection('localhost', port, timeout=2)
+            conn.request('GET', '/ready')
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("Server did not become ready in time")
+
+
+def stop_server(server):
+    server.terminate()
+    server.wait(timeout=30)
+
+
+def request(port, method, path, headers=None, body=None):
+    conn = http.client.HTTPConnection('localhost', port, timeout=120)
+    try:
+        # Song names have spaces; quote them as a browser would.
+        conn.request(method, quote(path, safe='/?=&%'), body=body, headers=headers or {})
+        response = conn.getresponse()
+        data = response.read()
+        headers = {name.lower(): value for name, value in response.getheaders()}
+        # Status line plus "Name: value\r\n" per header.
+        header_bytes = 17 + sum(len(name) + len(value) + 4 for name, value in response.getheaders())
+        return response.status, headers, data, header_bytes
+    finally:
+        conn.close()
+
+
+class BrowserCache:
+    # Just enough of a browser's HTTP cache to count what a repeated visit
+    # costs: fresh entries (max-age) are served without a request, stale
+    # ones are revalidated with If-None-Match, and a seek inside a cached file
+    # is served from it. With enabled=False nothing is stored, the baseline
+    # of every play downloading everything again.
+    def __init__(self, port, enabled=True):
+        self.port = port
+        self.enabled = enabled
+        self.entries = {}
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.hits = 0
+        self.body_bytes = 0
+        self.header_bytes = 0
+
+    def get(self, path, headers=None):
+        headers = dict(headers or {}, **{'Accept-Encoding': 'gzip, br'})
+        entry = self.entries.get(path) if self.enabled else None
+        if entry and entry['expires'] > time.time():
+            self.hits += 1
+            return 200, entry['body']
+        if entry and entry['etag'] and 'Range' not in headers:
+            headers['If-None-Match'] = entry['etag']
+        status, response_headers, body, header_bytes = request(self.port, 'GET', path, headers)
+        self.requests += 1
+        self.body_bytes += len(body)
+        self.header_bytes += header_bytes
+        if status == 304:
+            self.not_modified += 1
+            entry['expires'] = self._expires(response_headers)
+            return 200, entry['body']
+        if status == 200 and self.enabled:
+            self.entries[path] = {'etag': response_headers.get('etag'), 'body': body,
+                                  'expires': self._expires(response_headers)}
+        return status, body
+
+    def post(self, path, payload):
+        status, _, body, header_bytes = request(self.port, 'POST', path, {'Content-Type': 'application/json'},
+                                                json.dumps(payload))
+        self.requests += 1
+        self.body_bytes += len(body)
+        self.header_bytes += header_bytes
+        return status, body
+
+    def _expires(self, headers):
+        match = re.search(r'max-age=(\d+)', headers.get('cache-control', ''))
+        if match is None or 'no-cache' in headers.get('cache-control', ''):
+            return 0
+        return time.time() + int(match.group(1))
+
+
+def play(browser, song_name):
+    # One visit: load the page and what it references, select the song,
+    # fetch everything the game screen uses, then seek once in the audio.
+    status, page = browser.get('/')
+    if status != 200:
+        raise SystemExit(f"GET / returned {status}")
+    for path in ASSET_REFERENCE.findall(page.decode('utf-8')):
+        browser.get('/' + path)
+    status, body = browser.post('/select_song', {'video_id': 'asset-benchmark', 'song_name': song_name})
+    job = json.loads(body)
+    if status != 202:
+        raise SystemExit(f"/select_song returned {status}: {job}")
+    deadline = time.monotonic() + 600
+    while job['status'] not in ('done', 'error'):
+        if time.monotonic() > deadline:
+            raise SystemExit("Song job did not finish in time")
+        time.sleep(0.2)
+        # Polling is left out of the counts; it depends on timing, not caching.
+        job = json.loads(request(browser.port, 'GET', f"/song_job/{job['job_id']}")[2])
+    if job['status'] == 'error':
+        raise SystemExit(f"Song job failed: {job['error']}")
+    song = job['result']
+    assets = song.get('assets') or {}
+    for url in [assets.get('peaks'), assets.get('beats')]:
+        if url:
+            browser.get(url)
+    audio_url = song['file']
+    _, audio = browser.get(audio_url)
+    middle = len(audio) // 2
+    browser.get(audio_url, {'Range': f'bytes={middle}-{middle + SEEK_BYTES - 1}'})
+    return song['file']
+
+
+def verify_ranges(port, path, local_path):
+    # Byte-range behaviour the audio element and seeking rely on.
+    with open(local_path, 'rb') as f:
+        data = f.read()
+    size = len(data)
+    middle = size // 2
+    checks = []
+
+    status, headers, body, _ = request(port, 'GET', path)
+    etag = headers.get('etag', '')
+    checks.append(('full GET is 200 with a strong ETag', status == 200 and body == data and
+                   bool(etag) and not etag.startswith('W/')))
+    checks.append(('Accept-Ranges: bytes', headers.get('accept-ranges') == 'bytes'))
+
+    status, headers, body, _ = request(port, 'GET', path, {'Range': f'bytes={middle}-{middle + 999}'})
+    checks.append(('bounded range is 206 with the right bytes',
+                   status == 206 and body == data[middle:middle + 1000] and
+                   headers.get('content-range') == f'bytes {middle}-{middle + 999}/{size}'))
+
+    status, headers, body, _ = request(port, 'GET', path, {'Range': 'bytes=-500'})
+    checks.append(('suffix range returns the last bytes', status == 206 and body == data[-500:]))
+
+    status, headers, body, _ = request(port, 'GET', path, {'Range': f'bytes={middle}-'})
+    checks.append(('open-ended range runs to the end', status == 206 and body == data[middle:]))
+
+    status, headers, _, _ = request(port, 'GET', path, {'Range': f'bytes={size}-'})
+    checks.append(('range past the end is 416', status == 416 and headers.get('content-range') == f'bytes */{size}'))
+
+    status, _, body, _ = request(port, 'GET', path, {'If-None-Match': etag})
+    checks.append(('matching If-None-Match is 304 with no body', status == 304 and body == b''))
+
+    status, _, body, _ = request(port, 'GET', path, {'Range': 'bytes=0-99', 'If-Range': etag})
+    checks.append(('If-Range with the current ETag honours the range', status == 206 and body == data[:100]))
+
+    status, _, body, _ = request(port, 'GET', path, {'Range': 'bytes=0-99', 'If-Range': '"stale"'})
+    checks.append(('If-Range with a stale ETag sends the whole file', status == 200 and body == data))
+    return checks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare bytes transferred across repeated plays of one song.')
+    parser.add_argument('--song', default='Canon in D - Pachelbel', help='a song already in static/songs')
+    parser.add_argument('--plays', type=int, default=5)
+    parser.add_argument('--restart', action='store_true', help='restart the server before every play')
+    parser.add_argument('--port', type=int, default=8767)
+    parser.add_argument('--source', default='synthetic', help='frame source for the server under test')
+    args = parser.parse_args()
+
+    local_path = os.path.join(ROOT, 'static', 'songs', f'{args.song}.mp3')
+    if not os.path.exists(local_path):
+        raise SystemExit(f"Song not found: {local_path}")
+
+    server = start_server(args.port, args.source)
+    totals = {}
+    failed = False
+    try:
+        for label, enabled in (('no cache', False), ('browser cache', True)):
+            browser = BrowserCache(args.port, enabled=enabled)
+            print(f"== {label} ==")
+            print(f"{'play':>4} {'requests':>9} {'304':>5} {'cached':>7} {'body KB':>9} {'header KB':>10}")
+            totals[label] = 0
+            for number in range(1, args.plays + 1):
+                if args.restart and number > 1:
+                    stop_server(server)
+                    server = start_server(args.port, args.source)
+                browser.reset()
+                song_url = play(browser, args.song)
+                totals[label] += browser.body_bytes + browser.header_bytes
+                print(f"{number:>4} {browser.requests:>9} {browser.not_modified:>5} {browser.hits:>7} "
+                      f"{browser.body_bytes / 1024:>9.1f} {browser.header_bytes / 1024:>10.1f}")
+
+        print()
+        print("range checks on", song_url)
+        for name, ok in verify_ranges(args.port, song_url, local_path):
+            print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+            failed = failed or not ok
+    finally:
+        stop_server(server)
+
+    print()
+    for label, total in totals.items():
+        print(f"{label}: {total / 1024:.1f} KB over {args.plays} plays")
+    if totals.get('no cache'):
+        saved = 1 - totals['browser cache'] / totals['no cache']
+        print(f"browser cache saves {saved * 100:.1f}% of the bytes")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_SONG = os.path.join(ROOT, 'static', 'songs', 'Canon in D - Pachelbel.mp3')
+
+
+def run_full(file_path):
+    import librosa
+    y, sr = librosa.load(file_path)
+    tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr)
+    duration = librosa.get_duration(y=y, sr=sr)
+    beat_times = librosa.frames_to_time(beat_frames, sr=sr)
+    return float(tempo[0] if hasattr(tempo, '__len__') else tempo), float(duration), len(beat_times)
+
+
+def run_streaming(file_path):
+    from audio_analysis import analyze_streaming
+    result = analyze_streaming(file_path)
+    return result['bpm'], result['duration'], len(result['beat_times'])
+
+
+def measure(mode, file_path):
+    # Imports and one warm-up run happen before measuring so numba compilation
+    # and module loading are not counted against either path.
+    runner = run_full if mode == 'full' else run_streaming
+    runner(file_path)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    bpm, duration, beats = runner(file_path)
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'mode': mode,
+        'wall_seconds': round(wall, 3),
+        'peak_alloc_mb': round(peak / (1024 * 1024), 1),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'rss_growth_mb': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024, 1),
+        'bpm': round(bpm, 2),
+        'duration': round(duration, 2),
+        'beats': beats
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare full-decode and streaming song analysis.')
+    parser.add_argument('file', nargs='?', default=DEFAULT_SONG)
+    parser.add_argument('--mode', choices=['full', 'streaming'])
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.file)))
+        return
+
+    # Each mode runs in its own process so peak RSS is not shared.
+    results = []
+    for mode in ('full', 'streaming'):
+        output = subprocess.run([sys.executable, __file__, args.file, '--mode', mode],
+                                capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'mode':<10} {'wall s':>8} {'peak alloc MB':>14} {'max RSS MB':>11} {'bpm':>8} {'duration':>9} {'beats':>6}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['wall_seconds']:>8} {r['peak_alloc_mb']:>14} {r['max_rss_mb']:>11} "
+              f"{r['bpm']:>8} {r['duration']:>9} {r['beats']:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gestures import FINGER_MCPS, FINGER_TIPS, GESTURE_LABELS, GestureTracker, classify_landmarks, landmarks_to_array
+
+DEFAULT_HISTORY = os.path.join(ROOT, 'benchmarks', 'history.json')
+WEBCAM_WIDTH = 640
+WEBCAM_HEIGHT = 480
+REGRESSION_RATIO = 0.9
+
+# Fingers extended (index, middle, ring, pinky) for each gesture.
+SYNTHETIC_FINGERS = {
+    'fist': (0, 0, 0, 0),
+    'index': (1, 0, 0, 0),
+    'peace': (1, 1, 0, 0),
+    'open_hand': (1, 1, 1, 1)
+}
+
+
+class StageTimer:
+    # Wall time and process CPU time per stage. Process CPU includes
+    # MediaPipe's own worker threads, which thread_time() would miss.
+    def __init__(self):
+        self.wall = Counter()
+        self.cpu = Counter()
+        self.current = None
+
+    def start(self, stage):
+        now_wall, now_cpu = time.perf_counter(), time.process_time()
+        if self.current is not None:
+            name, wall, cpu = self.current
+            self.wall[name] += now_wall - wall
+            self.cpu[name] += now_cpu - cpu
+        self.current = (stage, now_wall, now_cpu) if stage else None
+
+    def stop(self):
+        self.start(None)
+
+    def summary(self, frames):
+        return {stage: {'wall_ms_per_frame': round(1000 * self.wall[stage] / max(frames, 1), 3),
+                        'cpu_ms_per_frame': round(1000 * self.cpu[stage] / max(frames, 1), 3)}
+                for stage in self.wall}
+
+
+def synthetic_landmarks(frames, seed=0, hold=15, missing=0.05):
+    # Hands holding each gesture for about `hold` frames with jitter, plus
+    # some frames without a hand (NaN rows, labelled "none").
+    rng = np.random.default_rng(seed)
+    names = list(SYNTHETIC_FINGERS)
+    landmarks = np.empty((frames, 21, 3), dtype=np.float32)
+    labels = []
+    gesture = names[0]
+    for idx in range(frames):
+        if idx % hold == 0:
+            gesture = names[rng.integers(len(names))]
+        if rng.random() < missing:
+            landmarks[idx] = np.nan
+            labels.append('none')
+            continue
+        hand = rng.normal(0.0, 0.01, (21, 3)).astype(np.float32)
+        hand[:, 0] += 0.5 + rng.normal(0.0, 0.02)
+        hand[:, 1] += 0.6
+        hand[FINGER_MCPS, 1] = 0.55 + rng.normal(0.0, 0.005, 4)
+        for finger, extended in enumerate(SYNTHETIC_FINGERS[gesture]):
+            hand[FINGER_TIPS[finger], 1] = hand[FINGER_MCPS[finger], 1] + (-0.12 if extended else 0.06)
+        landmarks[idx] = hand
+        labels.append(gesture)
+    return landmarks, labels
+
+
+def load_labels(path, frames):
+    # Either a per-frame list of gesture names or a list of segments
+    # {"start": first frame, "end": last frame + 1, "gesture": name}.
+    with open(path, 'r') as f:
+        data = json.load(f)
+    data = data.get('labels', data) if isinstance(data, dict) else data
+    if data and isinstance(data[0], dict):
+        labels = ['none'] * frames
+        for segment in data:
+            for idx in range(segment['start'], min(segment['end'], frames)):
+                labels[idx] = segment['gesture']
+        return labels
+    return list(data)[:frames]
+
+
+def emit_payload(gesture, state, seq, captured_at):
+    # What socketio.emit serialises for every gesture event.
+    return json.dumps({
+        'player': 1,
+        'gesture': gesture,
+        'confidence': round(state.confidence, 3),
+        'started_at': state.started_at,
+        'seq': seq,
+        'captured_at': captured_at,
+        'sent_at': time.monotonic(),
+        'heartbeat': not state.changed
+    })
+
+
+def replay_landmarks(landmarks, fps):
+    timer = StageTimer()
+    tracker = GestureTracker()
+    raw, tracked = [], []
+    started = time.perf_counter()
+    for idx, hand in enumerate(landmarks):
+        timer.start('detect_gesture')
+        gesture = str(classify_landmarks(hand))
+        timer.start('track')
+        state = tracker.update(gesture, idx / fps)
+        timer.start('emit')
+        emit_payload(state.gesture, state, idx, idx / fps)
+        timer.stop()
+        raw.append(gesture)
+        tracked.append(state.gesture)
+    return raw, tracked, timer, time.perf_counter() - started, None
+
+
+def replay_video(spec, max_frames, record_path=None):
+    import cv2
+    import mediapipe as mp
+    from frame_sources import open_frame_source
+
+    source = open_frame_source(spec, realtime=False)
+    if not source.isOpened():
+        raise SystemExit(f"Could not open {spec}")
+    hands = mp.solutions.hands.Hands(max_num_hands=1, min_detection_confidence=0.7, min_tracking_confidence=0.5)
+    timer = StageTimer()
+    tracker = GestureTracker()
+    raw, tracked, recorded = [], [], []
+    fps = getattr(source, 'fps', 30.0) or 30.0
+    started = time.perf_counter()
+    idx = 0
+    while max_frames is None or idx < max_frames:
+        timer.start('read')
+        ok, frame = source.read()
+        if not ok:
+            timer.stop()
+            break
+        timer.start('resize_flip')
+        frame = cv2.flip(cv2.resize(frame, (WEBCAM_WIDTH, WEBCAM_HEIGHT)), 1)
+        timer.start('cvt_color')
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        timer.start('hands_process')
+        results = hands.process(rgb_frame)
+        timer.start('detect_gesture')
+        gesture = "none"
+        hand_array = np.full((21, 3), np.nan, dtype=np.float32)
+        if results.multi_hand_landmarks:
+            hand_array = landmarks_to_array(results.multi_hand_landmarks[-1])
+            gesture = str(classify_landmarks(hand_array))
+        timer.start('track')
+        state = tracker.update(gesture, idx / fps)
+        timer.start('emit')
+        emit_payload(state.gesture, state, idx, idx / fps)
+        timer.stop()
+        raw.append(gesture)
+        tracked.append(state.gesture)
+        recorded.append(hand_array)
+        idx += 1
+    elapsed = time.perf_counter() - started
+    source.release()
+    hands.close()
+    if record_path and recorded:
+        np.savez_compressed(record_path, landmarks=np.stack(recorded), fps=fps)
+        print(f"Recorded {len(recorded)} landmark frames to {record_path}")
+    return raw, tracked, timer, elapsed, fps
+
+
+def accuracy(predicted, labels):
+    if not labels:
+        return None
+    pairs = list(zip(predicted, labels))
+    correct = sum(1 for p, label in pairs if p == label)
+    per_gesture = {}
+    for gesture in GESTURE_LABELS:
+        relevant = [(p, label) for p, label in pairs if label == gesture]
+        if relevant:
+            per_gesture[gesture] = round(sum(1 for p, label in relevant if p == label) / len(relevant), 4)
+    return {'overall': round(correct / len(pairs), 4), 'per_gesture': per_gesture, 'frames': len(pairs)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"Could not read {path}, starting a new history")
+        return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded fixtures through the gesture pipeline.')
+    parser.add_argument('fixture', nargs='?', default='synthetic-landmarks',
+                        help='a frame source spec (video:clip.mp4, images:frames/*.png), a landmark .npz, '
+                             'or synthetic-landmarks')
+    parser.add_argument('--labels', help='JSON gesture labels for the fixture (per frame or segments)')
+    parser.add_argument('--frames', type=int, default=None, help='stop after this many frames')
+    parser.add_argument('--record-landmarks', help='save landmarks from a video run to this .npz')
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    parser.add_argument('--no-history', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    labels = None
+    if args.fixture == 'synthetic-landmarks':
+        landmarks, labels = synthetic_landmarks(args.frames or 3000, seed=args.seed)
+        raw, tracked, timer, elapsed, fps = replay_landmarks(landmarks, 30.0)
+        kind = 'landmarks'
+    elif args.fixture.endswith('.npz'):
+        data = np.load(args.fixture)
+        landmarks = data['landmarks'][:args.frames]
+        fixture_fps = float(data['fps']) if 'fps' in data else 30.0
+        if 'labels' in data:
+            labels = [str(label) for label in data['labels'][:len(landmarks)]]
+        raw, tracked, timer, elapsed, fps = replay_landmarks(landmarks, fixture_fps)
+        kind = 'landmarks'
+    else:
+        raw, tracked, timer, elapsed, fps = replay_video(args.fixture, args.frames, args.record_landmarks)
+        kind = 'video'
+    if args.labels:
+        labels = load_labels(args.labels, len(raw))
+
+    frames = len(raw)
+    result = {
+        'timestamp': time.time(),
+        'revision': git_revision(),
+        'fixture': args.fixture,
+        'kind': kind,
+        'frames': frames,
+        'fps': round(frames / elapsed, 2) if elapsed else 0.0,
+        'stages': timer.summary(frames),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'accuracy_raw': accuracy(raw, labels),
+        'accuracy_tracked': accuracy(tracked, labels),
+        'gesture_counts': dict(Counter(tracked))
+    }
+
+    print(f"{args.fixture}: {frames} frames, {result['fps']} fps, peak RSS {result['peak_rss_mb']} MB")
+    print(f"{'stage':<16} {'wall ms/frame':>14} {'cpu ms/frame':>13}")
+    for stage, timing in result['stages'].items():
+        print(f"{stage:<16} {timing['wall_ms_per_frame']:>14} {timing['cpu_ms_per_frame']:>13}")
+    if labels:
+        print(f"accuracy: raw {result['accuracy_raw']['overall']:.2%}, tracked {result['accuracy_tracked']['overall']:.2%}")
+
+    if args.no_history:
+        return
+    history = load_history(args.history)
+    previous = next((run for run in reversed(history) if run['fixture'] == args.fixture and run['frames'] == frames),
+                    None)
+    if previous:
+        change = result['fps'] / previous['fps'] if previous['fps'] else 1.0
+        print(f"vs {previous.get('revision') or 'previous run'}: fps {previous['fps']} -> {result['fps']} ({change - 1:+.1%})")
+        if change < REGRESSION_RATIO:
+            print("REGRESSION: throughput dropped more than 10% against the previous run")
+        if labels and previous.get('accuracy_tracked') and \
+                result['accuracy_tracked']['overall'] < previous['accuracy_tracked']['overall']:
+            print("REGRESSION: tracked accuracy dropped against the previous run")
+    history.append(result)
+    tmp_path = f'{args.history}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp_path, args.history)
+    print(f"Appended results to {args.history}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+import cv2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from frame_sources import open_frame_source
+from inference_pool import InferencePool
+
+
+def load_frames(spec, limit, width, height):
+    # Frames are decoded up front so the benchmark measures inference, not
+    # video decoding.
+    source = open_frame_source(spec, realtime=False)
+    frames = []
+    while len(frames) < limit:
+        ok, frame = source.read()
+        if not ok:
+            break
+        frames.append(cv2.flip(cv2.resize(frame, (width, height)), 1))
+    source.release()
+    if not frames:
+        raise SystemExit(f"No frames could be read from {spec}")
+    return frames
+
+
+def run(pool, players, frames_by_player, seconds):
+    counts = {player: 0 for player in players}
+    hands = {player: 0 for player in players}
+    for player in players:
+        pool.register(player)
+        # Warm-up, so worker start-up and graph creation are not timed.
+        pool.process(player, frames_by_player[player][0])
+
+    def worker(player):
+        frames = frames_by_player[player]
+        deadline = time.perf_counter() + seconds
+        idx = 0
+        while time.perf_counter() < deadline:
+            hands[player] += len(pool.process(player, frames[idx % len(frames)]))
+            counts[player] += 1
+            idx += 1
+
+    threads = [threading.Thread(target=worker, args=(player,)) for player in players]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return {player: counts[player] / elapsed for player in players}, hands
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure multi-player hand inference throughput on replayed sources.')
+    parser.add_argument('sources', nargs='*', default=['synthetic'],
+                        help='one frame source spec per player, e.g. video:p1.mp4 video:p2.mp4')
+    parser.add_argument('--players', type=int, default=None, help='players to simulate (sources are reused in turn)')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='pool sizes to compare; 0 runs inference in-process')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    args = parser.parse_args()
+
+    players = list(range(1, (args.players or len(args.sources)) + 1))
+    clips = {spec: load_frames(spec, args.frames, args.width, args.height) for spec in set(args.sources)}
+    frames_by_player = {player: clips[args.sources[(player - 1) % len(args.sources)]] for player in players}
+    worker_counts = args.workers or sorted({0, 1, len(players)})
+
+    print(f"{len(players)} players, {os.cpu_count()} CPUs, {args.seconds:.0f}s per run")
+    print(f"{'workers':>8} {'total fps':>10} {'per player fps':>28} {'hands seen':>11}")
+    for workers in worker_counts:
+        pool = InferencePool(workers)
+        try:
+            fps, hands = run(pool, players, frames_by_player, args.seconds)
+        finally:
+            pool.close()
+        per_player = ' '.join(f'{fps[player]:.1f}' for player in players)
+        print(f"{workers:>8} {sum(fps.values()):>10.1f} {per_player:>28} {sum(hands.values()):>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from leaderboard import Leaderboard
+
+
+def legacy_submit(path, entry):
+    # What /save_score used to do for every request.
+    leaderboard = []
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            leaderboard = json.load(f)
+    leaderboard.append(entry)
+    leaderboard = sorted(leaderboard, key=lambda x: x['score'], reverse=True)[:10]
+    with open(path, 'w') as f:
+        json.dump(leaderboard, f)
+
+
+def make_submissions(count, songs, seed):
+    rng = random.Random(seed)
+    base = time.time()
+    return [(f'Player {rng.randint(1, 50)}', rng.randint(0, 100000), f'Song {rng.randrange(songs)}', base + i * 1e-3)
+            for i in range(count)]
+
+
+def expected_top(submissions, top_k, song=None):
+    chosen = [s for s in submissions if song is None or s[2] == song]
+    chosen.sort(key=lambda s: (-s[1], s[3]))
+    return [(s[0], s[1], s[2], s[3]) for s in chosen[:top_k]]
+
+
+def as_tuples(entries):
+    return [(e['player'], e['score'], e['song'], e['timestamp']) for e in entries]
+
+
+def check_board(board, submissions, songs, top_k):
+    problems = []
+    entries, _ = board.query(limit=top_k)
+    if as_tuples(entries) != expected_top(submissions, top_k):
+        problems.append('global top-K mismatch')
+    for idx in range(songs):
+        song = f'Song {idx}'
+        entries, _ = board.query(song=song, limit=top_k)
+        if as_tuples(entries) != expected_top(submissions, top_k, song):
+            problems.append(f'top-K mismatch for {song}')
+    return problems
+
+
+def run_concurrent(path, submissions, threads, top_k, flush_interval):
+    board = Leaderboard(path, top_k=top_k, flush_interval=flush_interval)
+    chunks = [submissions[i::threads] for i in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(chunk):
+        barrier.wait()
+        for player, score, song, timestamp in chunk:
+            board.submit(player, score, song, timestamp=timestamp)
+
+    workers = [threading.Thread(target=worker, args=(chunk,)) for chunk in chunks]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+    return board, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure leaderboard submission throughput and check durability.')
+    parser.add_argument('--submissions', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--songs', type=int, default=20)
+    parser.add_argument('--top-k', type=int, default=100)
+    parser.add_argument('--flush-interval', type=float, default=0.2)
+    parser.add_argument('--legacy', type=int, default=2000, help='submissions to time against the old JSON rewrite')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='leaderboard-bench-')
+    failures = []
+    try:
+        submissions = make_submissions(args.submissions, args.songs, args.seed)
+
+        legacy_path = os.path.join(workdir, 'legacy.json')
+        started = time.perf_counter()
+        for player, score, song, timestamp in submissions[:args.legacy]:
+            legacy_submit(legacy_path, {'player': player, 'score': score, 'song': song, 'timestamp': timestamp})
+        legacy_rate = args.legacy / (time.perf_counter() - started) if args.legacy else 0
+
+        path = os.path.join(workdir, 'leaderboard.json')
+        board, elapsed = run_concurrent(path, submissions, args.threads, args.top_k, args.flush_interval)
+        rate = len(submissions) / elapsed
+        if board.stats()['submitted'] != len(submissions):
+            failures.append(f"only {board.stats()['submitted']} of {len(submissions)} submissions recorded")
+        failures += [f'live: {p}' for p in check_board(board, submissions, args.songs, args.top_k)]
+        board.close()
+
+        reloaded = Leaderboard(path, top_k=args.top_k)
+        failures += [f'after restart: {p}' for p in check_board(reloaded, submissions, args.songs, args.top_k)]
+
+        # Simulate a crash: stop the flusher, submit more, and never snapshot.
+        reloaded.stopped.set()
+        reloaded.flusher.join()
+        extra = make_submissions(500, args.songs, args.seed + 1)
+        for player, score, song, timestamp in extra:
+            reloaded.submit(player, score, song, timestamp=timestamp)
+        recovered = Leaderboard(path, top_k=args.top_k)
+        failures += [f'after crash: {p}' for p in check_board(recovered, submissions + extra, args.songs, args.top_k)]
+        recovered.close()
+
+        print(f"{'path':<28} {'submissions':>12} {'seconds':>9} {'per second':>12}")
+        if args.legacy:
+            print(f"{'legacy JSON rewrite':<28} {args.legacy:>12} {args.legacy / legacy_rate:>9.3f} {legacy_rate:>12.0f}")
+        print(f"{f'service ({args.threads} threads)':<28} {len(submissions):>12} {elapsed:>9.3f} {rate:>12.0f}")
+        print(f"snapshot flushes during run: {board.stats()['flushes']}")
+        if failures:
+            for failure in failures:
+                print(f"FAIL {failure}")
+            sys.exit(1)
+        print('No lost or reordered updates (live, after restart, after simulated crash).')
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from gestures import classify_landmarks
+from inference_pool import HandsRunner
+from inference_pool_benchmark import load_frames
+from inference_scheduler import AdaptiveScheduler
+
+
+def run(runner, frames, scheduler=None, max_num_hands=1):
+    # One pass over the clip on a fresh tracking-mode graph, in process so
+    # worker IPC is not part of the comparison.
+    # The warm-up frame loads the models; reconfiguring then drops its
+    # tracking state so both passes start from detection.
+    runner.configure('bench', {'max_num_hands': max_num_hands})
+    runner.process('bench', frames[0])
+    runner.configure('bench', {'max_num_hands': max_num_hands})
+    results = []
+    modes = {'full': 0, 'scaled': 0}
+    started = time.perf_counter()
+    for frame in frames:
+        if scheduler is None:
+            hands = [hand.landmarks for hand in runner.process('bench', frame)]
+        else:
+            image, mode = scheduler.prepare(frame)
+            modes[mode] += 1
+            hands = [hand.landmarks for hand in runner.process('bench', image)]
+            scheduler.update(hands)
+        results.append(hands)
+    return time.perf_counter() - started, results, modes
+
+
+def agreement(reference, candidate):
+    # Per frame: did both passes see the same number of hands, and for those
+    # frames, how far apart are the landmarks (matched by wrist position)
+    # and do the gestures agree.
+    same_count = 0
+    errors = []
+    gestures_equal = 0
+    compared = 0
+    for ref_hands, hands in zip(reference, candidate):
+        if len(ref_hands) != len(hands):
+            continue
+        same_count += 1
+        remaining = list(hands)
+        for ref in ref_hands:
+            nearest = min(remaining, key=lambda hand: np.linalg.norm(hand[0, :2] - ref[0, :2]))
+            remaining.remove(nearest)
+            errors.append(float(np.mean(np.linalg.norm(nearest[:, :2] - ref[:, :2], axis=1))))
+            gestures_equal += classify_landmarks(nearest) == classify_landmarks(ref)
+            compared += 1
+    return {
+        'same_hand_count': same_count / max(len(reference), 1),
+        'mean_landmark_error': float(np.mean(errors)) if errors else None,
+        'gesture_agreement': gestures_equal / compared if compared else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare adaptive-resolution hand inference with the full-frame path.')
+    parser.add_argument('source', nargs='?', default='synthetic', help='frame source spec, e.g. video:session.mp4')
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--hands', type=int, default=1, help='max_num_hands for both passes')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.frames, args.width, args.height)
+    runner = HandsRunner()
+    try:
+        full_seconds, full, _ = run(runner, frames, max_num_hands=args.hands)
+        adaptive_seconds, adaptive, modes = run(runner, frames, AdaptiveScheduler(), max_num_hands=args.hands)
+    finally:
+        runner.close()
+
+    print(f"{len(frames)} frames from {args.source} at {args.width}x{args.height}")
+    print(f"{'path':>9} {'fps':>8} {'ms/frame':>9} {'hand frames':>12}")
+    for name, seconds, results in (('full', full_seconds, full), ('adaptive', adaptive_seconds, adaptive)):
+        seen = sum(1 for hands in results if hands)
+        print(f"{name:>9} {len(frames) / seconds:>8.1f} {1000 * seconds / len(frames):>9.2f} {seen:>12}")
+    match = agreement(full, adaptive)
+    print(f"speedup: {full_seconds / adaptive_seconds:.2f}x")
+    print(f"frames with the same hand count: {match['same_hand_count'] * 100:.1f}%")
+    if match['mean_landmark_error'] is not None:
+        print(f"mean landmark distance from full-frame: {match['mean_landmark_error']:.4f} (normalized)")
+        print(f"gesture agreement: {match['gesture_agreement'] * 100:.1f}%")
+    print(f"adaptive frames by mode: {modes}")
+
+
+if __name__ == '__main__':
+    main()
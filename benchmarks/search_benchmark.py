@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from search_service import RateLimited, SearchService
+
+
+class StandInExtractor:
+    # Answers ytsearchN: queries locally after a fixed delay, standing in for
+    # yt_dlp.YoutubeDL so the search layer can be exercised offline.
+    def __init__(self, latency=0.3):
+        self.latency = latency
+        self.calls = []
+
+    def extract_info(self, url, download=False):
+        prefix, query = url.split(':', 1)
+        count = int(prefix[len('ytsearch'):] or 1)
+        self.calls.append(query)
+        time.sleep(self.latency)
+        return {'entries': [{'id': f'{abs(hash(query)) % 10 ** 8:08d}{i}', 'title': f'{query} #{i}', 'duration': 180 + i}
+                            for i in range(count)]}
+
+
+def typing_session(service, word, results, errors):
+    # Each user re-searches the growing prefix, like keystroke-driven search.
+    for end in range(3, len(word) + 1):
+        try:
+            results.append(service.search(word[:end]))
+        except RateLimited as e:
+            errors.append(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exercise the search cache, coalescing and rate limiter offline.')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--rate', type=float, default=5.0)
+    parser.add_argument('--burst', type=int, default=5)
+    args = parser.parse_args()
+
+    extractor = StandInExtractor(args.latency)
+    service = SearchService(extractor_factory=lambda: extractor, rate=args.rate, burst=args.burst, max_wait=10.0)
+    words = ['canon in d', 'Canon  in D', 'the box', 'bohemian rhapsody']
+    results, errors = [], []
+    threads = [threading.Thread(target=typing_session, args=(service, words[i % len(words)], results, errors))
+               for i in range(args.users)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    requested = len(results) + len(errors)
+    naive_seconds = requested * (1.0 + args.latency)
+    stats = service.stats()
+    print(f"searches requested: {requested}")
+    print(f"extractor calls:    {stats['extractor_calls']} ({len(set(extractor.calls))} distinct queries)")
+    print(f"cache hits:         {stats['hits']}")
+    print(f"coalesced:          {stats['coalesced']}")
+    print(f"rate limited:       {stats['rate_limited']}")
+    print(f"wall time:          {elapsed:.2f}s (sleep-then-search would spend {naive_seconds:.0f}s of request time)")
+    if len(extractor.calls) != len(set(extractor.calls)):
+        print("FAIL the same query reached the extractor more than once")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+SUSTAINED_RATIO = 0.8
+
+
+def start_server(mode, port, source):
+    env = dict(os.environ, GESTURE_SERVER_MODE=mode, GESTURE_PORT=str(port), GESTURE_OPEN_BROWSER='0',
+               GESTURE_FRAME_SOURCE=source)
+    server = subprocess.Popen([sys.executable, 'main.py'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"Server exited with {server.returncode} in {mode} mode")
+        try:
+            conn = http.client.HTTPConnection('localhost', port, timeout=2)
+            conn.request('GET', '/debug/gesture_stats')
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise SystemExit(f"Server did not come up in {mode} mode")
+
+
+def process_usage(pid):
+    # CPU seconds and thread count from /proc, so the server needs no hooks.
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    with open(f'/proc/{pid}/status') as f:
+        threads = next(int(line.split()[1]) for line in f if line.startswith('Threads:'))
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS, threads
+
+
+class Spectator:
+    # A socket client in a player's room, counting gesture events and their
+    # delivery delay (server and client share the clock on one host).
+    def __init__(self, socketio_module, url):
+        self.client = socketio_module.Client(reconnection=False)
+        self.url = url
+        self.events = 0
+        self.delays_ms = []
+        self.connected = False
+        self.client.on('gesture', self.on_gesture)
+
+    def on_gesture(self, data):
+        self.events += 1
+        if data.get('sent_wall'):
+            self.delays_ms.append((time.time() - data['sent_wall']) * 1000)
+
+    def connect(self):
+        try:
+            self.client.connect(self.url, transports=['websocket'], wait_timeout=10)
+            self.client.emit('join_player', {'player': 1})
+            self.connected = True
+        except Exception as e:
+            print(f"Spectator failed to connect: {e}")
+
+    def reset(self):
+        self.events = 0
+        self.delays_ms = []
+
+    def close(self):
+        if self.connected:
+            self.client.disconnect()
+
+
+class StreamReader(threading.Thread):
+    # Reads /video_feed as a browser <img> would and counts multipart frames.
+    def __init__(self, port):
+        super().__init__(daemon=True)
+        self.port = port
+        self.frames = 0
+        self.bytes = 0
+        self.connected = False
+        self.running = True
+
+    def run(self):
+        try:
+            conn = http.client.HTTPConnection('localhost', self.port, timeout=10)
+            conn.request('GET', '/video_feed?player=1')
+            response = conn.getresponse()
+            self.connected = response.status == 200
+            tail = b''
+            while self.running and self.connected:
+                chunk = response.read1(65536)
+                if not chunk:
+                    break
+                self.bytes += len(chunk)
+                self.frames += (tail + chunk).count(b'--frame')
+                tail = chunk[-6:]
+            conn.close()
+        except OSError as e:
+            print(f"Stream reader failed: {e}")
+
+    def reset(self):
+        self.frames = 0
+        self.bytes = 0
+
+
+def run_stage(socketio_module, port, server_pid, spectators, streams, seconds):
+    url = f'http://localhost:{port}'
+    clients = [Spectator(socketio_module, url) for _ in range(spectators)]
+    connectors = [threading.Thread(target=client.connect) for client in clients]
+    for t in connectors:
+        t.start()
+    for t in connectors:
+        t.join()
+    readers = [StreamReader(port) for _ in range(streams)]
+    for reader in readers:
+        reader.start()
+    time.sleep(2.0)
+    for item in clients + readers:
+        item.reset()
+
+    cpu_before, _ = process_usage(server_pid)
+    started = time.monotonic()
+    time.sleep(seconds)
+    elapsed = time.monotonic() - started
+    cpu_after, threads = process_usage(server_pid)
+
+    event_rates = [client.events / elapsed for client in clients if client.connected]
+    delays = sorted(delay for client in clients for delay in client.delays_ms)
+    stream_fps = [reader.frames / elapsed for reader in readers if reader.connected]
+    for reader in readers:
+        reader.running = False
+    for client in clients:
+        client.close()
+    return {
+        'spectators': spectators,
+        'connected': sum(1 for client in clients if client.connected),
+        'streams': streams,
+        'streaming': len(stream_fps),
+        'events_per_s': round(statistics.median(event_rates), 2) if event_rates else 0.0,
+        'p95_delay_ms': round(delays[int(len(delays) * 0.95)], 1) if delays else None,
+        'stream_fps': round(statistics.median(stream_fps), 2) if stream_fps else 0.0,
+        'stream_mbps': round(sum(reader.bytes for reader in readers) * 8 / elapsed / 1e6, 2),
+        'server_cpu': round((cpu_after - cpu_before) / elapsed, 2),
+        'server_threads': threads
+    }
+
+
+def sustained(result, baseline):
+    # A stage is sustained when everyone got connected and both the event
+    # rate and the stream frame rate stay within 80% of the lightest stage.
+    return (result['connected'] == result['spectators'] and result['streaming'] == result['streams'] and
+            result['events_per_s'] >= SUSTAINED_RATIO * baseline['events_per_s'] and
+            result['stream_fps'] >= SUSTAINED_RATIO * baseline['stream_fps'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the game server with local spectators and video streams.')
+    parser.add_argument('--modes', default='threading,eventlet', help='comma-separated server modes to compare')
+    parser.add_argument('--spectators', default='5,25,50,100,200', help='socket clients per stage')
+    parser.add_argument('--streams', default='1,2,5,10,20', help='/video_feed readers per stage')
+    parser.add_argument('--seconds', type=float, default=10.0, help='measurement time per stage')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--source', default='synthetic', help='frame source for the server under test')
+    args = parser.parse_args()
+
+    try:
+        import socketio as socketio_module
+    except ImportError:
+        raise SystemExit('The load test needs the Socket.IO client: pip install "python-socketio[client]"')
+
+    spectator_stages = [int(n) for n in args.spectators.split(',')]
+    stream_stages = [int(n) for n in args.streams.split(',')]
+    stages = list(zip(spectator_stages, stream_stages))
+    summary = {}
+    for mode in args.modes.split(','):
+        print(f"== {mode} ==")
+        server = start_server(mode, args.port, args.source)
+        try:
+            baseline = None
+            best = None
+            print(f"{'spectators':>10} {'streams':>8} {'events/s':>9} {'p95 ms':>8} {'fps':>6} "
+                  f"{'Mbit/s':>7} {'cpu':>5} {'threads':>8}")
+            for spectators, streams in stages:
+                result = run_stage(socketio_module, args.port, server.pid, spectators, streams, args.seconds)
+                baseline = baseline or result
+                ok = sustained(result, baseline)
+                if ok:
+                    best = (spectators, streams)
+                print(f"{result['connected']:>4}/{spectators:<5} {result['streaming']:>3}/{streams:<4} "
+                      f"{result['events_per_s']:>9} {result['p95_delay_ms'] or '-':>8} {result['stream_fps']:>6} "
+                      f"{result['stream_mbps']:>7} {result['server_cpu']:>5} {result['server_threads']:>8}"
+                      f"{'' if ok else '  (not sustained)'}")
+                if not ok:
+                    break
+            summary[mode] = best
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print()
+    for mode, best in summary.items():
+        if best:
+            print(f"{mode}: sustained {best[0]} spectators and {best[1]} streams")
+        else:
+            print(f"{mode}: did not sustain the first stage")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['cv2', 'mediapipe', 'librosa', 'yt_dlp', 'sounddevice', 'numba']
+
+# Runs in a fresh interpreter so every import is cold.
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.create_app()
+created = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'heavy_loaded': [name for name in %r if name in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+
+def probe_once(env):
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"Import probe failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_profile(env, top):
+    # Cumulative microseconds per package imported directly by main, from the
+    # -X importtime tree. A module's line follows everything it imported,
+    # indented two more spaces per level, so main's direct imports are the
+    # depth-1 lines between main's own line and the top-level line before it.
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, name.strip(), int(own), int(cumulative)))
+    main_idx = next((idx for idx in range(len(entries) - 1, -1, -1) if entries[idx][:2] == (0, 'main')), None)
+    if main_idx is None:
+        return []
+    totals = {'main (own code)': entries[main_idx][2]}
+    for depth, name, _, cumulative in reversed(entries[:main_idx]):
+        if depth == 0:
+            break
+        if depth == 1:
+            package = name.split('.')[0]
+            totals[package] = totals.get(package, 0) + cumulative
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def time_to_ready(env, port, camera):
+    # Wall time from launching the server to /ready answering 200.
+    env = dict(env, GESTURE_PORT=str(port), GESTURE_OPEN_BROWSER='0')
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, 'main.py'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        app_ready = None
+        path = '/ready'
+        while time.perf_counter() - started < 120:
+            if server.poll() is not None:
+                raise SystemExit(f"Server exited with {server.returncode}")
+            try:
+                conn = http.client.HTTPConnection('localhost', port, timeout=5)
+                conn.request('GET', path)
+                status = conn.getresponse().status
+            except OSError:
+                status = None
+            if status == 200:
+                if app_ready is None:
+                    app_ready = time.perf_counter() - started
+                    if not camera:
+                        return app_ready * 1000, None
+                    path = '/ready?camera=1'
+                    continue
+                return app_ready * 1000, (time.perf_counter() - started) * 1000
+            time.sleep(0.05)
+        raise SystemExit("Server did not become ready in time")
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold import and startup time of the game server.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1500.0,
+                        help='fail when median import + create_app exceeds this')
+    parser.add_argument('--top', type=int, default=10, help='slowest imported packages to list')
+    parser.add_argument('--serve', action='store_true', help='also time a real server launch until /ready')
+    parser.add_argument('--camera', action='store_true', help='with --serve, also time until cameras are ready')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--source', default='synthetic', help='frame source for --camera')
+    args = parser.parse_args()
+
+    env = dict(os.environ, GESTURE_FRAME_SOURCE=args.source)
+    runs = [probe_once(env) for _ in range(args.runs)]
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    create_ms = statistics.median(run['create_app_ms'] for run in runs)
+    heavy = sorted({name for run in runs for name in run['heavy_loaded']})
+    total = import_ms + create_ms
+    print(f"import main:  {import_ms:8.1f} ms (median of {args.runs})")
+    print(f"create_app(): {create_ms:8.1f} ms")
+    print(f"total:        {total:8.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"heavy modules loaded at startup: {', '.join(heavy) if heavy else 'none'}")
+    print("slowest imports by main (cumulative):")
+    for name, micros in import_profile(env, args.top):
+        print(f"  {name:<24} {micros / 1000:8.1f} ms")
+
+    if args.serve:
+        app_ms, camera_ms = time_to_ready(env, args.port, args.camera)
+        print(f"launch to /ready:          {app_ms:8.1f} ms")
+        if camera_ms is not None:
+            print(f"launch to /ready?camera=1: {camera_ms:8.1f} ms")
+
+    failed = False
+    if total > args.budget_ms:
+        print(f"OVER BUDGET: startup took {total:.0f} ms")
+        failed = True
+    if heavy:
+        print(f"REGRESSION: {', '.join(heavy)} imported at startup")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
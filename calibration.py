@@ -0,0 +1,144 @@
+import json
+import os
+import re
+import statistics
+import threading
+import time
+
+from song_cache import write_json_atomic
+
+# Offsets outside this range are measurement failures (the player followed
+# the wrong beat, or the camera stalled), not latency.
+MAX_OFFSET = 0.5
+MIN_EVENTS = 4
+DEVICE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.:-]{1,64}$')
+
+
+def beat_offsets(beats, events, period):
+    # Each event against its nearest beat, so an early event on beat k is not
+    # read as a late one on beat k-1. Events more than half a period from
+    # every beat (count-in clicks, stray gestures) are dropped.
+    beats = sorted(beats)
+    offsets = []
+    if not beats:
+        return offsets
+    for event in sorted(events):
+        nearest = min(beats, key=lambda beat: abs(event - beat))
+        offset = event - nearest
+        if abs(offset) <= period / 2:
+            offsets.append(offset)
+    return offsets
+
+
+def robust_offset(offsets, min_events=MIN_EVENTS):
+    # Median after dropping points more than 3 MADs out (with a 10 ms floor,
+    # so a very steady player does not reject their own small jitter).
+    if len(offsets) < min_events:
+        return None
+    median = statistics.median(offsets)
+    mad = max(statistics.median(abs(offset - median) for offset in offsets), 0.01)
+    kept = [offset for offset in offsets if abs(offset - median) <= 3 * mad]
+    if len(kept) < min_events:
+        return None
+    return {
+        'offset': statistics.median(kept),
+        'jitter': statistics.pstdev(kept),
+        'events': len(kept),
+        'rejected': len(offsets) - len(kept)
+    }
+
+
+def estimate_offsets(tap_beats, taps, gesture_beats, gestures, period, min_events=MIN_EVENTS):
+    # Taps (a key pressed on each click) measure when the player hears the
+    # audio: output latency. Gesture transitions on each click measure that
+    # plus the camera pipeline, so the input offset is the difference. Without
+    # taps the whole gesture delay is reported as input offset.
+    tap = robust_offset(beat_offsets(tap_beats, taps, period), min_events)
+    gesture = robust_offset(beat_offsets(gesture_beats, gestures, period), min_events)
+    if gesture is None:
+        raise ValueError(f"Need at least {min_events} gesture changes on the beat")
+    output_offset = tap['offset'] if tap else 0.0
+    input_offset = gesture['offset'] - output_offset
+    for name, value in (('output', output_offset), ('input', input_offset)):
+        if abs(value) > MAX_OFFSET:
+            raise ValueError(f"Measured {name} offset of {value * 1000:.0f} ms is not plausible, try again")
+    return {
+        'output_offset': round(output_offset, 4),
+        'input_offset': round(input_offset, 4),
+        'tap_jitter': round(tap['jitter'], 4) if tap else None,
+        'gesture_jitter': round(gesture['jitter'], 4),
+        'taps': tap['events'] if tap else 0,
+        'gestures': gesture['events']
+    }
+
+
+class CalibrationRecorder:
+    # Collects one player's gesture transitions (as wall-clock start times)
+    # while the calibration metronome plays. `skew` is how far the server's
+    # clock runs ahead of the page's, which scheduled the clicks.
+    def __init__(self, player_id, device, skew=0.0):
+        self.player_id = player_id
+        self.device = device
+        self.skew = skew
+        self.lock = threading.Lock()
+        self.transitions = []
+        self.started = time.time()
+
+    def record(self, gesture, started_wall):
+        if gesture == 'none':
+            return
+        with self.lock:
+            self.transitions.append((started_wall, gesture))
+
+    def gesture_times(self):
+        with self.lock:
+            return [started - self.skew for started, _ in self.transitions]
+
+
+class CalibrationProfiles:
+    # Measured offsets per device (the browser's id for itself), so a kiosk
+    # and a laptop playing against the same server each keep their own.
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.profiles = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                profiles = json.load(f)
+            return profiles if isinstance(profiles, dict) else {}
+        except (OSError, ValueError) as e:
+            print(f"Error reading calibration profiles {self.path}: {e}")
+            return {}
+
+    def get(self, device):
+        with self.lock:
+            profile = self.profiles.get(device)
+            return dict(profile) if profile else None
+
+    def save(self, device, offsets, source=None):
+        if not isinstance(device, str) or not DEVICE_ID_PATTERN.match(device):
+            raise ValueError(f"Invalid device id: {device!r}")
+        profile = dict(offsets, source=source, updated=time.time())
+        with self.lock:
+            self.profiles[device] = profile
+            write_json_atomic(self.path, self.profiles)
+        return dict(profile)
+
+    def delete(self, device):
+        with self.lock:
+            if self.profiles.pop(device, None) is None:
+                return False
+            write_json_atomic(self.path, self.profiles)
+            return True
+
+    def total_offset(self, device):
+        # What judgment subtracts from gesture times: the player hears the
+        # beat output_offset late and the camera reports it input_offset late.
+        profile = self.get(device)
+        if not profile:
+            return 0.0
+        return profile.get('output_offset', 0.0) + profile.get('input_offset', 0.0)
@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import namedtuple
+
+# capture_ms is how long the producer spent reading the frame before
+# publishing it, when it knows.
+Frame = namedtuple('Frame', ['seq', 'timestamp', 'image', 'capture_ms'], defaults=(None,))
+
+
+class FrameBus:
+    # Single producer, many readers. Frames are published once and shared by
+    # reference, so readers must treat frame.image as read-only.
+    def __init__(self, capacity=4):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.seq = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def publish(self, image, timestamp=None, capture_ms=None):
+        if timestamp is None:
+            timestamp = time.monotonic()
+        try:
+            image.flags.writeable = False
+        except AttributeError:
+            pass
+        with self.cond:
+            self.seq += 1
+            frame = Frame(self.seq, timestamp, image, capture_ms)
+            self.slots[self.seq % self.capacity] = frame
+            self.cond.notify_all()
+        return frame
+
+    def latest(self):
+        with self.cond:
+            if self.seq == 0:
+                return None
+            return self.slots[self.seq % self.capacity]
+
+    def get(self, seq):
+        with self.cond:
+            if seq <= 0 or seq > self.seq or seq <= self.seq - self.capacity:
+                return None
+            return self.slots[seq % self.capacity]
+
+    def wait_for(self, after_seq=0, timeout=None):
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > after_seq or self.closed, timeout)
+            if self.seq <= after_seq:
+                return None
+            return self.slots[self.seq % self.capacity]
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
@@ -0,0 +1,168 @@
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+# Every source follows the small part of the cv2.VideoCapture interface that
+# WebcamFeed relies on: isOpened(), read() -> (ok, frame) and release().
+
+
+class CameraSource:
+    def __init__(self, index=0):
+        self.index = index
+        self.cap = cv2.VideoCapture(index)
+        # Keep only the newest frame, so resuming from standby does not
+        # replay whatever the driver queued while the feed was parked.
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+    def describe(self):
+        return f"camera:{self.index}"
+
+
+class _PacedSource:
+    def __init__(self, fps, realtime, loop):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.realtime = realtime
+        self.loop = loop
+        self.frame_count = 0
+        self.next_frame_time = None
+
+    def _pace(self):
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self.next_frame_time is None:
+            self.next_frame_time = now
+        delay = self.next_frame_time - now
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame_time = max(self.next_frame_time, now - 1.0 / self.fps) + 1.0 / self.fps
+
+
+class VideoFileSource(_PacedSource):
+    def __init__(self, path, realtime=True, loop=False):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        super().__init__(self.cap.get(cv2.CAP_PROP_FPS), realtime, loop)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        self._pace()
+        ret, frame = self.cap.read()
+        if not ret and self.loop and self.frame_count > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if ret:
+            self.frame_count += 1
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+    def describe(self):
+        return f"video:{self.path}"
+
+
+class ImageSequenceSource(_PacedSource):
+    def __init__(self, pattern, fps=30.0, realtime=True, loop=False):
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, '*')
+        self.pattern = pattern
+        self.paths = sorted(p for p in glob.glob(pattern) if os.path.isfile(p))
+        self.position = 0
+        super().__init__(fps, realtime, loop)
+
+    def isOpened(self):
+        return len(self.paths) > 0
+
+    def read(self):
+        if self.position >= len(self.paths):
+            if not self.loop or not self.paths:
+                return False, None
+            self.position = 0
+        self._pace()
+        frame = cv2.imread(self.paths[self.position])
+        self.position += 1
+        if frame is None:
+            return False, None
+        self.frame_count += 1
+        return True, frame
+
+    def release(self):
+        self.paths = []
+
+    def describe(self):
+        return f"images:{self.pattern}"
+
+
+class SyntheticSource(_PacedSource):
+    # Produces a moving skin-coloured blob on a gradient so the capture,
+    # resize and inference path does real work without a camera.
+    def __init__(self, width=640, height=480, fps=30.0, realtime=True, max_frames=None):
+        self.width = width
+        self.height = height
+        self.max_frames = max_frames
+        self.opened = True
+        gradient = np.linspace(40, 120, width, dtype=np.uint8)
+        self.background = np.repeat(np.tile(gradient, (height, 1))[:, :, None], 3, axis=2)
+        super().__init__(fps, realtime, False)
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened or (self.max_frames is not None and self.frame_count >= self.max_frames):
+            return False, None
+        self._pace()
+        frame = self.background.copy()
+        t = self.frame_count / self.fps
+        cx = int(self.width / 2 + np.sin(t) * self.width / 4)
+        cy = int(self.height / 2 + np.cos(t) * self.height / 6)
+        cv2.circle(frame, (cx, cy), self.height // 6, (120, 160, 220), -1)
+        self.frame_count += 1
+        return True, frame
+
+    def release(self):
+        self.opened = False
+
+    def describe(self):
+        return "synthetic"
+
+
+def open_frame_source(spec=None, realtime=True, loop=False):
+    # spec examples: "camera:0", "video:clip.mp4", "images:frames/*.png",
+    # "synthetic", "synthetic:320x240@60"
+    if spec is None or spec == '':
+        spec = 'camera:0'
+    kind, _, arg = str(spec).partition(':')
+    if kind == 'camera':
+        return CameraSource(int(arg or 0))
+    if kind == 'video':
+        return VideoFileSource(arg, realtime=realtime, loop=loop)
+    if kind == 'images':
+        return ImageSequenceSource(arg, realtime=realtime, loop=loop)
+    if kind == 'synthetic':
+        width, height, fps = 640, 480, 30.0
+        if arg:
+            size, _, rate = arg.partition('@')
+            if size:
+                width, height = (int(v) for v in size.split('x'))
+            if rate:
+                fps = float(rate)
+        return SyntheticSource(width, height, fps, realtime=realtime)
+    if kind.isdigit():
+        return CameraSource(int(kind))
+    raise ValueError(f"Unknown frame source: {spec}")
@@ -0,0 +1,92 @@
+from collections import Counter, deque, namedtuple
+
+import numpy as np
+
+GESTURE_LABELS = ("none", "peace", "index", "fist", "open_hand")
+GESTURE_IDS = {label: idx for idx, label in enumerate(GESTURE_LABELS)}
+
+# Tip and MCP landmark indices for the index, middle, ring and pinky fingers.
+FINGER_TIPS = np.array([8, 12, 16, 20])
+FINGER_MCPS = np.array([5, 9, 13, 17])
+
+# A finger counts as extended when its tip is above (smaller y than) its MCP
+# joint and folded when it is below. Bit i of the lookup index is set when
+# finger i is extended.
+_GESTURE_TABLE = np.zeros(16, dtype=np.uint8)
+_GESTURE_TABLE[0b0011] = GESTURE_IDS["peace"]
+_GESTURE_TABLE[0b0001] = GESTURE_IDS["index"]
+_GESTURE_TABLE[0b0000] = GESTURE_IDS["fist"]
+_GESTURE_TABLE[0b1111] = GESTURE_IDS["open_hand"]
+_FINGER_BITS = np.array([1, 2, 4, 8], dtype=np.uint8)
+_LABEL_ARRAY = np.array(GESTURE_LABELS)
+
+
+def landmarks_to_array(hand_landmarks):
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark], dtype=np.float32)
+
+
+def classify_gesture_ids(landmarks):
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    tips_y = landmarks[..., FINGER_TIPS, 1]
+    mcps_y = landmarks[..., FINGER_MCPS, 1]
+    extended = tips_y < mcps_y
+    # A tip level with its MCP is neither extended nor folded; the original
+    # rules never matched that case, so it maps to "none".
+    decided = np.all(extended | (tips_y > mcps_y), axis=-1)
+    codes = (extended.astype(np.uint8) * _FINGER_BITS).sum(axis=-1)
+    return np.where(decided, _GESTURE_TABLE[codes], GESTURE_IDS["none"]).astype(np.uint8)
+
+
+def classify_landmarks(landmarks):
+    # (21, 3) -> label string, (N, 21, 3) -> array of N label strings
+    ids = classify_gesture_ids(landmarks)
+    if ids.ndim == 0:
+        return GESTURE_LABELS[int(ids)]
+    return _LABEL_ARRAY[ids]
+
+
+GestureState = namedtuple('GestureState', ['gesture', 'confidence', 'started_at', 'changed', 'scores'])
+
+
+class GestureTracker:
+    # Majority vote over the last `window` frames with hysteresis: a new
+    # gesture takes over once it holds `enter_ratio` of the window and the
+    # current one has dropped to `exit_ratio` or below.
+    def __init__(self, window=5, enter_ratio=0.6, exit_ratio=0.4):
+        self.window = window
+        self.enter_ratio = enter_ratio
+        self.exit_ratio = exit_ratio
+        self.reset()
+
+    def reset(self):
+        self.history = deque(maxlen=self.window)
+        self.gesture = "none"
+        self.started_at = None
+
+    def scores(self):
+        if not self.history:
+            return {}
+        counts = Counter(label for label, _ in self.history)
+        return {label: count / len(self.history) for label, count in counts.items()}
+
+    def update(self, gesture, timestamp):
+        self.history.append((gesture, timestamp))
+        scores = self.scores()
+        if self.started_at is None:
+            self.started_at = timestamp
+        changed = False
+        candidate, candidate_score = max(scores.items(), key=lambda item: item[1])
+        if (candidate != self.gesture and candidate_score >= self.enter_ratio
+                and scores.get(self.gesture, 0.0) <= self.exit_ratio):
+            self.gesture = candidate
+            self.started_at = next(ts for label, ts in self.history if label == candidate)
+            changed = True
+        return GestureState(self.gesture, scores.get(self.gesture, 0.0), self.started_at, changed, scores)
+
+
+def track_sequence(landmarks, timestamps, tracker=None):
+    # Replays a recorded (N, 21, 3) landmark sequence through a tracker.
+    # Frames without a hand can be passed as NaN rows and count as "none".
+    tracker = tracker or GestureTracker()
+    labels = classify_landmarks(np.asarray(landmarks, dtype=np.float32).reshape(-1, 21, 3))
+    return [tracker.update(str(label), ts) for label, ts in zip(labels, timestamps)]
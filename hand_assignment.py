@@ -0,0 +1,70 @@
+import numpy as np
+
+# Wrist and finger MCP joints; their mean is a steadier hand position than any
+# single landmark while fingers move between gestures.
+PALM_LANDMARKS = [0, 5, 9, 13, 17]
+
+
+def palm_center(landmarks):
+    return np.asarray(landmarks, dtype=np.float32)[PALM_LANDMARKS, :2].mean(axis=0)
+
+
+class HandAssigner:
+    # Gives each detected hand a stable player id when several players share
+    # one camera. A player's hand is matched to the nearest detection within
+    # `max_jump` of where it was last seen, with a penalty when MediaPipe's
+    # handedness label disagrees. Hands that match nobody are given to a free
+    # player, preferring the one whose side of the frame they are on (player 1
+    # on the left, and so on), and a player is freed again once their hand has
+    # been gone for `forget_after` seconds.
+    def __init__(self, player_ids, max_jump=0.25, handedness_penalty=0.15, forget_after=1.0):
+        self.player_ids = list(player_ids)
+        self.max_jump = max_jump
+        self.handedness_penalty = handedness_penalty
+        self.forget_after = forget_after
+        self.reset()
+
+    def reset(self):
+        self.slots = {player_id: None for player_id in self.player_ids}
+
+    def _home_x(self, player_id):
+        return (self.player_ids.index(player_id) + 0.5) / len(self.player_ids)
+
+    def assign(self, hands, timestamp):
+        # hands: list of (landmarks, handedness) with landmarks in normalized
+        # frame coordinates. Returns {player_id: index into hands}.
+        for player_id, slot in self.slots.items():
+            if slot is not None and timestamp - slot['seen_at'] > self.forget_after:
+                self.slots[player_id] = None
+
+        positions = [palm_center(landmarks) for landmarks, _ in hands]
+        candidates = []
+        for idx, position in enumerate(positions):
+            handedness = hands[idx][1]
+            for player_id, slot in self.slots.items():
+                if slot is None:
+                    # Always costlier than any tracked match, so a free player
+                    # never takes a hand that someone is already holding.
+                    cost = 1.0 + abs(float(position[0]) - self._home_x(player_id))
+                else:
+                    distance = float(np.linalg.norm(position - slot['position']))
+                    if distance > self.max_jump:
+                        continue
+                    cost = distance
+                    if handedness and slot['handedness'] and handedness != slot['handedness']:
+                        cost += self.handedness_penalty
+                candidates.append((cost, idx, player_id))
+
+        assignments = {}
+        used = set()
+        for cost, idx, player_id in sorted(candidates, key=lambda c: c[0]):
+            if idx in used or player_id in assignments:
+                continue
+            assignments[player_id] = idx
+            used.add(idx)
+            self.slots[player_id] = {
+                'position': positions[idx],
+                'handedness': hands[idx][1],
+                'seen_at': timestamp
+            }
+        return assignments
@@ -0,0 +1,323 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from multiprocessing.connection import Connection
+
+import numpy as np
+
+HandResult = namedtuple('HandResult', ['landmarks', 'handedness', 'score'])
+
+DEFAULT_HANDS_OPTIONS = {
+    'max_num_hands': 1,
+    'min_detection_confidence': 0.7,
+    'min_tracking_confidence': 0.5
+}
+
+
+class WorkerCrashed(Exception):
+    pass
+
+
+class HandsRunner:
+    # One MediaPipe Hands graph per player, so tracking state from one player's
+    # frames never leaks into another's. Used inside worker processes and, with
+    # workers=0, directly in the server process.
+    def __init__(self):
+        import cv2
+        import mediapipe as mp
+        self.cv2 = cv2
+        self.mp_hands = mp.solutions.hands
+        self.graphs = {}
+
+    def configure(self, player_id, options):
+        self.reset(player_id)
+        self.graphs[player_id] = self.mp_hands.Hands(**dict(DEFAULT_HANDS_OPTIONS, **options))
+
+    def reset(self, player_id):
+        graph = self.graphs.pop(player_id, None)
+        if graph is not None:
+            graph.close()
+
+    def process(self, player_id, image):
+        graph = self.graphs.get(player_id)
+        if graph is None:
+            self.configure(player_id, {})
+            graph = self.graphs[player_id]
+        results = graph.process(self.cv2.cvtColor(image, self.cv2.COLOR_BGR2RGB))
+        if not results.multi_hand_landmarks:
+            return []
+        handedness = results.multi_handedness or []
+        hands = []
+        for idx, hand_landmarks in enumerate(results.multi_hand_landmarks):
+            landmarks = np.array([[lm.x, lm.y, lm.z] for lm in hand_landmarks.landmark], dtype=np.float32)
+            label, score = None, 1.0
+            if idx < len(handedness) and handedness[idx].classification:
+                label = handedness[idx].classification[0].label
+                score = handedness[idx].classification[0].score
+            hands.append(HandResult(landmarks, label, float(score)))
+        return hands
+
+    def close(self):
+        for player_id in list(self.graphs):
+            self.reset(player_id)
+
+
+def _worker_main(read_fd, write_fd):
+    requests = Connection(read_fd, writable=False)
+    replies = Connection(write_fd, readable=False)
+    runner = HandsRunner()
+    while True:
+        try:
+            message = requests.recv()
+        except EOFError:
+            break
+        command, player_id, payload = message
+        try:
+            if command == 'process':
+                # Plain tuples: HandResult lives in __main__ here and would not
+                # unpickle on the server side.
+                result = [tuple(hand) for hand in runner.process(player_id, payload)]
+            elif command == 'configure':
+                result = runner.configure(player_id, payload)
+            elif command == 'reset':
+                result = runner.reset(player_id)
+            elif command == 'close':
+                replies.send(('ok', None))
+                break
+            else:
+                raise ValueError(f"Unknown inference command: {command}")
+            replies.send(('ok', result))
+        except Exception as e:
+            replies.send(('error', f'{type(e).__name__}: {e}'))
+    runner.close()
+
+
+class _ProcessWorker:
+    # A worker process started as a plain script, so it never re-imports the
+    # server module (and its cameras) the way multiprocessing's spawn would.
+    # Requests and replies go over a pair of pipes; one request at a time.
+    def __init__(self, index):
+        self.index = index
+        self.lock = threading.Lock()
+        child_read, parent_write = os.pipe()
+        parent_read, child_write = os.pipe()
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--worker', str(child_read), str(child_write)],
+            pass_fds=(child_read, child_write), cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        os.close(child_read)
+        os.close(child_write)
+        self.requests = Connection(parent_write, readable=False)
+        self.replies = Connection(parent_read, writable=False)
+
+    def call(self, command, player_id=None, payload=None):
+        with self.lock:
+            try:
+                self.requests.send((command, player_id, payload))
+                status, value = self.replies.recv()
+            except (EOFError, OSError) as e:
+                raise WorkerCrashed(f"Inference worker {self.index} stopped: {e}")
+        if status == 'error':
+            raise RuntimeError(value)
+        if command == 'process':
+            return [HandResult(*hand) for hand in value]
+        return value
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        try:
+            if self.alive():
+                self.call('close')
+        except (WorkerCrashed, RuntimeError):
+            pass
+        self.requests.close()
+        self.replies.close()
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class _LocalWorker:
+    def __init__(self, index):
+        self.index = index
+        self.lock = threading.Lock()
+        self.runner = HandsRunner()
+
+    def call(self, command, player_id=None, payload=None):
+        with self.lock:
+            if command == 'process':
+                return self.runner.process(player_id, payload)
+            if command == 'configure':
+                return self.runner.configure(player_id, payload)
+            if command == 'reset':
+                return self.runner.reset(player_id)
+
+    def alive(self):
+        return True
+
+    def close(self):
+        with self.lock:
+            self.runner.close()
+
+
+class InferencePool:
+    # Hand-landmark inference for any number of players on a pool of worker
+    # processes. Each player is pinned to one worker, spread as evenly as
+    # possible, and has its own Hands graph there; with as many workers as
+    # players every player gets a process and a core of its own. Callers block
+    # only on their own worker, so players on different workers run in
+    # parallel. A worker that dies is restarted and its players reconfigured;
+    # frames that arrive before the restart return no hands. Restarts back
+    # off from restart_delay, doubling up to max_restart_delay. After
+    # max_restarts crashes in a row the worker is marked failed and its
+    # players get no hands until one of them registers again; a worker that
+    # ran for stable_after seconds starts the count over. workers=0 runs
+    # inference in-process instead.
+    def __init__(self, workers=None, restart_delay=0.5, max_restart_delay=10.0, max_restarts=5, stable_after=60.0):
+        if workers is None:
+            workers = min(4, os.cpu_count() or 1)
+        self.use_processes = workers > 0
+        self.size = max(1, workers)
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.max_restarts = max_restarts
+        self.stable_after = stable_after
+        self.workers = [None] * self.size
+        self.crashes = [0] * self.size
+        self.retry_at = [0.0] * self.size
+        self.started_at = [0.0] * self.size
+        self.failed = [False] * self.size
+        self.players = {}
+        self.lock = threading.Lock()
+        self.timings = {}
+        self.restarts = 0
+
+    def _worker(self, index):
+        # None while the slot is backing off after a crash or has failed.
+        with self.lock:
+            worker = self.workers[index]
+            if worker is not None:
+                return worker
+            if self.failed[index] or time.monotonic() < self.retry_at[index]:
+                return None
+            worker = _ProcessWorker(index) if self.use_processes else _LocalWorker(index)
+            self.workers[index] = worker
+            self.started_at[index] = time.monotonic()
+            # A replacement starts without the graphs its players had.
+            players = [(player_id, options) for player_id, (assigned, options) in self.players.items()
+                       if assigned == index] if self.crashes[index] else []
+        for player_id, options in players:
+            worker.call('configure', player_id, options)
+        return worker
+
+    def register(self, player_id, **options):
+        with self.lock:
+            if player_id in self.players:
+                index = self.players[player_id][0]
+            else:
+                load = [0] * self.size
+                for assigned, _ in self.players.values():
+                    load[assigned] += 1
+                index = load.index(min(load))
+            self.players[player_id] = (index, options)
+            self.timings.setdefault(player_id, deque(maxlen=120))
+            if self.failed[index]:
+                # Registering again (a camera restart) is the way to retry.
+                self.failed[index] = False
+                self.crashes[index] = 0
+                self.retry_at[index] = 0.0
+        worker = self._worker(index)
+        if worker is not None:
+            worker.call('configure', player_id, options)
+        return index
+
+    def unregister(self, player_id):
+        with self.lock:
+            assigned = self.players.pop(player_id, None)
+        if assigned is not None:
+            with self.lock:
+                worker = self.workers[assigned[0]]
+            try:
+                if worker is not None:
+                    worker.call('reset', player_id)
+            except WorkerCrashed:
+                pass
+
+    def _restart(self, index, worker):
+        # The replacement is started by the first call after the backoff.
+        with self.lock:
+            if self.workers[index] is not worker:
+                return
+            self.workers[index] = None
+            now = time.monotonic()
+            if now - self.started_at[index] >= self.stable_after:
+                self.crashes[index] = 0
+            self.crashes[index] += 1
+            players = [player_id for player_id, (assigned, _) in self.players.items() if assigned == index]
+            if self.crashes[index] > self.max_restarts:
+                self.failed[index] = True
+            else:
+                self.restarts += 1
+                delay = min(self.max_restart_delay, self.restart_delay * 2 ** (self.crashes[index] - 1))
+                self.retry_at[index] = now + delay
+        if self.failed[index]:
+            print(f"Inference worker {index} crashed {self.crashes[index]} times in a row, "
+                  f"giving up on players {players}")
+        else:
+            print(f"Inference worker {index} crashed, restarting for players {players} in {delay:.1f}s")
+        worker.close()
+
+    def process(self, player_id, image):
+        with self.lock:
+            assigned = self.players.get(player_id)
+        if assigned is None:
+            self.register(player_id)
+            assigned = self.players[player_id]
+        worker = self._worker(assigned[0])
+        if worker is None:
+            return []
+        started = time.perf_counter()
+        try:
+            hands = worker.call('process', player_id, np.ascontiguousarray(image))
+        except WorkerCrashed as e:
+            print(e)
+            self._restart(assigned[0], worker)
+            return []
+        with self.lock:
+            self.timings[player_id].append((time.perf_counter() - started) * 1000)
+        return hands
+
+    def stats(self):
+        with self.lock:
+            players = {}
+            for player_id, (index, _) in self.players.items():
+                timings = list(self.timings.get(player_id, ()))
+                players[str(player_id)] = {
+                    'worker': index,
+                    'avg_inference_ms': round(sum(timings) / len(timings), 2) if timings else 0.0,
+                    'failed': self.failed[index]
+                }
+            return {
+                'workers': self.size if self.use_processes else 0,
+                'running': sum(1 for worker in self.workers if worker is not None and worker.alive()),
+                'restarts': self.restarts,
+                'failed_workers': [index for index in range(self.size) if self.failed[index]],
+                'players': players
+            }
+
+    def close(self):
+        with self.lock:
+            workers = [worker for worker in self.workers if worker is not None]
+            self.workers = [None] * self.size
+        for worker in workers:
+            worker.close()
+
+
+if __name__ == '__main__' and len(sys.argv) == 4 and sys.argv[1] == '--worker':
+    _worker_main(int(sys.argv[2]), int(sys.argv[3]))
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class AdaptiveScheduler:
+    # Decides at what resolution MediaPipe sees each frame. The Hands graph
+    # runs in tracking mode and carries the previous hand region over in
+    # normalized image coordinates, so it is always given the whole frame:
+    # cropping would move that region into another image's coordinates.
+    # Once tracking has been stable for a while the full frame is
+    # downscaled instead, as far as keeps the tracked hands at least
+    # min_hand_side pixels across. Missing every hand falls back to full
+    # resolution; losing only some of them keeps fitting the ones left.
+    def __init__(self, target_fps=30.0, tracking_scale=0.5, min_hand_side=96, stable_after=5, reacquire_after=2):
+        self.target_fps = target_fps
+        self.frame_budget = 1.0 / target_fps
+        self.tracking_scale = tracking_scale
+        self.min_hand_side = min_hand_side
+        self.stable_after = stable_after
+        self.reacquire_after = reacquire_after
+        self.hand_size = None
+        self.last_mode = 'full'
+        self.stable_frames = 0
+        self.misses = 0
+        self.last_seq = None
+        self.lock = threading.Lock()
+        self.processed = deque(maxlen=240)
+        self.counts = {'full': 0, 'scaled': 0, 'skipped': 0}
+        self.inference_ms = deque(maxlen=120)
+
+    def scale_for(self, width, height):
+        if self.hand_size is None or self.stable_frames < self.stable_after:
+            return 1.0
+        hand_side = min(self.hand_size[0] * width, self.hand_size[1] * height)
+        return max(self.tracking_scale, min(1.0, self.min_hand_side / max(hand_side, 1.0)))
+
+    def prepare(self, image):
+        # Returns the image to run inference on and the mode used. Landmarks
+        # come back normalized to the whole frame at either resolution, so
+        # they need no mapping afterwards.
+        height, width = image.shape[:2]
+        scale = self.scale_for(width, height)
+        if scale >= 1.0:
+            self.last_mode = 'full'
+            return image, 'full'
+        scaled = cv2.resize(image, (max(1, int(width * scale)), max(1, int(height * scale))),
+                            interpolation=cv2.INTER_AREA)
+        self.last_mode = 'scaled'
+        return scaled, 'scaled'
+
+    def update(self, hand_arrays):
+        # hand_arrays: list of (21, 3) normalized landmark arrays.
+        # Only a frame without any hand is a miss.
+        if not hand_arrays:
+            self.stable_frames = 0
+            self.misses += 1
+            if self.misses >= self.reacquire_after:
+                self.hand_size = None
+            return
+        self.misses = 0
+        # The smallest hand found decides how far the frame can shrink.
+        sizes = [np.ptp(np.asarray(hand)[:, :2], axis=0) for hand in hand_arrays]
+        smallest = min(sizes, key=lambda size: min(size[0], size[1]))
+        self.hand_size = (float(smallest[0]), float(smallest[1]))
+        self.stable_frames += 1
+
+    def record(self, seq, mode, inference_seconds, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if self.last_seq is not None and seq > self.last_seq + 1:
+                self.counts['skipped'] += seq - self.last_seq - 1
+            self.last_seq = seq
+            self.counts[mode] += 1
+            self.processed.append(now)
+            self.inference_ms.append(inference_seconds * 1000.0)
+
+    def pace(self, loop_started):
+        remaining = self.frame_budget - (time.monotonic() - loop_started)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def stats(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            recent = [t for t in self.processed if now - t <= 2.0]
+            fps = 0.0
+            if len(recent) > 1:
+                fps = (len(recent) - 1) / max(recent[-1] - recent[0], 1e-6)
+            return {
+                'target_fps': self.target_fps,
+                'achieved_fps': round(fps, 2),
+                'avg_inference_ms': round(sum(self.inference_ms) / len(self.inference_ms), 2) if self.inference_ms else 0.0,
+                'mode': self.last_mode,
+                'frames': dict(self.counts)
+            }
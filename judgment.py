@@ -0,0 +1,213 @@
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+# Seconds either side of a note's time for each result, tightest first.
+JUDGMENT_WINDOWS = (('perfect', 0.08), ('great', 0.15), ('good', 0.25))
+JUDGMENT_POINTS = {'perfect': 100, 'great': 75, 'good': 50, 'miss': 0}
+MAX_COMBO_MULTIPLIER = 5
+
+Judgment = namedtuple('Judgment', ['index', 'lane', 't', 'result', 'offset', 'points', 'score', 'combo',
+                                   'max_combo', 'hits', 'judged', 'total'])
+
+
+class JudgmentEngine:
+    # Judges gestures against a chart's notes. Notes are split per lane into
+    # sorted time arrays, so finding the note a gesture is aimed at is a
+    # bisect, and misses are swept with one cursor per lane. Scoring matches
+    # updateScore() in game.js: combo multiplier floor(combo / 10) + 1 up to
+    # 5, and a perfect-streak bonus of 25 per perfect after the second, capped
+    # at 100.
+    def __init__(self, notes, lane_gestures, windows=JUDGMENT_WINDOWS):
+        self.lane_gestures = list(lane_gestures)
+        self.windows = windows
+        self.max_window = windows[-1][1]
+        ordered = sorted(range(len(notes)), key=lambda i: notes[i]['t'])
+        self.lanes = [[] for _ in self.lane_gestures]
+        for idx in ordered:
+            lane = notes[idx]['lane']
+            if 0 <= lane < len(self.lanes):
+                self.lanes[lane].append(idx)
+        self.notes = notes
+        self.times = [[notes[idx]['t'] for idx in lane] for lane in self.lanes]
+        self.judged = [[False] * len(lane) for lane in self.lanes]
+        self.cursors = [0] * len(self.lanes)
+        self.hold_cursors = [0] * len(self.lanes)
+        self.total = sum(len(lane) for lane in self.lanes)
+        self.score = 0
+        self.combo = 0
+        self.max_combo = 0
+        self.perfect_streak = 0
+        self.hits = 0
+        self.judged_count = 0
+        self.counts = {result: 0 for result in JUDGMENT_POINTS}
+
+    def lane_for(self, gesture):
+        try:
+            return self.lane_gestures.index(gesture)
+        except ValueError:
+            return None
+
+    def _classify(self, offset):
+        for result, window in self.windows:
+            if abs(offset) <= window:
+                return result
+        return None
+
+    def _apply(self, lane, pos, result, offset):
+        self.judged[lane][pos] = True
+        self.judged_count += 1
+        self.counts[result] += 1
+        points = JUDGMENT_POINTS[result]
+        if points:
+            multiplier = min(self.combo // 10 + 1, MAX_COMBO_MULTIPLIER)
+            bonus = 0
+            if result == 'perfect':
+                self.perfect_streak += 1
+                if self.perfect_streak >= 3:
+                    bonus = min(25 * (self.perfect_streak - 2), 100)
+            else:
+                self.perfect_streak = 0
+            points = points * multiplier + bonus
+            self.score += points
+            self.combo += 1
+            self.hits += 1
+            self.max_combo = max(self.max_combo, self.combo)
+        else:
+            self.combo = 0
+            self.perfect_streak = 0
+        idx = self.lanes[lane][pos]
+        return Judgment(idx, lane, self.notes[idx]['t'], result, round(offset, 4), points, self.score,
+                        self.combo, self.max_combo, self.hits, self.judged_count, self.total)
+
+    def hit(self, gesture, song_time):
+        # A gesture starting at song_time takes the closest unjudged note in
+        # its lane within the widest window.
+        lane = self.lane_for(gesture)
+        if lane is None:
+            return None
+        times = self.times[lane]
+        start = bisect_left(times, song_time - self.max_window)
+        end = bisect_right(times, song_time + self.max_window)
+        best = None
+        for pos in range(start, end):
+            if not self.judged[lane][pos] and (best is None or
+                                               abs(times[pos] - song_time) < abs(times[best] - song_time)):
+                best = pos
+        if best is None:
+            return None
+        offset = song_time - times[best]
+        return self._apply(lane, best, self._classify(offset), offset)
+
+    def hold(self, gesture, since, song_time):
+        # Notes that reach the hit line while a gesture is already being held
+        # count, but only as "good": holding is not timing. Notes close enough
+        # to the start of the hold are left for hit() to judge properly. Every
+        # note before the lane's hold cursor has been judged by an earlier
+        # call, so a long hold only looks at notes that arrived since.
+        lane = self.lane_for(gesture)
+        if lane is None or song_time <= since + self.max_window:
+            return []
+        times = self.times[lane]
+        start = max(bisect_right(times, since + self.max_window), self.hold_cursors[lane])
+        end = bisect_right(times, song_time)
+        results = []
+        for pos in range(start, end):
+            if not self.judged[lane][pos]:
+                results.append(self._apply(lane, pos, 'good', song_time - times[pos]))
+        self.hold_cursors[lane] = max(self.hold_cursors[lane], end)
+        return results
+
+    def expire(self, song_time):
+        # Notes whose last chance was before song_time are misses.
+        results = []
+        for lane, times in enumerate(self.times):
+            pos = self.cursors[lane]
+            while pos < len(times) and times[pos] + self.max_window < song_time:
+                if not self.judged[lane][pos]:
+                    results.append(self._apply(lane, pos, 'miss', song_time - times[pos]))
+                pos += 1
+            self.cursors[lane] = pos
+        results.sort(key=lambda judgment: judgment.t)
+        return results
+
+    def finished(self):
+        return self.judged_count >= self.total
+
+    def summary(self):
+        return {
+            'score': self.score,
+            'combo': self.combo,
+            'max_combo': self.max_combo,
+            'hits': self.hits,
+            'judged': self.judged_count,
+            'total': self.total,
+            'accuracy': round(self.hits / self.total, 4) if self.total else 0.0,
+            'counts': dict(self.counts)
+        }
+
+
+class JudgmentSession:
+    # Maps server wall-clock times onto the song's audio clock from the
+    # position the client last reported, and feeds one player's gesture
+    # states into a JudgmentEngine. Gestures are judged at the time they
+    # started (the tracker's started_at), not when the tracker confirmed
+    # them, and misses wait `detection_grace` seconds so a late confirmation
+    # can still claim its note.
+    def __init__(self, player_id, song, level, engine, input_offset=0.0, detection_grace=0.3):
+        self.player_id = player_id
+        self.song = song
+        self.level = level
+        self.engine = engine
+        self.input_offset = input_offset
+        self.detection_grace = detection_grace
+        self.lock = threading.Lock()
+        self.anchor = None
+        self.paused = True
+        self.held = None
+        self.ended = False
+
+    def sync(self, song_time, wall_time, paused=False):
+        with self.lock:
+            self.anchor = (float(song_time), float(wall_time))
+            self.paused = bool(paused)
+
+    def song_time_at(self, wall_time):
+        if self.anchor is None:
+            return None
+        song_time, anchor_wall = self.anchor
+        if self.paused:
+            return song_time
+        return song_time + (wall_time - anchor_wall)
+
+    def update(self, gesture, started_wall, now_wall, changed):
+        with self.lock:
+            if self.ended or self.anchor is None or self.paused:
+                return []
+            started = self.song_time_at(started_wall) - self.input_offset
+            now = self.song_time_at(now_wall) - self.input_offset
+            results = []
+            if changed or self.held is None or self.held[0] != gesture:
+                self.held = (gesture, started)
+                judgment = self.engine.hit(gesture, started)
+                if judgment is not None:
+                    results.append(judgment)
+            results.extend(self.engine.hold(gesture, self.held[1], now))
+            results.extend(self.engine.expire(now - self.detection_grace))
+            # Every note judged: the song is over for this session.
+            if self.engine.finished():
+                self.ended = True
+            return results
+
+    def end(self):
+        with self.lock:
+            if not self.ended:
+                self.ended = True
+                if self.anchor is not None:
+                    self.engine.expire(float('inf'))
+            return self.engine.summary()
+
+    def summary(self):
+        with self.lock:
+            return dict(self.engine.summary(), player=self.player_id, song=self.song, level=self.level,
+                        ended=self.ended)
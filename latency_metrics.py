@@ -0,0 +1,80 @@
+import math
+import threading
+
+import numpy as np
+
+# Log-spaced bucket edges from 0.1 ms to 10 s, 20 buckets per decade, so any
+# percentile read back from the buckets is within about 12% of the true value.
+BUCKET_EDGES_MS = np.logspace(-1, 4, 101)
+
+
+class LatencyHistogram:
+    def __init__(self, edges=BUCKET_EDGES_MS):
+        self.edges = edges
+        self.counts = np.zeros(len(edges) + 1, dtype=np.int64)
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value_ms):
+        self.counts[int(np.searchsorted(self.edges, value_ms, side='right'))] += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def count(self):
+        return int(self.counts.sum())
+
+    def percentile(self, q):
+        count = self.count()
+        if not count:
+            return 0.0
+        rank = q / 100.0 * count
+        cumulative = np.cumsum(self.counts)
+        idx = int(np.searchsorted(cumulative, rank, side='left'))
+        if idx == 0:
+            return float(self.edges[0])
+        if idx >= len(self.edges):
+            return self.max
+        # Geometric midpoint of the bucket, capped by the largest value seen.
+        return min(self.max, float(math.sqrt(self.edges[idx - 1] * self.edges[idx])))
+
+    def summary(self):
+        count = self.count()
+        return {
+            'count': count,
+            'mean_ms': round(self.total / count, 2) if count else 0.0,
+            'p50_ms': round(self.percentile(50), 2),
+            'p95_ms': round(self.percentile(95), 2),
+            'p99_ms': round(self.percentile(99), 2),
+            'max_ms': round(self.max, 2)
+        }
+
+
+class LatencyMetrics:
+    # Named histograms, one per pipeline stage, shared by every feed and by
+    # the latency reports that clients send back.
+    def __init__(self, stages=()):
+        self.lock = threading.Lock()
+        self.order = list(stages)
+        self.histograms = {stage: LatencyHistogram() for stage in stages}
+
+    def record(self, stage, value_ms):
+        if value_ms is None or not math.isfinite(value_ms) or value_ms < 0:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+                self.order.append(stage)
+            histogram.record(value_ms)
+
+    def record_many(self, durations):
+        for stage, value_ms in durations.items():
+            self.record(stage, value_ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {stage: self.histograms[stage].summary() for stage in self.order}
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {stage: LatencyHistogram() for stage in self.order}
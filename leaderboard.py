@@ -0,0 +1,197 @@
+import atexit
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+
+from song_cache import write_json_atomic
+
+
+class Leaderboard:
+    # Keeps the global and per-song top-K scores in memory behind one lock, so
+    # a submission never reads or sorts the whole board. Every submission is
+    # appended to a journal right away; a background thread periodically writes
+    # one atomic snapshot of everything retained and drops the journal it
+    # covers. On startup the snapshot is loaded and any journals replayed, so
+    # scores submitted since the last snapshot survive a crash.
+    def __init__(self, path, top_k=100, flush_interval=1.0):
+        self.path = path
+        self.journal_path = f'{path}.journal'
+        self.rotated_path = f'{path}.journal.1'
+        self.top_k = top_k
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.counter = itertools.count()
+        self.global_heap = []
+        self.song_heaps = {}
+        self.dirty = False
+        self.submitted = 0
+        self.flushes = 0
+        self.stopped = threading.Event()
+        self.journal = open(self.journal_path, 'a')
+        self._load()
+        self.flusher = threading.Thread(target=self._flush_loop, name='leaderboard-flush', daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+
+    def _read_journal(self, path):
+        entries = []
+        if not os.path.exists(path):
+            return entries
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A torn line from a crash in the middle of an append.
+                    continue
+        return entries
+
+    def _load(self):
+        entries = []
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading leaderboard snapshot {self.path}: {e}")
+        replayed = self._read_journal(self.rotated_path) + self._read_journal(self.journal_path)
+        # A crash between writing the snapshot and removing the rotated journal
+        # would replay entries the snapshot already holds, so skip exact repeats.
+        seen = set()
+        for entry in entries + replayed:
+            key = (entry.get('player'), entry.get('score'), entry.get('song'), entry.get('timestamp'))
+            if key in seen or not self._valid_score(entry.get('score')):
+                continue
+            seen.add(key)
+            entry.setdefault('timestamp', 0)
+            self._insert(entry)
+        if replayed or os.path.getsize(self.journal_path) or os.path.exists(self.rotated_path):
+            print(f"Recovered {len(replayed)} leaderboard entries from journal")
+            self.dirty = True
+            self.flush()
+
+    @staticmethod
+    def _valid_score(score):
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            return False
+        return math.isfinite(score)
+
+    def _push(self, heap, item):
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def _insert(self, entry):
+        # Higher score ranks first; ties go to the earlier submission. The
+        # counter keeps items comparable without ever comparing the dicts.
+        item = (entry['score'], -entry['timestamp'], -next(self.counter), entry)
+        self._push(self.global_heap, item)
+        song = entry.get('song')
+        if song is not None:
+            self._push(self.song_heaps.setdefault(song, []), item)
+
+    def submit(self, player, score, song, timestamp=None, verified=False):
+        if not self._valid_score(score):
+            raise ValueError(f"Score must be a finite number, got {score!r}")
+        entry = {
+            'player': player,
+            'score': score,
+            'song': song,
+            'timestamp': time.time() if timestamp is None else timestamp
+        }
+        if verified:
+            # Scored by the server's judgment session rather than reported by the page.
+            entry['verified'] = True
+        line = json.dumps(entry) + '\n'
+        with self.lock:
+            # Written through to the OS on every submit so a process crash
+            # cannot lose it; the snapshot write is what fsyncs.
+            self.journal.write(line)
+            self.journal.flush()
+            self._insert(entry)
+            self.dirty = True
+            self.submitted += 1
+        return entry
+
+    def query(self, song=None, limit=10, offset=0, since=None, until=None):
+        # Time windows filter the retained top-K of the board, so a window
+        # shows the best scores set in it that are still on the board.
+        with self.lock:
+            items = list(self.global_heap if song is None else self.song_heaps.get(song, []))
+        entries = [item[-1] for item in sorted(items, reverse=True)]
+        if since is not None:
+            entries = [entry for entry in entries if entry['timestamp'] >= since]
+        if until is not None:
+            entries = [entry for entry in entries if entry['timestamp'] < until]
+        return [dict(entry) for entry in entries[offset:offset + limit]], len(entries)
+
+    def songs(self):
+        with self.lock:
+            return sorted(self.song_heaps)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'top_k': self.top_k,
+                'songs': len(self.song_heaps),
+                'global_entries': len(self.global_heap),
+                'submitted': self.submitted,
+                'flushes': self.flushes,
+                'dirty': self.dirty
+            }
+
+    def _snapshot(self):
+        retained = {}
+        for item in itertools.chain(self.global_heap, *self.song_heaps.values()):
+            retained[id(item[-1])] = item
+        return [item[-1] for item in sorted(retained.values(), reverse=True)]
+
+    def _rotate_journal(self):
+        self.journal.close()
+        if os.path.exists(self.rotated_path):
+            # The previous snapshot failed, so keep its journal and add to it.
+            with open(self.journal_path, 'r') as src, open(self.rotated_path, 'a') as dst:
+                dst.write(src.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.rotated_path)
+        self.journal = open(self.journal_path, 'a')
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                if not self.dirty:
+                    return False
+                snapshot = self._snapshot()
+                self._rotate_journal()
+                self.dirty = False
+            try:
+                write_json_atomic(self.path, snapshot)
+            except OSError as e:
+                print(f"Error writing leaderboard snapshot: {e}")
+                with self.lock:
+                    self.dirty = True
+                return False
+            os.remove(self.rotated_path)
+            with self.lock:
+                self.flushes += 1
+            return True
+
+    def _flush_loop(self):
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        self.flusher.join()
+        self.flush()
+        with self.lock:
+            self.journal.close()
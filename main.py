@@ -1,56 +1,96 @@
-import cv2
-import mediapipe as mp
+import os
+from server_runtime import ServerRuntime, patch_for_mode
+
+# Green networking has to be in place before Flask and Socket.IO import socket.
+SERVER_MODE = os.environ.get('GESTURE_SERVER_MODE', 'threading')
+patch_for_mode(SERVER_MODE)
+
 import numpy as np
 import threading
 import time
-import json
-import os
 import random
 import webbrowser
 from flask import Flask, Response, request, send_from_directory, jsonify
 import logging
-import yt_dlp
-import librosa
-import sounddevice as sd
 import re
-from flask_socketio import SocketIO, emit
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from frame_bus import FrameBus
+from gestures import GestureTracker, classify_landmarks, landmarks_to_array
+from song_cache import AnalysisCache
+from song_assets import SongAssets
+from static_assets import StaticAssets, precompress
+from song_jobs import QueueFull, SongJobQueue
+from pattern_store import PatternStore
+from leaderboard import Leaderboard
+from search_service import RateLimited, SearchService
+from inference_pool import InferencePool
+from hand_assignment import HandAssigner
+from latency_metrics import LatencyMetrics
+from judgment import JudgmentEngine, JudgmentSession
+from calibration import CalibrationProfiles, CalibrationRecorder, estimate_offsets
 
 logging.getLogger('mediapipe').setLevel(logging.ERROR)
 
-app = Flask(__name__)
-socketio = SocketIO(app, cors_allowed_origins="*")
-
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
-hands = mp_hands.Hands(max_num_hands=1, min_detection_confidence=0.7, min_tracking_confidence=0.5)
+# /static is served by StaticAssets below, with content ETags and fingerprints.
+app = Flask(__name__, static_folder=None)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=SERVER_MODE)
+runtime = ServerRuntime(socketio, SERVER_MODE)
 
 WEBCAM_WIDTH = 640
 WEBCAM_HEIGHT = 480
-PORT = 8000
+PORT = int(os.environ.get('GESTURE_PORT', '8000'))
+OPEN_BROWSER = os.environ.get('GESTURE_OPEN_BROWSER', '1') != '0'
+FRAME_SOURCE = os.environ.get('GESTURE_FRAME_SOURCE', 'camera:0')
+# One source per player station, e.g. "camera:0,camera:1"; players are numbered from 1.
+FRAME_SOURCES = [spec.strip() for spec in os.environ.get('GESTURE_FRAME_SOURCES', FRAME_SOURCE).split(',') if spec.strip()]
+# Players sharing each camera, one hand per player (e.g. 2 for two players at one station).
+PLAYERS_PER_CAMERA = max(1, int(os.environ.get('GESTURE_PLAYERS_PER_CAMERA', '1')))
+INFERENCE_WORKERS = int(os.environ['INFERENCE_WORKERS']) if os.environ.get('INFERENCE_WORKERS') else None
+GESTURE_WINDOW = 5
+GESTURE_ENTER_RATIO = 0.6
+GESTURE_EXIT_RATIO = 0.4
+INFERENCE_TARGET_FPS = 30
+GESTURE_HEARTBEAT_INTERVAL = 1.0
+SONG_JOB_WORKERS = 2
+PREVIEW_MAX_FPS = 15
+# Running feeds nobody uses go to warm standby (camera open, threads parked);
+# standby feeds left alone long enough release the camera.
+CAMERA_IDLE_STANDBY = 60.0
+CAMERA_STANDBY_RELEASE = 600.0
+CAMERA_WATCHDOG_INTERVAL = 5.0
+CAMERA_FAILURES_BEFORE_RECONNECT = 10
+CAMERA_RETRY_MIN = 0.5
+CAMERA_RETRY_MAX = 10.0
 
-os.makedirs('static/css', exist_ok=True)
-os.makedirs('static/js', exist_ok=True)
-os.makedirs('static/songs', exist_ok=True)
-os.makedirs('static/sounds', exist_ok=True)
-os.makedirs('static/images', exist_ok=True)
+ANALYSIS_PARAMS = {'sr': 22050, 'hop_length': 512, 'mode': os.environ.get('SONG_ANALYSIS_MODE', 'auto'), 'version': 2}
+STREAMING_ANALYSIS_MIN_SECONDS = 480
+PATTERNS_DB = 'static/songs/patterns.db'
+SONG_ASSETS_DIR = 'static/songs/.assets'
+SONG_PREVIEW_KBPS = int(os.environ.get('SONG_PREVIEW_KBPS', '0'))
+PRECOMPRESS_STATIC = os.environ.get('GESTURE_PRECOMPRESS', '1') != '0'
+LEADERBOARD_TOP_K = 100
+# Stores and pools are built by create_app(), so importing this module only
+# defines the app; cameras and hand tracking wait for the first game session.
+analysis_cache = None
+song_assets = None
+static_assets = None
+pattern_store = None
+calibration_profiles = None
+leaderboard = None
+search_service = None
+inference_pool = None
+song_jobs = None
+startup = {'imported_at': time.time(), 'created_at': None, 'create_ms': None}
+# Server stages run from cap.read() to socketio.emit(); the client reports the
+# network hop and its own judgment time back through POST /debug/metrics.
+LATENCY_STAGES = ['capture', 'queue', 'inference', 'classify', 'emit', 'server_total',
+                  'network', 'client_judgment', 'end_to_end']
+latency_metrics = LatencyMetrics(LATENCY_STAGES)
 
 def detect_gesture(hand_landmarks):
     if not hand_landmarks:
         return "none"
-    landmarks = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
-    if (landmarks[8][1] < landmarks[5][1] and landmarks[12][1] < landmarks[9][1] and
-        landmarks[16][1] > landmarks[13][1] and landmarks[20][1] > landmarks[17][1]):
-        return "peace"
-    if (landmarks[8][1] < landmarks[5][1] and landmarks[12][1] > landmarks[9][1] and
-        landmarks[16][1] > landmarks[13][1] and landmarks[20][1] > landmarks[17][1]):
-        return "index"
-    if (landmarks[8][1] > landmarks[5][1] and landmarks[12][1] > landmarks[9][1] and
-        landmarks[16][1] > landmarks[13][1] and landmarks[20][1] > landmarks[17][1]):
-        return "fist"
-    if (landmarks[8][1] < landmarks[5][1] and landmarks[12][1] < landmarks[9][1] and
-        landmarks[16][1] < landmarks[13][1] and landmarks[20][1] < landmarks[17][1]):
-        return "open_hand"
-    return "none"
+    return classify_landmarks(landmarks_to_array(hand_landmarks))
 
 def sanitize_filename(filename):
     return re.sub(r'[<>:"/\\|?*]', '_', filename).strip()
@@ -66,11 +106,62 @@ def estimate_difficulty(bpm, duration):
     else:
         return {'level': 'Expert', 'multiplier': 2.0}
 
-def generate_patterns(song_name, bpm, duration, difficulty_multiplier):
-    gestures = ["peace", "index", "fist", "open_hand"]
-    total_beats = int((bpm / 60) * duration * difficulty_multiplier)
-    sequence = [random.choice(gestures) for _ in range(total_beats)]
-    return {song_name: sequence}
+# Lane order matches GESTURE_LANE_MAP in static/js/game.js.
+CHART_LANES = ["fist", "peace", "index", "open_hand"]
+CHART_LEVELS = {
+    'easy': {'beat_step': 4, 'min_gap': 1.5, 'onsets': False},
+    'medium': {'beat_step': 2, 'min_gap': 0.75, 'onsets': False},
+    'hard': {'beat_step': 1, 'min_gap': 0.35, 'onsets': False},
+    'expert': {'beat_step': 1, 'min_gap': 0.25, 'onsets': True}
+}
+CHART_VERSION = 2
+
+def thin_times(times, min_gap):
+    kept = []
+    for t in times:
+        if not kept or t - kept[-1] >= min_gap:
+            kept.append(t)
+    return kept
+
+def generate_chart(song_name, song_data):
+    # Each note is {'t': seconds into the song, 'lane': 0-3, 'gesture': name}
+    # and may carry an optional 'duration' in seconds for held notes.
+    beat_times = sorted(song_data.get('beat_times') or [])
+    onset_times = sorted(song_data.get('onset_times') or [])
+    if not beat_times and song_data.get('bpm'):
+        period = 60.0 / song_data['bpm']
+        beat_times = [i * period for i in range(int(song_data['duration'] / period))]
+    rng = random.Random(song_name)
+    levels = {}
+    for level, settings in CHART_LEVELS.items():
+        times = beat_times[::settings['beat_step']]
+        if settings['onsets'] and beat_times:
+            times = sorted(set(times) | set(onset_times))
+        notes = []
+        previous_lanes = []
+        for t in thin_times(times, settings['min_gap']):
+            lane = rng.randrange(len(CHART_LANES))
+            if previous_lanes[-2:] == [lane, lane]:
+                lane = (lane + rng.randrange(1, len(CHART_LANES))) % len(CHART_LANES)
+            previous_lanes.append(lane)
+            notes.append({'t': round(float(t), 3), 'lane': lane, 'gesture': CHART_LANES[lane]})
+        levels[level] = notes
+    return {
+        'version': CHART_VERSION,
+        'bpm': round(float(song_data['bpm']), 2),
+        'duration': round(float(song_data['duration']), 2),
+        'default_level': song_data['difficulty']['level'].lower(),
+        'levels': levels
+    }
+
+def is_chart(pattern):
+    return isinstance(pattern, dict) and pattern.get('version') == CHART_VERSION
+
+def pattern_gestures(pattern):
+    if is_chart(pattern):
+        level = pattern['levels'].get(pattern.get('default_level')) or next(iter(pattern['levels'].values()), [])
+        return [note['gesture'] for note in level]
+    return pattern
 
 def cleanup_temp_files(temp_dir):
     try:
@@ -86,49 +177,57 @@ def cleanup_temp_files(temp_dir):
         pass
 
 def search_youtube_songs(query):
-    ydl_opts = {
-        'format': 'bestaudio',
-        'noplaylist': True,
-        'quiet': True,
-        'noprogress': True,
-        'extract_flat': True,
-        'force_generic_extractor': False,
-        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    }
     try:
-        time.sleep(1)
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            search_query = f"ytsearch5:{query}"
-            result = ydl.extract_info(search_query, download=False)
-            videos = result.get('entries', [])
-            return [{'title': video['title'], 'id': video['id']} for video in videos]
+        return [{'title': video['title'], 'id': video['id']} for video in search_service.search(query, limit=5)]
+    except RateLimited:
+        raise
     except Exception as e:
         print(f"Error searching YouTube: {e}")
         return []
 
-def download_song(video_id, song_name):
-    sanitized_song_name = sanitize_filename(song_name)
-    file_path = f'static/songs/{sanitized_song_name}.mp3'
-    temp_dir = 'static/songs'
+def analyze_song(file_path):
+    # librosa (and numba behind it) loads with the first song analysed.
+    import librosa
+    from audio_analysis import analyze_streaming, probe_duration
+    mode = ANALYSIS_PARAMS['mode']
+    if mode == 'auto':
+        duration = probe_duration(file_path)
+        mode = 'streaming' if duration is None or duration > STREAMING_ANALYSIS_MIN_SECONDS else 'full'
+    if mode == 'streaming':
+        analysis = analyze_streaming(file_path)
+        analysis['difficulty'] = estimate_difficulty(analysis['bpm'], analysis['duration'])
+        return analysis
 
-    cleanup_temp_files(temp_dir)
+    y, sr = librosa.load(file_path, sr=ANALYSIS_PARAMS['sr'])
+    tempo, beat_frames = librosa.beat.beat_track(y=y, sr=sr, hop_length=ANALYSIS_PARAMS['hop_length'])
+    tempo = float(np.atleast_1d(tempo)[0])
+    duration = float(librosa.get_duration(y=y, sr=sr))
+    beat_times = librosa.frames_to_time(beat_frames, sr=sr, hop_length=ANALYSIS_PARAMS['hop_length'])
+    onset_times = librosa.onset.onset_detect(y=y, sr=sr, hop_length=ANALYSIS_PARAMS['hop_length'], units='time')
+    return {
+        'bpm': tempo,
+        'duration': duration,
+        'beat_frames': [int(frame) for frame in beat_frames],
+        'beat_times': [round(float(t), 4) for t in beat_times],
+        'onset_times': [round(float(t), 4) for t in onset_times],
+        'sr': sr,
+        'hop_length': ANALYSIS_PARAMS['hop_length'],
+        'difficulty': estimate_difficulty(tempo, duration)
+    }
 
-    if os.path.exists(file_path):
-        print(f"Song {song_name} already downloaded")
-        try:
-            y, sr = librosa.load(file_path)
-            tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-            duration = librosa.get_duration(y=y, sr=sr)
-            difficulty = estimate_difficulty(float(tempo), float(duration))
-            return {
-                'bpm': float(tempo),
-                'duration': float(duration),
-                'difficulty': difficulty,
-                'file': f'/songs/{sanitized_song_name}.mp3'
-            }
-        except Exception as e:
-            print(f"Error analyzing existing song {song_name}: {e}")
-            raise
+def get_song_analysis(file_path):
+    return analysis_cache.get_or_compute(file_path, ANALYSIS_PARAMS, analyze_song)
+
+def fetch_youtube_audio(video_id, sanitized_song_name, progress=None):
+    def on_download(status):
+        if progress and status.get('status') == 'downloading':
+            total = status.get('total_bytes') or status.get('total_bytes_estimate')
+            if total:
+                progress('downloading', 60 * status.get('downloaded_bytes', 0) / total)
+
+    def on_postprocess(status):
+        if progress and status.get('status') == 'started':
+            progress('converting', 60)
 
     ydl_opts = {
         'format': 'bestaudio/best',
@@ -144,12 +243,44 @@ def download_song(video_id, song_name):
             'preferredcodec': 'mp3',
             'preferredquality': '192',
         }],
+        'progress_hooks': [on_download],
+        'postprocessor_hooks': [on_postprocess],
     }
+    import yt_dlp
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        print(f"Downloading song: {sanitized_song_name} (ID: {video_id})")
+        ydl.download([f"https://www.youtube.com/watch?v={video_id}"])
+
+def download_song(video_id, song_name, progress=None, fetch_audio=None):
+    sanitized_song_name = sanitize_filename(song_name)
+    file_path = f'static/songs/{sanitized_song_name}.mp3'
+    temp_dir = 'static/songs'
+    fetch_audio = fetch_audio or fetch_youtube_audio
+
+    cleanup_temp_files(temp_dir)
+
+    if os.path.exists(file_path):
+        print(f"Song {song_name} already downloaded")
+        try:
+            if progress:
+                progress('analyzing', 70)
+            analysis = get_song_analysis(file_path)
+            return {
+                'bpm': analysis['bpm'],
+                'duration': analysis['duration'],
+                'difficulty': analysis['difficulty'],
+                'beat_times': analysis['beat_times'],
+                'onset_times': analysis.get('onset_times', []),
+                'file': f'/songs/{sanitized_song_name}.mp3'
+            }
+        except Exception as e:
+            print(f"Error analyzing existing song {song_name}: {e}")
+            raise
+
     try:
-        time.sleep(1)
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            print(f"Downloading song: {song_name} (Sanitized: {sanitized_song_name}, ID: {video_id})")
-            ydl.download([f"https://www.youtube.com/watch?v={video_id}"])
+        if progress:
+            progress('downloading', 0)
+        fetch_audio(video_id, sanitized_song_name, progress)
 
         if not os.path.exists(file_path):
             for file in os.listdir(temp_dir):
@@ -161,34 +292,101 @@ def download_song(video_id, song_name):
             if not os.path.exists(file_path):
                 raise Exception(f"Downloaded file not found for {song_name}")
 
-        y, sr = librosa.load(file_path)
-        tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-        duration = librosa.get_duration(y=y, sr=sr)
+        if progress:
+            progress('analyzing', 70)
+        analysis = get_song_analysis(file_path)
     except Exception as e:
         print(f"Error downloading or analyzing song {song_name}: {e}")
         raise
     
-    difficulty = estimate_difficulty(float(tempo), float(duration))
     return {
-        'bpm': float(tempo),
-        'duration': float(duration),
-        'difficulty': difficulty,
+        'bpm': analysis['bpm'],
+        'duration': analysis['duration'],
+        'difficulty': analysis['difficulty'],
+        'beat_times': analysis['beat_times'],
+        'onset_times': analysis.get('onset_times', []),
         'file': f'/songs/{sanitized_song_name}.mp3'
     }
 
+def player_room(player_id):
+    return f'player_{player_id}'
+
 class WebcamFeed:
-    def __init__(self, player_id):
+    # One camera and one inference pipeline. With several players the feed
+    # tracks one hand per player and each player gets their own gesture stream;
+    # player_id is the first of them and owns the camera.
+    #
+    # Lifecycle: stopped -> running -> standby -> running ... -> stopped.
+    # Standby keeps the camera and the hand-tracking graph up and parks both
+    # threads on an event, so it costs no CPU and resuming is just setting it.
+    # Threads carry the generation they were started for and exit as soon as
+    # it changes, so a restart never leaves an old loop running.
+    def __init__(self, player_id, source=None, pool=None, players=None):
+        # OpenCV comes in with the camera modules, on the first feed rather
+        # than at import.
+        from frame_sources import open_frame_source
+        from inference_scheduler import AdaptiveScheduler
+        from preview_encoder import PreviewEncoder
         self.player_id = player_id
-        cam_index = 0
-        self.cap = cv2.VideoCapture(cam_index)
-        self.current_gesture = "none"
+        self.players = list(players or [player_id])
+        self.pool = pool or inference_pool
+        self.source_spec = source
+        self.source_factory = None
+        if source is None or isinstance(source, str):
+            # Opened by start(), so creating a feed never touches the device.
+            self.source_factory = lambda: open_frame_source(source or FRAME_SOURCE)
+            self.cap = None
+        else:
+            self.cap = source
+        self.current_gestures = {player: "none" for player in self.players}
+        self.gesture_states = {player: None for player in self.players}
+        self.trackers = {player: GestureTracker(GESTURE_WINDOW, GESTURE_ENTER_RATIO, GESTURE_EXIT_RATIO)
+                         for player in self.players}
+        self.last_emits = {player: 0.0 for player in self.players}
+        self.assigner = HandAssigner(self.players) if len(self.players) > 1 else None
+        self.scheduler = AdaptiveScheduler(INFERENCE_TARGET_FPS)
+        self.last_frame = (0, None)
+        self.last_stages = {}
         self.lock = threading.Lock()
-        if not self.cap.isOpened():
-            print(f"Error: Could not open webcam for player {player_id} (index {cam_index})")
+        self.bus = FrameBus()
+        self.hands = []
+        self.preview = PreviewEncoder(self.bus, PREVIEW_MAX_FPS, landmarks=self.get_landmarks,
+                                      poll_sleep=runtime.sleep if runtime.green else None)
+        self.lifecycle_lock = threading.Lock()
+        self.state = 'stopped'
+        self.state_since = time.monotonic()
+        self.last_active = time.monotonic()
+        self.generation = 0
+        self.threads = []
+        self.active = threading.Event()
+        self.stopping = threading.Event()
+        self.read_failures = 0
+        self.reconnects = 0
+
+    def _open_source(self):
+        source = self.source_factory()
+        source_name = source.describe() if hasattr(source, 'describe') else 'capture'
+        player_names = ', '.join(str(player) for player in self.players)
+        if not source.isOpened():
+            print(f"Error: Could not open frame source for player {player_names} ({source_name})")
         else:
-            print(f"Webcam {player_id} (index {cam_index}) opened successfully")
+            print(f"Frame source for player {player_names} ({source_name}) opened successfully")
+        return source
+
+    def _set_state(self, state):
+        self.state = state
+        self.state_since = time.monotonic()
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def in_use(self):
+        return self.preview.viewer_count() > 0 or any(
+            session is not None and not session.ended
+            for session in (judgment_sessions.get(player) for player in self.players))
 
     def read_frame(self):
+        import cv2
         ret, frame = self.cap.read()
         if not ret:
             return None
@@ -196,62 +394,394 @@ class WebcamFeed:
         frame = cv2.flip(frame, 1)
         return frame
 
-    def process_gestures(self):
-        while True:
+    def start(self):
+        self.touch()
+        with self.lifecycle_lock:
+            if self.state == 'running':
+                return
+            if self.state == 'standby':
+                self._set_state('running')
+                self.active.set()
+                return
+            if self.cap is None and self.source_factory is not None:
+                self.cap = self._open_source()
+            self.pool.register(self.player_id, max_num_hands=len(self.players))
+            self.generation += 1
+            self.stopping.clear()
+            self.active.set()
+            self.threads = [
+                threading.Thread(target=self.capture_frames, args=(self.generation,), daemon=True,
+                                 name=f'capture-{self.player_id}'),
+                threading.Thread(target=self.process_gestures, args=(self.generation,), daemon=True,
+                                 name=f'gestures-{self.player_id}')
+            ]
+            for thread in self.threads:
+                thread.start()
+            self._set_state('running')
+
+    def pause(self):
+        with self.lifecycle_lock:
+            if self.state == 'running':
+                self.active.clear()
+                self._set_state('standby')
+
+    def stop(self):
+        with self.lifecycle_lock:
+            if self.state == 'stopped':
+                return
+            self.generation += 1
+            self.stopping.set()
+            self.active.set()
+            for thread in self.threads:
+                thread.join(timeout=2.0)
+                if thread.is_alive():
+                    print(f"Warning: {thread.name} did not stop within 2s")
+            self.threads = []
+            self.pool.unregister(self.player_id)
+            if self.cap is not None and self.source_factory is not None:
+                self.cap.release()
+                self.cap = None
+            self._set_state('stopped')
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def _reconnect(self, generation, delay):
+        player_names = ', '.join(str(player) for player in self.players)
+        print(f"Frame source for player {player_names} stopped delivering frames, reconnecting in {delay:.1f}s")
+        if self.stopping.wait(delay) or self.generation != generation or self.source_factory is None:
+            return
+        self.cap.release()
+        self.cap = self._open_source()
+        self.reconnects += 1
+
+    def capture_frames(self, generation):
+        failures = 0
+        retry_delay = CAMERA_RETRY_MIN
+        while self.generation == generation:
+            if not self.active.is_set():
+                self.active.wait(timeout=1.0)
+                continue
+            started = time.monotonic()
             frame = self.read_frame()
             if frame is None:
+                # A dead or unplugged camera fails every read instantly; wait
+                # a frame between reads, then reopen it with growing delays.
+                failures += 1
+                self.read_failures += 1
+                if failures < CAMERA_FAILURES_BEFORE_RECONNECT:
+                    self.stopping.wait(1.0 / INFERENCE_TARGET_FPS)
+                    continue
+                self._reconnect(generation, retry_delay)
+                retry_delay = min(retry_delay * 2, CAMERA_RETRY_MAX)
+                failures = 0
                 continue
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = hands.process(rgb_frame)
-            gesture = "none"
-            if results.multi_hand_landmarks:
-                for hand_landmarks in results.multi_hand_landmarks:
-                    gesture = detect_gesture(hand_landmarks)
-                    mp_drawing.draw_landmarks(frame, hand_landmarks, mp_hands.HAND_CONNECTIONS)
-            with self.lock:
-                self.current_gesture = gesture
-                
+            failures = 0
+            retry_delay = CAMERA_RETRY_MIN
+            read_at = time.monotonic()
+            # Recorded with the other stages once the frame is processed.
+            self.bus.publish(frame, timestamp=read_at, capture_ms=(read_at - started) * 1000)
+
+    def assign_hands(self, results, hand_arrays, timestamp):
+        if self.assigner is None:
+            return {self.player_id: hand_arrays[-1]} if hand_arrays else {}
+        assignments = self.assigner.assign(
+            [(landmarks, hand.handedness) for landmarks, hand in zip(hand_arrays, results)], timestamp)
+        return {player: hand_arrays[idx] for player, idx in assignments.items()}
+
+    def process_gestures(self, generation):
+        last_seq = 0
+        while self.generation == generation:
+            frame = self.bus.wait_for(last_seq, timeout=0.25)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            loop_started = time.monotonic()
+            image, mode = self.scheduler.prepare(frame.image)
             try:
-                socketio.emit('gesture', {'player': self.player_id, 'gesture': gesture})
+                results = self.pool.process(self.player_id, image)
             except Exception as e:
-                print(f"Error sending gesture via SocketIO: {e}")
+                print(f"Inference failed for player {self.player_id}: {e}")
+                results = []
+            inferred_at = time.monotonic()
+            self.scheduler.record(frame.seq, mode, inferred_at - loop_started)
+            hand_arrays = [hand.landmarks for hand in results]
+            self.scheduler.update(hand_arrays)
+            player_hands = self.assign_hands(results, hand_arrays, frame.timestamp)
+            states = {}
+            for player in self.players:
+                hand = player_hands.get(player)
+                gesture = classify_landmarks(hand) if hand is not None else "none"
+                states[player] = self.trackers[player].update(gesture, frame.timestamp)
+            stages = {
+                'capture': frame.capture_ms or 0.0,
+                'queue': (loop_started - frame.timestamp) * 1000,
+                'inference': (inferred_at - loop_started) * 1000,
+                'classify': (time.monotonic() - inferred_at) * 1000
+            }
+            latency_metrics.record_many(stages)
+            with self.lock:
+                for player, state in states.items():
+                    self.current_gestures[player] = state.gesture
+                    self.gesture_states[player] = state
+                self.last_frame = (frame.seq, frame.timestamp)
+                self.last_stages = stages
+                self.hands = hand_arrays
+
+            self.judge_gestures(states, frame.timestamp)
+
+            now = time.monotonic()
+            for player, state in states.items():
+                if state.changed or now - self.last_emits[player] >= GESTURE_HEARTBEAT_INTERVAL:
+                    self.last_emits[player] = now
+                    try:
+                        emit_started = time.monotonic()
+                        runtime.emit('gesture', self.gesture_payload(player, heartbeat=not state.changed),
+                                     to=player_room(player))
+                        emitted_at = time.monotonic()
+                        latency_metrics.record('emit', (emitted_at - emit_started) * 1000)
+                        latency_metrics.record('server_total',
+                                               (emitted_at - frame.timestamp) * 1000 + stages['capture'])
+                    except Exception as e:
+                        print(f"Error sending gesture via SocketIO: {e}")
                 
-            time.sleep(0.03)
+            self.scheduler.pace(loop_started)
+
+    def judge_gestures(self, states, captured_at):
+        wall_offset = time.time() - time.monotonic()
+        for player, state in states.items():
+            started_at = state.started_at if state.started_at is not None else captured_at
+            recorder = calibration_recorders.get(player)
+            if recorder is not None and state.changed:
+                recorder.record(state.gesture, started_at + wall_offset)
+            session = judgment_sessions.get(player)
+            if session is None:
+                continue
+            for judgment in session.update(state.gesture, started_at + wall_offset, captured_at + wall_offset,
+                                           state.changed):
+                try:
+                    runtime.emit('judgment', dict(judgment._asdict(), player=player), to=player_room(player))
+                except Exception as e:
+                    print(f"Error sending judgment via SocketIO: {e}")
+
+    def gesture_payload(self, player=None, heartbeat=False):
+        player = self.player_id if player is None else player
+        with self.lock:
+            state = self.gesture_states[player]
+            gesture = self.current_gestures[player]
+            seq, captured_at = self.last_frame
+            stages = self.last_stages
+        sent_at = time.monotonic()
+        payload = {
+            'player': player,
+            'gesture': gesture,
+            'confidence': 0.0,
+            'started_at': None,
+            'seq': seq,
+            'captured_at': captured_at,
+            'sent_at': sent_at,
+            'sent_wall': time.time(),
+            'server_ms': round((sent_at - captured_at) * 1000 + stages.get('capture', 0.0), 2)
+            if captured_at is not None else None,
+            'stages': {stage: round(value, 2) for stage, value in stages.items()},
+            'heartbeat': heartbeat
+        }
+        if state is not None:
+            payload['confidence'] = round(state.confidence, 3)
+            payload['started_at'] = state.started_at
+        return payload
 
-    def get_gesture(self):
+    def get_gesture(self, player=None):
         with self.lock:
-            return self.current_gesture
+            return self.current_gestures[self.player_id if player is None else player]
 
-    def generate_feed(self):
-        while True:
-            frame = self.read_frame()
-            if frame is None:
-                continue
-            _, buffer = cv2.imencode('.jpg', frame)
-            yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+    def get_landmarks(self):
+        with self.lock:
+            return self.hands
+
+    def generate_feed(self, overlay=False):
+        return self.preview.stream(overlay=overlay)
+
+    def lifecycle(self):
+        return {
+            'players': self.players,
+            'state': self.state,
+            'state_seconds': round(time.monotonic() - self.state_since, 1),
+            'idle_seconds': round(time.monotonic() - self.last_active, 1),
+            'opened': self.cap is not None and self.cap.isOpened(),
+            'frames': self.last_frame[0],
+            'read_failures': self.read_failures,
+            'reconnects': self.reconnects,
+            'threads': sum(1 for thread in self.threads if thread.is_alive())
+        }
 
     def release(self):
-        self.cap.release()
+        self.stop()
+        self.preview.close()
+        self.bus.close()
+
+judgment_sessions = {}
+# The socket that started each player's session, so a page that goes away
+# mid-game ends its session instead of pinning the camera in use.
+judgment_owners = {}
+calibration_recorders = {}
+
+def get_judgment_session(player):
+    if get_feed(player) is None:
+        return None
+    return judgment_sessions.get(int(player))
+
+def create_feeds(sources, players_per_camera):
+    # Players are numbered across cameras: with two sources and two players
+    # per camera, camera 0 serves players 1 and 2 and camera 1 serves 3 and 4.
+    created = {}
+    for idx, source in enumerate(sources):
+        players = [idx * players_per_camera + offset + 1 for offset in range(players_per_camera)]
+        feed = WebcamFeed(players[0], source, players=players)
+        for player in players:
+            created[player] = feed
+    return created
+
+def unique_feeds():
+    return list({id(feed): feed for feed in feeds.values()}.values())
+
+feeds = {}
+feeds_lock = threading.Lock()
+
+def ensure_feeds():
+    # Every configured feed exists from the first camera request on, but
+    # each camera only opens when its own player starts it.
+    with feeds_lock:
+        if feeds:
+            return
+        feeds.update(create_feeds(FRAME_SOURCES, PLAYERS_PER_CAMERA))
+        threading.Thread(target=camera_watchdog, daemon=True, name='camera-watchdog').start()
 
-feeds = {1: WebcamFeed(1)}
-threading.Thread(target=feeds[1].process_gestures, daemon=True).start()
+def start_feeds():
+    ensure_feeds()
+    started = time.perf_counter()
+    for feed in unique_feeds():
+        feed.start()
+    print(f"Started {len(FRAME_SOURCES)} frame source(s) in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+def camera_watchdog():
+    while True:
+        time.sleep(CAMERA_WATCHDOG_INTERVAL)
+        now = time.monotonic()
+        for feed in unique_feeds():
+            if feed.in_use():
+                feed.touch()
+            elif feed.state == 'running' and now - feed.last_active > CAMERA_IDLE_STANDBY:
+                print(f"Players {feed.players} idle, camera on standby")
+                feed.pause()
+            elif feed.state == 'standby' and now - feed.state_since > CAMERA_STANDBY_RELEASE:
+                print(f"Players {feed.players} on standby for {CAMERA_STANDBY_RELEASE:.0f}s, releasing camera")
+                feed.stop()
+
+def get_feed(player, start=False):
+    # start=True is for the calls that begin a game session: they bring this
+    # player's camera up, and no other.
+    try:
+        player = int(player)
+    except (TypeError, ValueError):
+        return None
+    if not feeds:
+        runtime.run_blocking(ensure_feeds)
+    feed = feeds.get(player)
+    if start and feed is not None:
+        if feed.state == 'running':
+            feed.touch()
+        else:
+            runtime.run_blocking(feed.start)
+    return feed
 
 @app.route('/')
 def index():
-    return send_from_directory('templates', 'index.html')
+    return static_assets.render_page('templates/index.html')
+
+@app.route('/static/<path:filename>', endpoint='static')
+def serve_static(filename):
+    return static_assets.send('static', filename)
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(feeds[1].generate_feed(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    feed = get_feed(request.args.get('player', 1), start=True)
+    if feed is None:
+        return jsonify({'error': f"Unknown player: {request.args.get('player')}"}), 404
+    overlay = request.args.get('overlay', '0') not in ('0', 'false', '')
+    return Response(feed.generate_feed(overlay=overlay), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/get_gesture/<player>')
 def get_gesture(player):
-    return {"gesture": feeds[1].get_gesture()}
+    feed = get_feed(player, start=True)
+    if feed is None:
+        return jsonify({'error': f'Unknown player: {player}'}), 404
+    return {"gesture": feed.get_gesture(int(player))}
 
 @app.route('/search_song', methods=['POST'])
 def search_song():
     query = request.json.get('query', '')
-    return jsonify(search_youtube_songs(query))
+    try:
+        return jsonify(runtime.run_blocking(search_youtube_songs, query))
+    except RateLimited as e:
+        response = jsonify({'error': str(e)})
+        response.headers['Retry-After'] = str(int(e.retry_after) + 1)
+        return response, 429
+
+def prepare_song(video_id, song_name, progress=None, fetch_audio=None):
+    song_data = download_song(video_id, song_name, progress=progress, fetch_audio=fetch_audio)
+
+    sanitized_song_name = sanitize_filename(song_name)
+    if progress:
+        progress('charting', 90)
+    
+    chart = None
+    try:
+        chart = pattern_store.get(sanitized_song_name)
+        if not is_chart(chart):
+            print(f"Creating new chart for {sanitized_song_name}")
+            chart = generate_chart(sanitized_song_name, song_data)
+            pattern_store.put(sanitized_song_name, chart)
+            print(f"Saved chart for {sanitized_song_name}")
+    except Exception as e:
+        print(f"Error with patterns for {sanitized_song_name}: {e}")
+
+    if progress:
+        progress('assets', 95)
+    assets = None
+    try:
+        manifest = song_assets.build(sanitized_song_name, f'static/songs/{sanitized_song_name}.mp3', song_data)
+        assets = song_assets.urls(sanitized_song_name, manifest)
+    except Exception as e:
+        # The game still works from the MP3 alone, just without the waveform.
+        print(f"Error building assets for {sanitized_song_name}: {e}")
+
+    return {
+        'name': sanitized_song_name,
+        'bpm': float(song_data['bpm']),
+        'duration': float(song_data['duration']),
+        'difficulty': song_data['difficulty']['level'],
+        'multiplier': float(song_data['difficulty']['multiplier']),
+        'file': static_assets.versioned_url(song_data['file'], f'static/songs/{sanitized_song_name}.mp3'),
+        'chart': chart,
+        'assets': assets
+    }
+
+def summarize_song_result(result):
+    # The chart is already in the pattern store; jobs.json keeps the rest.
+    return {key: value for key, value in result.items() if key != 'chart'}
+
+def restore_song_result(result):
+    chart = pattern_store.get(result['name'])
+    return dict(result, chart=chart if is_chart(chart) else None)
+
+def song_job_room(job_id):
+    return f'song_job_{job_id}'
+
+def notify_song_job(job):
+    runtime.emit('song_job', job, to=song_job_room(job['job_id']))
+
 
 @app.route('/select_song', methods=['POST'])
 def select_song():
@@ -261,86 +791,83 @@ def select_song():
         if not video_id or not song_name:
             return jsonify({'error': 'Missing video_id or song_name'}), 400
 
-        song_data = download_song(video_id, song_name)
-
-        sanitized_song_name = sanitize_filename(song_name)
-        patterns_file = 'static/songs/patterns.json'
-        
-        try:
-            patterns = {}
-            if os.path.exists(patterns_file):
-                try:
-                    with open(patterns_file, 'r') as f:
-                        patterns = json.load(f)
-                except json.JSONDecodeError:
-                    print(f"Error parsing patterns file, creating new one")
-                    patterns = {}
-            
-            if sanitized_song_name not in patterns:
-                print(f"Creating new patterns for {sanitized_song_name}")
-                song_patterns = generate_patterns(
-                    sanitized_song_name, 
-                    song_data['bpm'], 
-                    song_data['duration'], 
-                    song_data['difficulty']['multiplier']
-                )
-                patterns.update(song_patterns)
-                
-                with open(patterns_file, 'w') as f:
-                    json.dump(patterns, f)
-                print(f"Saved patterns for {sanitized_song_name}")
-        except Exception as e:
-            print(f"Error with patterns for {sanitized_song_name}: {e}")
-
-        return jsonify({
-            'name': sanitized_song_name,
-            'bpm': float(song_data['bpm']),
-            'duration': float(song_data['duration']),
-            'difficulty': song_data['difficulty']['level'],
-            'multiplier': float(song_data['difficulty']['multiplier']),
-            'file': song_data['file']
-        })
+        job = song_jobs.submit(video_id, video_id, song_name)
+        return jsonify(job), 202
 
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         print(f"Error in /select_song: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/song_job/<job_id>')
+def song_job_status(job_id):
+    job = song_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': f'No song job found: {job_id}'}), 404
+    return jsonify(job)
+
 @app.route('/songs/<path:filename>')
 def serve_song(filename):
-    return send_from_directory('static/songs', filename)
+    return static_assets.send('static/songs', filename)
+
+def valid_song_name(name):
+    return name == sanitize_filename(name) and not name.startswith('.')
+
+@app.route('/song_assets/<name>')
+def song_asset_manifest(name):
+    manifest = song_assets.manifest(name) if valid_song_name(name) else None
+    if manifest is None:
+        return jsonify({'error': f'No assets for song: {name}'}), 404
+    response = jsonify(dict(manifest, urls=song_assets.urls(name, manifest)))
+    response.add_etag()
+    return response.make_conditional(request)
+
+@app.route('/song_assets/<name>/<kind>')
+def song_asset(name, kind):
+    located = song_assets.locate(name, kind) if valid_song_name(name) else None
+    if located is None:
+        return jsonify({'error': f'No {kind} asset for song: {name}'}), 404
+    directory, filename, etag, mimetype = located
+    return static_assets.send(directory, filename, etag=etag, mimetype=mimetype)
 
 @app.route('/save_score', methods=['POST'])
 def save_score():
     try:
-        data = request.json
-        score_data = {
-            'player': data.get('player'),
-            'score': data.get('score'),
-            'song': data.get('song'),
-            'timestamp': time.time()
-        }
-        leaderboard_file = 'static/leaderboard.json'
-        leaderboard = []
-        if os.path.exists(leaderboard_file):
-            with open(leaderboard_file, 'r') as f:
-                leaderboard = json.load(f)
-        leaderboard.append(score_data)
-        leaderboard = sorted(leaderboard, key=lambda x: x['score'], reverse=True)[:10]
-        with open(leaderboard_file, 'w') as f:
-            json.dump(leaderboard, f)
-        return jsonify({'success': True})
+        data = request.json or {}
+        score = data.get('score')
+        verified = False
+        session = get_judgment_session(data.get('player_id'))
+        # A session verifies one submission: it is taken out of
+        # judgment_sessions here, so a repeated POST (or two racing ones)
+        # cannot add a second verified entry for the same game.
+        if (session is not None and session.song == data.get('song') and
+                judgment_sessions.pop(session.player_id, None) is session):
+            judgment_owners.pop(session.player_id, None)
+            score = session.end()['score']
+            verified = True
+        entry = leaderboard.submit(data.get('player'), score, data.get('song'), verified=verified)
+        return jsonify({'success': True, 'entry': entry})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/get_leaderboard', methods=['GET'])
 def get_leaderboard():
     try:
-        leaderboard_file = 'static/leaderboard.json'
-        if os.path.exists(leaderboard_file):
-            with open(leaderboard_file, 'r') as f:
-                leaderboard = json.load(f)
-            return jsonify(leaderboard)
-        return jsonify([])
+        limit = max(1, min(request.args.get('limit', 10, type=int), LEADERBOARD_TOP_K))
+        offset = max(0, request.args.get('offset', 0, type=int))
+        entries, total = leaderboard.query(
+            song=request.args.get('song') or None,
+            limit=limit,
+            offset=offset,
+            since=request.args.get('since', type=float),
+            until=request.args.get('until', type=float)
+        )
+        response = jsonify(entries)
+        response.headers['X-Total-Count'] = str(total)
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -355,18 +882,19 @@ def debug_check_audio(filename):
 def debug_info():
     info = {
         'version': '1.0.0',
-        'webcam_available': all(feed.cap.isOpened() for feed in feeds.values()),
+        'webcam_available': all(feed.lifecycle()['opened'] for feed in unique_feeds()) if feeds else None,
         'song_directory': os.path.exists('static/songs'),
-        'pattern_file': os.path.exists('static/songs/patterns.json'),
+        'pattern_file': os.path.exists(PATTERNS_DB),
         'sounds_directory': os.path.exists('static/sounds'),
-        'sound_files': [f for f in os.listdir('static/sounds') if os.path.isfile(os.path.join('static/sounds', f))] if os.path.exists('static/sounds') else []
+        'sound_files': [f for f in os.listdir('static/sounds') if os.path.isfile(os.path.join('static/sounds', f))] if os.path.exists('static/sounds') else [],
+        'server': runtime.stats(),
+        'search': search_service.stats(),
+        'leaderboard': leaderboard.stats()
     }
     
     if info['pattern_file']:
         try:
-            with open('static/songs/patterns.json', 'r') as f:
-                patterns = json.load(f)
-            info['patterns'] = list(patterns.keys())
+            info['patterns'] = pattern_store.songs()
         except Exception as e:
             info['pattern_error'] = str(e)
     
@@ -379,6 +907,33 @@ def debug_info():
             
     return jsonify(info)
 
+@app.route('/debug/gesture_stats')
+def debug_gesture_stats():
+    return jsonify({str(feed.player_id): feed.scheduler.stats() for feed in unique_feeds()})
+
+@app.route('/debug/inference_stats')
+def debug_inference_stats():
+    return jsonify(inference_pool.stats())
+
+@app.route('/debug/preview_stats')
+def debug_preview_stats():
+    return jsonify({str(feed.player_id): feed.preview.stats() for feed in unique_feeds()})
+
+@app.route('/debug/metrics', methods=['GET', 'POST'])
+def debug_metrics():
+    if request.method == 'POST':
+        samples = (request.get_json(silent=True) or {}).get('samples') or []
+        for sample in samples[:500]:
+            for stage in ('network', 'client_judgment', 'end_to_end'):
+                value = sample.get(stage)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    latency_metrics.record(stage, float(value))
+        return jsonify({'success': True, 'recorded': min(len(samples), 500)})
+    if request.args.get('format') == 'json':
+        snapshot = latency_metrics.snapshot()
+        return jsonify({'stages': [dict(summary, stage=stage) for stage, summary in snapshot.items()]})
+    return send_from_directory('templates', 'metrics.html')
+
 @app.route('/debug/log', methods=['POST'])
 def debug_log():
     log_data = request.json
@@ -396,21 +951,18 @@ def debug_log():
 
 @app.route('/debug/patterns')
 def debug_patterns():
-    patterns_file = 'static/songs/patterns.json'
-    
-    if not os.path.exists(patterns_file):
-        return jsonify({'error': 'Patterns file does not exist'}), 404
-    
     try:
-        with open(patterns_file, 'r') as f:
-            patterns = json.load(f)
-        
         result = {}
-        for song, pattern in patterns.items():
+        for song in pattern_store.songs():
+            pattern = pattern_store.get(song)
+            if pattern is None:
+                continue
+            gestures = pattern_gestures(pattern)
             result[song] = {
-                'length': len(pattern),
-                'sample': pattern[:10] if len(pattern) > 0 else [],
-                'unique_gestures': list(set(pattern))
+                'format': 'chart' if is_chart(pattern) else 'sequence',
+                'length': len(gestures),
+                'sample': gestures[:10] if len(gestures) > 0 else [],
+                'unique_gestures': list(set(gestures))
             }
         
         return jsonify(result)
@@ -419,22 +971,15 @@ def debug_patterns():
 
 @app.route('/debug/pattern/<song_name>')
 def debug_pattern(song_name):
-    patterns_file = 'static/songs/patterns.json'
-    
-    if not os.path.exists(patterns_file):
-        return jsonify({'error': 'Patterns file does not exist'}), 404
-    
     try:
-        with open(patterns_file, 'r') as f:
-            patterns = json.load(f)
-        
-        if song_name not in patterns:
+        pattern = pattern_store.get(song_name)
+        if pattern is None:
             return jsonify({'error': f'No pattern found for song: {song_name}'}), 404
         
         return jsonify({
             'song': song_name,
-            'pattern_length': len(patterns[song_name]),
-            'pattern': patterns[song_name]
+            'pattern_length': len(pattern_gestures(pattern)),
+            'pattern': pattern
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -445,34 +990,288 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
+    for player, sid in list(judgment_owners.items()):
+        if sid == request.sid:
+            session = judgment_sessions.get(player)
+            if session is not None:
+                session.end()
+            judgment_owners.pop(player, None)
     print('Client disconnected')
 
+@socketio.on('join_player')
+def handle_join_player(data):
+    player = (data or {}).get('player', 1)
+    feed = get_feed(player, start=True)
+    if feed is None:
+        emit('error', {'message': f'Unknown player: {player}'})
+        return
+    join_room(player_room(int(player)))
+    emit('gesture', feed.gesture_payload(int(player), heartbeat=True))
+
+@socketio.on('leave_player')
+def handle_leave_player(data):
+    leave_room(player_room(int((data or {}).get('player', 1))))
+
+@socketio.on('watch_song_job')
+def handle_watch_song_job(data):
+    job_id = (data or {}).get('job_id')
+    job = song_jobs.get(job_id) if job_id else None
+    if job is None:
+        emit('error', {'message': f'Unknown song job: {job_id}'})
+        return
+    join_room(song_job_room(job_id))
+    emit('song_job', job)
+
 @socketio.on('request_gesture')
 def handle_request_gesture(data):
-    gesture = feeds[1].get_gesture()
-    emit('gesture', {'player': 1, 'gesture': gesture})
+    player = (data or {}).get('player', 1)
+    feed = get_feed(player, start=True)
+    if feed is None:
+        emit('error', {'message': f'Unknown player: {player}'})
+        return
+    emit('gesture', feed.gesture_payload(int(player), heartbeat=True))
+
+def client_wall_time(data):
+    # The page reports Date.now() with its song position. Trust it when the
+    # clocks agree (same host), otherwise fall back to the time it arrived.
+    now = time.time()
+    client_wall = data.get('client_wall')
+    if isinstance(client_wall, (int, float)) and abs(client_wall / 1000.0 - now) < 1.0:
+        return client_wall / 1000.0
+    return now
+
+@socketio.on('start_judgment')
+def handle_start_judgment(data):
+    data = data or {}
+    player = data.get('player', 1)
+    if get_feed(player, start=True) is None:
+        emit('judgment_error', {'message': f'Unknown player: {player}'})
+        return
+    song = data.get('song')
+    chart = pattern_store.get(song) if song else None
+    if not is_chart(chart):
+        emit('judgment_error', {'message': f'No chart for song: {song}'})
+        return
+    level = data.get('level') if data.get('level') in chart['levels'] else chart.get('default_level')
+    notes = chart['levels'].get(level) or []
+    session = JudgmentSession(int(player), song, level, JudgmentEngine(notes, CHART_LANES),
+                              input_offset=calibration_profiles.total_offset(data.get('device')))
+    session.sync(float(data.get('song_time') or 0.0), client_wall_time(data), data.get('paused', False))
+    judgment_sessions[int(player)] = session
+    judgment_owners[int(player)] = request.sid
+    emit('judgment_started', {'player': int(player), 'song': song, 'level': level, 'total': len(notes)})
+
+@socketio.on('song_clock')
+def handle_song_clock(data):
+    data = data or {}
+    session = get_judgment_session(data.get('player', 1))
+    if session is not None:
+        session.sync(float(data.get('song_time') or 0.0), client_wall_time(data), data.get('paused', False))
+
+@socketio.on('end_judgment')
+def handle_end_judgment(data):
+    session = get_judgment_session((data or {}).get('player', 1))
+    if session is not None:
+        session.end()
+        emit('judgment_summary', session.summary())
+
+def client_clock_skew(data):
+    # Seconds to subtract from server wall times to land on the page's clock;
+    # zero when both run on the same host.
+    client_wall = data.get('client_wall')
+    if not isinstance(client_wall, (int, float)):
+        return 0.0
+    skew = time.time() - client_wall / 1000.0
+    return skew if abs(skew) >= 1.0 else 0.0
+
+def milliseconds_to_seconds(times):
+    return [float(t) / 1000.0 for t in times or []]
+
+@socketio.on('start_calibration')
+def handle_start_calibration(data):
+    data = data or {}
+    player = data.get('player', 1)
+    if get_feed(player, start=True) is None:
+        emit('calibration_error', {'message': f'Unknown player: {player}'})
+        return
+    calibration_recorders[int(player)] = CalibrationRecorder(int(player), data.get('device'), client_clock_skew(data))
+
+@socketio.on('finish_calibration')
+def handle_finish_calibration(data):
+    data = data or {}
+    player = data.get('player', 1)
+    recorder = calibration_recorders.pop(int(player), None) if get_feed(player) is not None else None
+    if recorder is None:
+        emit('calibration_error', {'message': 'No calibration in progress'})
+        return
+    try:
+        period = float(data.get('period') or 0)
+        if period <= 0:
+            raise ValueError("Missing metronome period")
+        offsets = estimate_offsets(milliseconds_to_seconds(data.get('tap_beats')),
+                                   milliseconds_to_seconds(data.get('taps')),
+                                   milliseconds_to_seconds(data.get('gesture_beats')),
+                                   recorder.gesture_times(), period)
+        profile = calibration_profiles.save(data.get('device'), offsets, source=get_feed(player).source_spec)
+    except (TypeError, ValueError) as e:
+        emit('calibration_error', {'message': str(e)})
+        return
+    print(f"Calibration for {data.get('device')}: output {offsets['output_offset']}s, "
+          f"input {offsets['input_offset']}s")
+    emit('calibration_result', profile)
+
+@app.route('/calibration/<device>', methods=['GET', 'DELETE'])
+def calibration_profile(device):
+    if request.method == 'DELETE':
+        return jsonify({'success': calibration_profiles.delete(device)})
+    profile = calibration_profiles.get(device)
+    if profile is None:
+        return jsonify({'error': f'No calibration for device {device}'}), 404
+    return jsonify(profile)
+
+@app.route('/judgment/<player>')
+def judgment_status(player):
+    session = get_judgment_session(player)
+    if session is None:
+        return jsonify({'error': f'No judgment session for player {player}'}), 404
+    return jsonify(session.summary())
+
+def restart_feeds(targets):
+    # In place: rooms, preview viewers and judgment sessions keep pointing at
+    # the same feed, and stop() has joined the old threads before new ones run.
+    for feed in targets:
+        print(f"Restarting webcam for players {feed.players}...")
+        feed.restart()
+
+def camera_targets():
+    # A station only ever acts on its own player's camera. Every camera at
+    # once has to be asked for explicitly with {"all": true}; a request with
+    # neither gets (None, None) and is refused.
+    body = request.get_json(silent=True) or {}
+    if body.get('all') is True or request.args.get('all') == '1':
+        runtime.run_blocking(ensure_feeds)
+        return unique_feeds(), None
+    player = body.get('player', request.args.get('player'))
+    if player is None:
+        return None, None
+    return [feed for feed in [get_feed(player)] if feed is not None], player
+
+MISSING_PLAYER = 'Missing player: send {"player": N}, or {"all": true} for every camera'
+
+def shared_in_use(feed, player):
+    # Another player on the same camera is in the middle of a game.
+    return any(session is not None and not session.ended
+               for session in (judgment_sessions.get(other) for other in feed.players if other != int(player)))
+
+@app.route('/camera/<action>', methods=['POST'])
+def camera_action(action):
+    # start resumes a warm standby in milliseconds (or opens the cameras),
+    # pause parks them between games and stop releases the devices.
+    if action not in ('start', 'pause', 'stop'):
+        return jsonify({'error': f'Unknown camera action: {action}'}), 404
+    targets, player = camera_targets()
+    if targets is None:
+        return jsonify({'error': MISSING_PLAYER}), 400
+    if not targets:
+        return jsonify({'error': f'Unknown player: {player}'}), 404
+    started = time.perf_counter()
+    skipped = []
+    for feed in targets:
+        if action != 'start' and player is not None and shared_in_use(feed, player):
+            skipped.append(str(feed.player_id))
+            continue
+        runtime.run_blocking(getattr(feed, action))
+    return jsonify({
+        'success': True,
+        'action': action,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        'cameras': {str(feed.player_id): feed.lifecycle() for feed in targets},
+        'skipped_in_use': skipped
+    })
+
+@app.route('/camera/status')
+def camera_status():
+    return jsonify({str(feed.player_id): feed.lifecycle() for feed in unique_feeds()})
 
 @app.route('/restart_webcam', methods=['POST'])
 def restart_webcam():
-    global feeds
+    targets, player = camera_targets()
+    if targets is None:
+        return jsonify({'success': False, 'error': MISSING_PLAYER}), 400
+    if not targets:
+        return jsonify({'success': False, 'error': f'Unknown player: {player}'}), 404
     try:
-        print("Releasing webcam...")
-        feeds[1].release()
-        print("Reinitializing webcam...")
-        feeds[1] = WebcamFeed(1)
-        threading.Thread(target=feeds[1].process_gestures, daemon=True).start()
+        runtime.run_blocking(restart_feeds, targets)
         return jsonify({'success': True, 'message': 'Webcam restarted successfully'})
     except Exception as e:
         print(f"Error restarting webcam: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def create_app():
+    global analysis_cache, song_assets, static_assets, pattern_store, calibration_profiles, leaderboard, \
+        search_service, inference_pool, song_jobs
+    if startup['created_at'] is not None:
+        return app
+    started = time.perf_counter()
+    for directory in ('static/css', 'static/js', 'static/songs', 'static/sounds', 'static/images'):
+        os.makedirs(directory, exist_ok=True)
+    analysis_cache = AnalysisCache('static/songs/.analysis_cache')
+    song_assets = SongAssets(SONG_ASSETS_DIR, preview_kbps=SONG_PREVIEW_KBPS)
+    static_assets = StaticAssets(precompressed=PRECOMPRESS_STATIC)
+    if PRECOMPRESS_STATIC:
+        precompress(['static/js', 'static/css'])
+    pattern_store = PatternStore(PATTERNS_DB, legacy_json_path='static/songs/patterns.json')
+    calibration_profiles = CalibrationProfiles('static/calibration_profiles.json')
+    leaderboard = Leaderboard('static/leaderboard.json', top_k=LEADERBOARD_TOP_K)
+    search_service = SearchService()
+    inference_pool = InferencePool(INFERENCE_WORKERS)
+    song_jobs = SongJobQueue(prepare_song, max_workers=SONG_JOB_WORKERS, results_path='static/songs/jobs.json',
+                             notify=notify_song_job, summarize=summarize_song_result,
+                             restore=restore_song_result)
+    startup['create_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    startup['created_at'] = time.time()
+    return app
+
+@app.route('/ready')
+def ready():
+    # Ready once create_app() has run. ?camera=1 also waits for every camera
+    # to have delivered a processed frame, which starts them if needed.
+    want_camera = request.args.get('camera') == '1'
+    if want_camera and startup['created_at'] is not None:
+        runtime.run_blocking(start_feeds)
+    cameras = {str(feed.player_id): {key: value for key, value in feed.lifecycle().items()
+                                     if key in ('opened', 'frames', 'state')}
+               for feed in unique_feeds()}
+    app_ready = startup['created_at'] is not None
+    camera_ready = bool(cameras) and all(camera['opened'] and camera['frames'] > 0 for camera in cameras.values())
+    status = {
+        'ready': app_ready and (camera_ready or not want_camera),
+        'app': app_ready,
+        'cameras': cameras if cameras else 'idle',
+        'import_to_ready_ms': round((startup['created_at'] - startup['imported_at']) * 1000, 1) if app_ready else None,
+        'create_app_ms': startup['create_ms'],
+        'mode': SERVER_MODE
+    }
+    return jsonify(status), 200 if status['ready'] else 503
+
 def start_server():
+    create_app()
     try:
-        webbrowser.open(f'http://localhost:{PORT}')
-        socketio.run(app, host='0.0.0.0', port=PORT, allow_unsafe_werkzeug=True)
+        if OPEN_BROWSER:
+            webbrowser.open(f'http://localhost:{PORT}')
+        runtime.start()
+        print(f"Serving on port {PORT} in {SERVER_MODE} mode")
+        if SERVER_MODE == 'threading':
+            socketio.run(app, host='0.0.0.0', port=PORT, allow_unsafe_werkzeug=True)
+        else:
+            socketio.run(app, host='0.0.0.0', port=PORT, log_output=False)
     finally:
-        for feed in feeds.values():
+        for feed in unique_feeds():
             feed.release()
+        if inference_pool is not None:
+            inference_pool.close()
+        if analysis_cache is not None:
+            analysis_cache.flush()
 
 if __name__ == '__main__':
     start_server()
\ No newline at end of file
@@ -9,6 +9,8 @@ import yt_dlp
 import urllib.request
 import tempfile
 
+from search_service import SearchService
+
 class YouTubeMusicPlayer:
     def __init__(self, root):
         self.root = root
@@ -20,6 +22,7 @@ class YouTubeMusicPlayer:
         pygame.mixer.init()
         
         self.temp_dir = tempfile.mkdtemp()
+        self.search_service = SearchService()
         
         self.search_frame = tk.Frame(root, bg="#f0f0f0")
         self.search_frame.pack(pady=20, fill=tk.X, padx=20)
@@ -113,23 +116,8 @@ class YouTubeMusicPlayer:
     
     def _search_thread(self, query):
         try:
-            ydl_opts = {
-                'format': 'bestaudio',
-                'noplaylist': True,
-                'quiet': False,  
-                'verbose': True,  
-                'extract_flat': True,
-                'force_generic_extractor': False,
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            }
-            
-            time.sleep(1)
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                search_query = f"ytsearch10:{query}"
-                info = ydl.extract_info(search_query, download=False)
-                
-                self.root.after(0, lambda: self._update_search_results(info))
+            results = self.search_service.search(query, limit=10)
+            self.root.after(0, lambda: self._update_search_results(results))
                 
         except Exception as e:
             print(f"Error searching: {e}")
@@ -137,20 +125,15 @@ class YouTubeMusicPlayer:
         
         self.root.after(0, lambda: self.root.config(cursor=""))
     
-    def _update_search_results(self, info):
+    def _update_search_results(self, results):
         for item in self.results_tree.get_children():
             self.results_tree.delete(item)
             
-        if 'entries' in info:
-            for idx, entry in enumerate(info['entries']):
-                if entry:
-                    title = entry.get('title', 'Unknown')
-                    duration = self.format_duration(entry.get('duration', 0))
-                    
-                    video_id = entry.get('id', '')
-                    if video_id:
-                        full_url = f"https://www.youtube.com/watch?v={video_id}"
-                        self.results_tree.insert("", tk.END, values=(title, duration, full_url))
+        for entry in results:
+            title = entry.get('title', 'Unknown')
+            duration = self.format_duration(entry.get('duration', 0))
+            full_url = f"https://www.youtube.com/watch?v={entry['id']}"
+            self.results_tree.insert("", tk.END, values=(title, duration, full_url))
 
     def _show_error(self, message):
         messagebox.showerror("Error", message)
@@ -0,0 +1,207 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from gestures import GESTURE_LABELS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patterns (
+    song TEXT PRIMARY KEY,
+    format TEXT NOT NULL,
+    notes BLOB NOT NULL,
+    times BLOB,
+    meta TEXT NOT NULL,
+    note_count INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at REAL NOT NULL
+);
+"""
+
+
+# Gestures that only appear in older saved patterns are appended after the
+# live labels so their codes never shift.
+NOTE_GESTURES = GESTURE_LABELS + ("thumbs_up",)
+NOTE_GESTURE_IDS = {label: idx for idx, label in enumerate(NOTE_GESTURES)}
+
+
+def _encode_note(gesture, lane=0):
+    # One byte per note: lane in the high nibble, gesture id in the low nibble.
+    if gesture not in NOTE_GESTURE_IDS:
+        raise ValueError(f"Cannot store unknown gesture: {gesture}")
+    return ((lane & 0x0F) << 4) | NOTE_GESTURE_IDS[gesture]
+
+
+def encode_pattern(pattern):
+    if isinstance(pattern, dict):
+        notes = bytearray()
+        times = []
+        levels = []
+        durations = {}
+        for level, level_notes in pattern.get('levels', {}).items():
+            levels.append([level, len(level_notes)])
+            for idx, note in enumerate(level_notes):
+                notes.append(_encode_note(note['gesture'], note.get('lane', 0)))
+                times.append(note['t'])
+                if note.get('duration'):
+                    durations.setdefault(level, {})[str(idx)] = note['duration']
+        meta = {key: value for key, value in pattern.items() if key != 'levels'}
+        meta['levels'] = levels
+        if durations:
+            meta['durations'] = durations
+        return 'chart', bytes(notes), np.asarray(times, dtype=np.float32).tobytes(), meta, len(notes)
+    notes = bytes(_encode_note(gesture) for gesture in pattern)
+    return 'sequence', notes, None, {}, len(notes)
+
+
+def decode_pattern(fmt, notes, times, meta):
+    codes = np.frombuffer(notes, dtype=np.uint8)
+    gestures = [NOTE_GESTURES[code & 0x0F] for code in codes]
+    if fmt == 'sequence':
+        return gestures
+    lanes = (codes >> 4).tolist()
+    note_times = np.frombuffer(times, dtype=np.float32).tolist() if times else []
+    chart = {key: value for key, value in meta.items() if key not in ('levels', 'durations')}
+    durations = meta.get('durations', {})
+    chart['levels'] = {}
+    offset = 0
+    for level, count in meta.get('levels', []):
+        level_durations = durations.get(level, {})
+        level_notes = []
+        for idx in range(count):
+            note = {'t': round(note_times[offset + idx], 3), 'lane': lanes[offset + idx],
+                    'gesture': gestures[offset + idx]}
+            if str(idx) in level_durations:
+                note['duration'] = level_durations[str(idx)]
+            level_notes.append(note)
+        chart['levels'][level] = level_notes
+        offset += count
+    return chart
+
+
+class PatternStore:
+    # SQLite-backed store for song patterns and charts. Each song is its own
+    # row, so lookups and writes touch one song instead of the whole file, and
+    # every write is a transaction. A small in-memory index of song names and
+    # sizes is kept and reloaded whenever the database has changed since the
+    # last lookup (SQLite's data_version, which also covers WAL-only writes
+    # that leave the main file's mtime untouched).
+    def __init__(self, db_path, legacy_json_path=None):
+        self.db_path = db_path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.index = {}
+        self.data_version = None
+        self._connection().executescript(SCHEMA)
+        # data_version is per connection, so changes are always checked on this
+        # one; commits from any other connection, ours included, bump it.
+        self.index_conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        if legacy_json_path:
+            self.migrate_json(legacy_json_path)
+        self._refresh_index(force=True)
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    class _Transaction:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def __enter__(self):
+            self.conn.execute('BEGIN IMMEDIATE')
+            return self.conn
+
+        def __exit__(self, exc_type, exc, tb):
+            self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+            return False
+
+    def _transaction(self):
+        return self._Transaction(self._connection())
+
+    def _refresh_index(self, force=False):
+        with self.lock:
+            version = self.index_conn.execute('PRAGMA data_version').fetchone()[0]
+            if not force and version == self.data_version:
+                return
+            rows = self.index_conn.execute('SELECT song, format, note_count, updated_at FROM patterns').fetchall()
+            self.index = {song: {'format': fmt, 'length': count, 'updated_at': updated}
+                          for song, fmt, count, updated in rows}
+            self.data_version = version
+
+    def migrate_json(self, json_path):
+        # The migration is only recorded once every song has been imported.
+        # An unreadable file or a pattern that cannot be stored rolls the
+        # import back and leaves the file in place, to be retried on the next
+        # start once it has been fixed.
+        if not os.path.exists(json_path):
+            return 0
+        name = f'json:{os.path.basename(json_path)}'
+        try:
+            with self._transaction() as conn:
+                if conn.execute('SELECT 1 FROM migrations WHERE name = ?', (name,)).fetchone():
+                    return 0
+                with open(json_path, 'r') as f:
+                    patterns = json.load(f)
+                if not isinstance(patterns, dict):
+                    raise ValueError('expected an object of song patterns')
+                for song, pattern in patterns.items():
+                    try:
+                        self._write(conn, song, pattern, replace=False)
+                    except (TypeError, ValueError) as e:
+                        raise ValueError(f'{song}: {e}')
+                conn.execute('INSERT INTO migrations (name, applied_at) VALUES (?, ?)', (name, time.time()))
+        except (OSError, ValueError) as e:
+            print(f"Error migrating legacy patterns from {json_path}, will retry on next start: {e}")
+            return 0
+        print(f"Migrated {len(patterns)} patterns from {json_path}")
+        return len(patterns)
+
+    def _write(self, conn, song, pattern, replace=True):
+        fmt, notes, times, meta, count = encode_pattern(pattern)
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        conn.execute(f'{verb} INTO patterns (song, format, notes, times, meta, note_count, updated_at) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     (song, fmt, notes, times, json.dumps(meta), count, time.time()))
+        return fmt, count
+
+    def put(self, song, pattern):
+        with self._transaction() as conn:
+            self._write(conn, song, pattern)
+
+    def get(self, song):
+        row = self._connection().execute(
+            'SELECT format, notes, times, meta FROM patterns WHERE song = ?', (song,)).fetchone()
+        if row is None:
+            return None
+        fmt, notes, times, meta = row
+        return decode_pattern(fmt, notes, times, json.loads(meta))
+
+    def delete(self, song):
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM patterns WHERE song = ?', (song,))
+
+    def songs(self):
+        self._refresh_index()
+        with self.lock:
+            return list(self.index)
+
+    def summary(self, song):
+        self._refresh_index()
+        with self.lock:
+            info = self.index.get(song)
+            return dict(info) if info else None
+
+    def __contains__(self, song):
+        return self.summary(song) is not None
@@ -0,0 +1,207 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+import cv2
+
+# (scale, JPEG quality) from best to cheapest; clients move down the ladder
+# when they fall behind and back up once they keep up again.
+PREVIEW_LEVELS = ((1.0, 80), (0.75, 70), (0.5, 60), (0.35, 45))
+
+HAND_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (17, 18), (18, 19), (19, 20), (0, 17)
+)
+
+
+def draw_landmarks(image, hands):
+    # hands: (21, 3) arrays in normalized frame coordinates. Draws in place.
+    height, width = image.shape[:2]
+    radius = max(1, width // 160)
+    for hand in hands:
+        points = [(int(x * width), int(y * height)) for x, y in hand[:, :2]]
+        for start, end in HAND_CONNECTIONS:
+            cv2.line(image, points[start], points[end], (255, 255, 255), max(1, radius // 2))
+        for point in points:
+            cv2.circle(image, point, radius, (0, 0, 255), -1)
+    return image
+
+
+class PreviewEncoder:
+    # Encodes frames from a FrameBus once per quality level in use, at no more
+    # than max_fps, and hands the same bytes to every viewer on that level.
+    # The encoder thread sleeps while nobody is watching. Each viewer measures
+    # how long its frames take to send and whether it missed encoded frames,
+    # and steps down to a smaller, lower-quality level when it cannot keep up.
+    def __init__(self, bus, max_fps=15, levels=PREVIEW_LEVELS, landmarks=None, upgrade_after=2.0, poll_sleep=None):
+        self.bus = bus
+        # Viewers served from an event loop must not block on the condition;
+        # given a (green) sleep they poll for new frames with it instead.
+        self.poll_sleep = poll_sleep
+        self.interval = 1.0 / max_fps
+        self.max_fps = max_fps
+        self.levels = levels
+        self.landmarks = landmarks
+        self.upgrade_frames = max(1, int(upgrade_after * max_fps))
+        self.cond = threading.Condition()
+        self.subscribers = {}
+        self.clients = {}
+        self.client_ids = itertools.count(1)
+        self.encoded = {}
+        self.encoded_count = 0
+        self.encode_ms = deque(maxlen=120)
+        self.sent = deque()
+        self.bytes_total = 0
+        self.running = True
+        self.thread = None
+
+    def _ensure_thread(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._encode_loop, name='preview-encoder', daemon=True)
+            self.thread.start()
+
+    def _subscribe(self, key):
+        self.subscribers[key] = self.subscribers.get(key, 0) + 1
+
+    def _unsubscribe(self, key):
+        self.subscribers[key] -= 1
+        if not self.subscribers[key]:
+            del self.subscribers[key]
+
+    def _encode(self, frame, keys):
+        hands = []
+        if self.landmarks and any(overlay for _, overlay in keys):
+            hands = self.landmarks() or []
+        outputs = {}
+        scaled = {}
+        for level, overlay in keys:
+            scale, quality = self.levels[level]
+            image = scaled.get(scale)
+            if image is None:
+                image = frame.image
+                if scale != 1.0:
+                    image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                scaled[scale] = image
+            if overlay and hands:
+                image = draw_landmarks(image.copy(), hands)
+            ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+            if ok:
+                outputs[(level, overlay)] = buffer.tobytes()
+        return outputs
+
+    def _encode_loop(self):
+        last_seq = 0
+        while self.running:
+            with self.cond:
+                self.cond.wait_for(lambda: not self.running or self.subscribers)
+                keys = list(self.subscribers)
+            if not self.running:
+                break
+            frame = self.bus.wait_for(last_seq, timeout=1.0)
+            if frame is None:
+                continue
+            last_seq = frame.seq
+            started = time.perf_counter()
+            outputs = self._encode(frame, keys)
+            elapsed = time.perf_counter() - started
+            with self.cond:
+                self.encoded = outputs
+                self.encoded_count += 1
+                self.encode_ms.append(elapsed * 1000)
+                self.cond.notify_all()
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+    def _record_sent(self, size):
+        now = time.monotonic()
+        with self.cond:
+            self.sent.append((now, size))
+            self.bytes_total += size
+            while self.sent and now - self.sent[0][0] > 5.0:
+                self.sent.popleft()
+
+    def stream(self, overlay=False, level=0):
+        level = max(0, min(level, len(self.levels) - 1))
+        key = (level, bool(overlay))
+        with self.cond:
+            client_id = next(self.client_ids)
+            self.clients[client_id] = level
+            self._subscribe(key)
+            self._ensure_thread()
+        last_count = 0
+        keeping_up = 0
+        switched = False
+        try:
+            while self.running:
+                frame_ready = lambda: not self.running or (self.encoded_count > last_count and key in self.encoded)
+                with self.cond:
+                    ready = frame_ready() if self.poll_sleep else self.cond.wait_for(frame_ready, timeout=1.0)
+                    if not self.running:
+                        break
+                    if ready:
+                        # Frames encoded before the new level was subscribed
+                        # were never available to this viewer, so the first
+                        # frame after a switch does not count them as missed.
+                        missed = self.encoded_count - last_count - 1 if last_count and not switched else 0
+                        switched = False
+                        last_count = self.encoded_count
+                        data = self.encoded[key]
+                if not ready:
+                    if self.poll_sleep:
+                        self.poll_sleep(self.interval / 3)
+                    continue
+                started = time.perf_counter()
+                yield b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + data + b'\r\n'
+                send_seconds = time.perf_counter() - started
+                self._record_sent(len(data))
+
+                new_level = level
+                if missed > 0 or send_seconds > self.interval:
+                    keeping_up = 0
+                    new_level = min(level + 1, len(self.levels) - 1)
+                else:
+                    keeping_up += 1
+                    if keeping_up >= self.upgrade_frames and level > 0:
+                        keeping_up = 0
+                        new_level = level - 1
+                if new_level != level:
+                    with self.cond:
+                        self._unsubscribe(key)
+                        level = new_level
+                        key = (level, key[1])
+                        self._subscribe(key)
+                        self.clients[client_id] = level
+                        last_count = self.encoded_count
+                        switched = True
+        finally:
+            with self.cond:
+                self._unsubscribe(key)
+                del self.clients[client_id]
+
+    def viewer_count(self):
+        with self.cond:
+            return len(self.clients)
+
+    def stats(self):
+        with self.cond:
+            now = time.monotonic()
+            window = [size for sent_at, size in self.sent if now - sent_at <= 5.0]
+            encode_ms = list(self.encode_ms)
+            return {
+                'max_fps': self.max_fps,
+                'viewers': len(self.clients),
+                'viewer_levels': sorted(self.clients.values()),
+                'frames_encoded': self.encoded_count,
+                'avg_encode_ms': round(sum(encode_ms) / len(encode_ms), 2) if encode_ms else 0.0,
+                'max_encode_ms': round(max(encode_ms), 2) if encode_ms else 0.0,
+                'bytes_per_second': round(sum(window) / 5.0),
+                'bytes_total': self.bytes_total
+            }
+
+    def close(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
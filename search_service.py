@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+
+YDL_SEARCH_OPTS = {
+    'format': 'bestaudio',
+    'noplaylist': True,
+    'quiet': True,
+    'noprogress': True,
+    'extract_flat': True,
+    'force_generic_extractor': False,
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+}
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Search rate limit reached, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+def normalize_query(query):
+    return ' '.join((query or '').lower().split())
+
+
+def youtube_extractor(opts=None):
+    import yt_dlp
+    return yt_dlp.YoutubeDL(dict(YDL_SEARCH_OPTS, **(opts or {})))
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = float(capacity)
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, max_wait=0.0):
+        # Takes one token, waiting up to max_wait seconds for one to refill.
+        # Returns 0 on success, otherwise how long until a token is available.
+        deadline = self.clock() + max_wait
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return 0.0
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return wait
+            self.sleep(wait)
+
+
+class _Pending:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SearchService:
+    # Song search shared by the web app and the desktop player. Results are
+    # cached per normalised query for `ttl` seconds (least recently used
+    # entries are dropped past `max_entries`), identical queries already in
+    # flight wait for the running one instead of searching again, and actual
+    # extractor calls are paced by a token bucket rather than a fixed sleep.
+    # One extractor instance is built on first use and reused; it is not
+    # thread-safe, so calls into it are serialised. `clock` and `sleep` are
+    # there so tests can drive expiry and pacing without waiting.
+    def __init__(self, extractor_factory=youtube_extractor, ttl=600, max_entries=256,
+                 rate=1.0, burst=3, max_wait=5.0, clock=time.monotonic, sleep=time.sleep):
+        self.extractor_factory = extractor_factory
+        self.extractor = None
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_wait = max_wait
+        self.clock = clock
+        self.bucket = TokenBucket(rate, burst, clock=clock, sleep=sleep)
+        self.lock = threading.Lock()
+        self.extractor_lock = threading.Lock()
+        self.cache = OrderedDict()
+        self.inflight = {}
+        self.counts = {'hits': 0, 'misses': 0, 'coalesced': 0, 'extractor_calls': 0, 'rate_limited': 0}
+
+    def _cached(self, key, now):
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        stored_at, results = entry
+        if now - stored_at > self.ttl:
+            del self.cache[key]
+            return None
+        self.cache.move_to_end(key)
+        return results
+
+    def _store(self, key, results):
+        self.cache[key] = (self.clock(), results)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+
+    def _extract(self, query, limit):
+        retry_after = self.bucket.acquire(self.max_wait)
+        if retry_after:
+            with self.lock:
+                self.counts['rate_limited'] += 1
+            raise RateLimited(retry_after)
+        with self.extractor_lock:
+            if self.extractor is None:
+                self.extractor = self.extractor_factory()
+            with self.lock:
+                self.counts['extractor_calls'] += 1
+            info = self.extractor.extract_info(f"ytsearch{limit}:{query}", download=False)
+        results = []
+        for entry in (info or {}).get('entries') or []:
+            if entry and entry.get('id'):
+                results.append({'title': entry.get('title', 'Unknown'), 'id': entry['id'],
+                                'duration': entry.get('duration')})
+        return results
+
+    def search(self, query, limit=5):
+        normalized = normalize_query(query)
+        if not normalized:
+            return []
+        key = (normalized, limit)
+        with self.lock:
+            results = self._cached(key, self.clock())
+            if results is not None:
+                self.counts['hits'] += 1
+                return [dict(r) for r in results]
+            pending = self.inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self.inflight[key] = _Pending()
+                self.counts['misses'] += 1
+            else:
+                self.counts['coalesced'] += 1
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return [dict(r) for r in pending.result]
+
+        try:
+            results = self._extract(normalized, limit)
+            with self.lock:
+                self._store(key, results)
+            pending.result = results
+            return [dict(r) for r in results]
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            pending.event.set()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, cached=len(self.cache), inflight=len(self.inflight))
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import deque
+
+SERVER_MODES = ('threading', 'eventlet')
+
+
+def patch_for_mode(mode):
+    # Must run before anything imports socket. Only the networking and sleep
+    # calls go green: threading is left native so capture, inference, preview
+    # encoding and song jobs keep running on real OS threads.
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Unknown server mode: {mode} (expected one of {', '.join(SERVER_MODES)})")
+    if mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch(socket=True, select=True, time=True)
+
+
+class ServerRuntime:
+    # Where the server's native threads meet the web server. In threading
+    # mode every request and socket has its own OS thread, so calls go
+    # straight through. In eventlet mode requests and sockets are green
+    # threads on one event loop: calls that would block it are handed to
+    # eventlet's native thread pool with run_blocking(), and emits from native
+    # threads are queued and sent by a green task on the loop. The queue is
+    # bounded; when clients fall that far behind, the oldest events are
+    # dropped rather than letting memory grow.
+    def __init__(self, socketio, mode='threading', max_pending=2000, drain_interval=0.005):
+        if mode not in SERVER_MODES:
+            raise ValueError(f"Unknown server mode: {mode}")
+        self.socketio = socketio
+        self.mode = mode
+        self.green = mode != 'threading'
+        self.max_pending = max_pending
+        self.drain_interval = drain_interval
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.delivered = 0
+        self.dropped = 0
+        self.wait_ms = deque(maxlen=500)
+
+    def start(self):
+        # Emits from before the loop starts wait in the queue.
+        if self.green:
+            self.socketio.start_background_task(self._drain)
+
+    def run_blocking(self, func, *args, **kwargs):
+        if not self.green:
+            return func(*args, **kwargs)
+        from eventlet import tpool
+        return tpool.execute(func, *args, **kwargs)
+
+    def sleep(self, seconds):
+        if self.green:
+            self.socketio.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
+    def emit(self, event, data, to=None):
+        if not self.green:
+            self.socketio.emit(event, data, to=to)
+            return
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                self.pending.popleft()
+                self.dropped += 1
+            self.pending.append((time.monotonic(), event, data, to))
+
+    def _drain(self):
+        while True:
+            with self.lock:
+                batch = list(self.pending)
+                self.pending.clear()
+            now = time.monotonic()
+            for queued_at, event, data, to in batch:
+                self.wait_ms.append((now - queued_at) * 1000)
+                try:
+                    self.socketio.emit(event, data, to=to)
+                except Exception as e:
+                    print(f"Error delivering {event} via SocketIO: {e}")
+            self.delivered += len(batch)
+            self.socketio.sleep(self.drain_interval)
+
+    def stats(self):
+        with self.lock:
+            pending = len(self.pending)
+        wait_ms = sorted(self.wait_ms)
+        return {
+            'mode': self.mode,
+            'pending': pending,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'avg_queue_ms': round(sum(wait_ms) / len(wait_ms), 2) if wait_ms else 0.0,
+            'p95_queue_ms': round(wait_ms[int(len(wait_ms) * 0.95)], 2) if wait_ms else 0.0
+        }
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import shutil
+import struct
+import subprocess
+import threading
+
+import numpy as np
+
+from song_cache import file_digest, write_json_atomic
+
+ASSET_VERSION = 1
+PEAKS_SAMPLE_RATE = 11025
+PEAKS_SAMPLES_PER_PIXEL = 256
+PREVIEW_KBPS = 96
+ASSET_KINDS = {
+    'peaks': ('peaks.dat', 'application/octet-stream'),
+    'beats': ('beats.f32', 'application/octet-stream'),
+    'preview': ('preview.mp3', 'audio/mpeg')
+}
+
+
+def compute_peaks(blocks, samples_per_pixel=PEAKS_SAMPLES_PER_PIXEL):
+    # Min/max per bucket of samples_per_pixel samples. Samples that do not
+    # fill a bucket are carried to the next block; the last partial bucket
+    # is kept so the waveform covers the whole track.
+    carry = np.zeros(0, dtype=np.float32)
+    mins = []
+    maxs = []
+    for block in blocks:
+        buffer = np.concatenate([carry, block])
+        n_buckets = len(buffer) // samples_per_pixel
+        if n_buckets:
+            buckets = buffer[:n_buckets * samples_per_pixel].reshape(n_buckets, samples_per_pixel)
+            mins.append(buckets.min(axis=1))
+            maxs.append(buckets.max(axis=1))
+        carry = buffer[n_buckets * samples_per_pixel:]
+    if len(carry):
+        mins.append(np.array([carry.min()], dtype=np.float32))
+        maxs.append(np.array([carry.max()], dtype=np.float32))
+    if not mins:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    return np.concatenate(mins), np.concatenate(maxs)
+
+
+def encode_peaks(mins, maxs, sample_rate=PEAKS_SAMPLE_RATE, samples_per_pixel=PEAKS_SAMPLES_PER_PIXEL):
+    # audiowaveform's .dat layout (version 1, 8-bit): a 20-byte header of
+    # version, flags, sample rate, samples per pixel and length, then one
+    # interleaved int8 min/max pair per pixel. About 2 bytes per 23 ms.
+    header = struct.pack('<iIiiI', 1, 1, sample_rate, samples_per_pixel, len(mins))
+    pairs = np.empty(len(mins) * 2, dtype=np.int8)
+    pairs[0::2] = np.clip(np.round(mins * 127), -128, 127)
+    pairs[1::2] = np.clip(np.round(maxs * 127), -128, 127)
+    return header + pairs.tobytes()
+
+
+def encode_beats(beat_times):
+    # Little-endian float32 seconds, readable as a Float32Array as is.
+    return np.asarray(beat_times, dtype='<f4').tobytes()
+
+
+def encode_preview(file_path, out_path, kbps):
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        return False
+    tmp_path = f'{out_path}.tmp{os.getpid()}.{threading.get_ident()}'
+    try:
+        subprocess.run([ffmpeg, '-v', 'error', '-y', '-i', file_path, '-vn', '-ac', '1', '-b:a', f'{kbps}k',
+                        '-f', 'mp3', tmp_path], check=True, timeout=300)
+        os.replace(tmp_path, out_path)
+        return True
+    except (subprocess.SubprocessError, OSError) as e:
+        print(f"Error encoding preview for {file_path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def write_bytes_atomic(path, data):
+    tmp_path = f'{path}.tmp{os.getpid()}.{threading.get_ident()}'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SongAssets:
+    # Files derived from a song once it has been analysed, so the client can
+    # draw it and start playing without downloading and decoding the full
+    # MP3: a waveform peaks file, the beat grid and (when ffmpeg is around
+    # and preview_kbps is set) a smaller mono encode. Each song gets a
+    # directory with a manifest recording the source file's size and mtime
+    # and a content ETag per asset; assets are rebuilt when any of that or
+    # the asset version changes.
+    def __init__(self, root, preview_kbps=PREVIEW_KBPS):
+        self.root = root
+        self.preview_kbps = preview_kbps
+        self.lock = threading.Lock()
+        self.building = {}
+        os.makedirs(root, exist_ok=True)
+
+    def asset_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def manifest(self, name):
+        path = os.path.join(self.asset_dir(name), 'manifest.json')
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading song assets for {name}: {e}")
+            return None
+
+    def _is_current(self, manifest, file_path):
+        if not manifest or manifest.get('version') != ASSET_VERSION:
+            return False
+        stat = os.stat(file_path)
+        source = manifest.get('source', {})
+        if source.get('size') != stat.st_size or source.get('mtime_ns') != stat.st_mtime_ns:
+            return False
+        # Without ffmpeg a requested preview is skipped, not retried each time.
+        return manifest.get('preview_kbps') == (self.preview_kbps or None)
+
+    def _name_lock(self, name):
+        with self.lock:
+            return self.building.setdefault(name, threading.Lock())
+
+    def build(self, name, file_path, analysis):
+        # Concurrent builds of one song wait for each other, and the second
+        # finds the first one's manifest current.
+        with self._name_lock(name):
+            manifest = self.manifest(name)
+            if self._is_current(manifest, file_path):
+                return manifest
+            from audio_analysis import decode_blocks
+            directory = self.asset_dir(name)
+            os.makedirs(directory, exist_ok=True)
+            stat = os.stat(file_path)
+            assets = {}
+
+            mins, maxs = compute_peaks(decode_blocks(file_path, sr=PEAKS_SAMPLE_RATE))
+            peaks = encode_peaks(mins, maxs)
+            write_bytes_atomic(os.path.join(directory, ASSET_KINDS['peaks'][0]), peaks)
+            assets['peaks'] = {
+                'bytes': len(peaks),
+                'etag': hashlib.sha1(peaks).hexdigest(),
+                'sample_rate': PEAKS_SAMPLE_RATE,
+                'samples_per_pixel': PEAKS_SAMPLES_PER_PIXEL,
+                'length': len(mins)
+            }
+
+            beats = encode_beats(analysis['beat_times'])
+            write_bytes_atomic(os.path.join(directory, ASSET_KINDS['beats'][0]), beats)
+            assets['beats'] = {'bytes': len(beats), 'etag': hashlib.sha1(beats).hexdigest(),
+                               'count': len(analysis['beat_times'])}
+
+            assets['preview'] = None
+            preview_path = os.path.join(directory, ASSET_KINDS['preview'][0])
+            if self.preview_kbps and encode_preview(file_path, preview_path, self.preview_kbps):
+                assets['preview'] = {'bytes': os.path.getsize(preview_path), 'etag': file_digest(preview_path),
+                                     'kbps': self.preview_kbps}
+            elif os.path.exists(preview_path):
+                os.remove(preview_path)
+
+            manifest = {
+                'version': ASSET_VERSION,
+                'name': name,
+                'source': {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns},
+                'preview_kbps': self.preview_kbps or None,
+                'bpm': float(analysis['bpm']),
+                'duration': float(analysis['duration']),
+                'assets': assets
+            }
+            write_json_atomic(os.path.join(directory, 'manifest.json'), manifest)
+            print(f"Built song assets for {name}: {len(peaks)} byte waveform, {assets['beats']['count']} beats"
+                  f"{', preview' if assets['preview'] else ''}")
+            return manifest
+
+    def locate(self, name, kind):
+        # (directory, filename, etag, mimetype) for a built asset, else None.
+        if kind not in ASSET_KINDS:
+            return None
+        manifest = self.manifest(name)
+        asset = manifest['assets'].get(kind) if manifest else None
+        if asset is None:
+            return None
+        filename, mimetype = ASSET_KINDS[kind]
+        return self.asset_dir(name), filename, asset['etag'], mimetype
+
+    def urls(self, name, manifest):
+        # Versioned by ETag, so a rebuilt asset never reuses a cached URL.
+        if not manifest:
+            return None
+        return {kind: f"/song_assets/{name}/{kind}?v={asset['etag'][:12]}"
+                for kind, asset in manifest['assets'].items() if asset is not None}
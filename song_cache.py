@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_json_atomic(path, data):
+    tmp_path = f'{path}.tmp{os.getpid()}.{threading.get_ident()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class _Pending:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AnalysisCache:
+    # On-disk cache of song analysis results keyed by the audio file's content
+    # hash and the analysis parameters. Content hashes are remembered per path
+    # together with size and mtime, so unchanged files are never re-hashed and
+    # edited files miss automatically. Entries are evicted least recently used
+    # once either the entry count or total size limit is exceeded. Hits only
+    # touch last_used in memory; the index is written at most every
+    # save_interval seconds for those, and on flush().
+    def __init__(self, cache_dir, max_entries=256, max_bytes=64 * 1024 * 1024, save_interval=30.0):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.save_interval = save_interval
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.dirty = False
+        self.last_saved = time.monotonic()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {'entries': {}, 'files': {}}
+        if 'entries' not in index or 'files' not in index:
+            return {'entries': {}, 'files': {}}
+        # Songs that were deleted or renamed would otherwise be remembered
+        # forever.
+        missing = [path for path in index['files'] if not os.path.exists(path)]
+        for path in missing:
+            del index['files'][path]
+        if missing:
+            write_json_atomic(self.index_path, index)
+        return index
+
+    def _save_index(self):
+        write_json_atomic(self.index_path, self.index)
+        self.dirty = False
+        self.last_saved = time.monotonic()
+
+    def _touched(self):
+        self.dirty = True
+        if time.monotonic() - self.last_saved >= self.save_interval:
+            self._save_index()
+
+    def flush(self):
+        with self.lock:
+            if self.dirty:
+                self._save_index()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def _content_hash(self, file_path):
+        stat = os.stat(file_path)
+        path_key = os.path.abspath(file_path)
+        with self.lock:
+            known = self.index['files'].get(path_key)
+            if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+                return known['hash']
+        content_hash = file_digest(file_path)
+        with self.lock:
+            self.index['files'][path_key] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'hash': content_hash
+            }
+        return content_hash
+
+    def key_for(self, file_path, params):
+        content_hash = self._content_hash(file_path)
+        encoded = json.dumps(params, sort_keys=True)
+        return hashlib.sha1(f'{content_hash}:{encoded}'.encode('utf-8')).hexdigest()
+
+    def _read_entry(self, key):
+        meta = self.index['entries'].get(key)
+        if meta is None:
+            return None
+        try:
+            with open(self._entry_path(key), 'r') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            self.index['entries'].pop(key, None)
+            self.dirty = True
+            return None
+        meta['last_used'] = time.time()
+        self._touched()
+        return result
+
+    def _store_entry(self, key, result):
+        path = self._entry_path(key)
+        write_json_atomic(path, result)
+        self.index['entries'][key] = {'bytes': os.path.getsize(path), 'last_used': time.time()}
+        self._evict()
+        self._save_index()
+
+    def _evict(self):
+        entries = self.index['entries']
+        total = sum(meta['bytes'] for meta in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if len(entries) <= self.max_entries and total <= self.max_bytes:
+                break
+            total -= entries.pop(key)['bytes']
+            try:
+                os.remove(self._entry_path(key))
+            except OSError:
+                pass
+
+    def get(self, file_path, params):
+        key = self.key_for(file_path, params)
+        with self.lock:
+            return self._read_entry(key)
+
+    def get_or_compute(self, file_path, params, compute):
+        # Concurrent callers for the same key share a single compute() call.
+        key = self.key_for(file_path, params)
+        with self.lock:
+            result = self._read_entry(key)
+            if result is not None:
+                return result
+            pending = self.inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = self.inflight[key] = _Pending()
+
+        if not owner:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            result = compute(file_path)
+            with self.lock:
+                self._store_entry(key, result)
+            pending.result = result
+            return result
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            pending.event.set()
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.index['entries']):
+                try:
+                    os.remove(self._entry_path(key))
+                except OSError:
+                    pass
+            self.index = {'entries': {}, 'files': {}}
+            self._save_index()
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from song_cache import write_json_atomic
+
+
+class QueueFull(Exception):
+    pass
+
+
+class SongJobQueue:
+    # Runs song download/analysis jobs on a bounded worker pool. Submitting a
+    # video that already has a queued or running job returns that job instead
+    # of starting another one. Every state change is passed to `notify`, and
+    # finished jobs are persisted so they can still be looked up after a
+    # restart. Only what `summarize` keeps of a result is written; `restore`
+    # fills the rest back in (e.g. from another store) when a persisted job
+    # is fetched.
+    def __init__(self, worker, max_workers=2, max_pending=16, results_path=None, notify=None, max_saved=200,
+                 summarize=None, restore=None):
+        self.worker = worker
+        self.max_pending = max_pending
+        self.results_path = results_path
+        self.notify = notify
+        self.max_saved = max_saved
+        self.summarize = summarize
+        self.restore = restore
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='song-job')
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.active = {}
+        self.saved = self._load_saved()
+
+    def _load_saved(self):
+        if not self.results_path or not os.path.exists(self.results_path):
+            return {}
+        try:
+            with open(self.results_path, 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            print(f"Error reading job results from {self.results_path}, starting fresh")
+            return {}
+        # Files written before results were summarized shrink on the next save.
+        return {job_id: self._stored(job) for job_id, job in saved.items()}
+
+    def _stored(self, job):
+        if self.summarize is None or not job.get('result'):
+            return dict(job)
+        return dict(job, result=self.summarize(job['result']))
+
+    def _persist(self, job):
+        if not self.results_path:
+            return
+        with self.lock:
+            self.saved[job['job_id']] = self._stored(job)
+            if len(self.saved) > self.max_saved:
+                oldest = sorted(self.saved, key=lambda k: self.saved[k].get('finished_at') or 0)
+                for job_id in oldest[:len(self.saved) - self.max_saved]:
+                    del self.saved[job_id]
+                    if self.jobs.get(job_id, {}).get('finished_at'):
+                        del self.jobs[job_id]
+            snapshot = dict(self.saved)
+        try:
+            write_json_atomic(self.results_path, snapshot)
+        except OSError as e:
+            print(f"Error saving job results: {e}")
+
+    def _publish(self, job_id, **changes):
+        with self.lock:
+            job = self.jobs[job_id]
+            job.update(changes)
+            snapshot = dict(job)
+        if self.notify:
+            try:
+                self.notify(snapshot)
+            except Exception as e:
+                print(f"Error sending job update: {e}")
+        return snapshot
+
+    def submit(self, key, *args):
+        with self.lock:
+            job_id = self.active.get(key)
+            if job_id is not None:
+                return dict(self.jobs[job_id])
+            if len(self.active) >= self.max_pending:
+                raise QueueFull(f"Too many song jobs in progress ({len(self.active)})")
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                'job_id': job_id,
+                'key': key,
+                'status': 'queued',
+                'stage': 'queued',
+                'progress': 0,
+                'result': None,
+                'error': None,
+                'created_at': time.time(),
+                'finished_at': None
+            }
+            self.jobs[job_id] = job
+            self.active[key] = job_id
+            snapshot = dict(job)
+        self.executor.submit(self._run, job_id, key, args)
+        return snapshot
+
+    def _run(self, job_id, key, args):
+        def progress(stage, percent):
+            self._publish(job_id, status='running', stage=stage, progress=int(max(0, min(100, percent))))
+
+        self._publish(job_id, status='running', stage='starting')
+        try:
+            result = self.worker(*args, progress=progress)
+            job = self._publish(job_id, status='done', stage='done', progress=100, result=result,
+                                finished_at=time.time())
+        except Exception as e:
+            print(f"Song job {job_id} failed: {e}")
+            job = self._publish(job_id, status='error', stage='error', error=str(e), finished_at=time.time())
+        finally:
+            with self.lock:
+                if self.active.get(key) == job_id:
+                    del self.active[key]
+        self._persist(job)
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                return dict(job)
+            job = self.saved.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+        if self.restore is not None and job.get('result'):
+            try:
+                job['result'] = self.restore(job['result'])
+            except Exception as e:
+                print(f"Error restoring result of job {job_id}: {e}")
+        return job
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
@@ -4,6 +4,12 @@ document.addEventListener('DOMContentLoaded', () => {
     const debugToggleBtn = document.getElementById('debug-toggle-btn');
     const toggleDebugBtn = document.getElementById('toggle-debug');
     const clearDebugBtn = document.getElementById('clear-debug');
+    // The player this page plays as, from ?player=N on its URL; each station
+    // (or each hand sharing a camera) opens the game with its own number.
+    const PLAYER_ID = Math.max(1, parseInt(new URLSearchParams(window.location.search).get('player'), 10) || 1);
+    // ?preview_audio=1 trades audio quality for a smaller download on slow
+    // links; the charts are timed against the original file.
+    const PREVIEW_AUDIO = new URLSearchParams(window.location.search).get('preview_audio') === '1';
     
     function logDebugMessage(message, level = 'info') {
         if (!debugLogContainer) return;
@@ -70,6 +76,11 @@ document.addEventListener('DOMContentLoaded', () => {
         bpm: 120,
         difficultyMultiplier: 1.0,
         songDuration: 0,
+        chart: null,
+        assets: null,
+        waveform: null,
+        beatGrid: null,
+        calibration: { output_offset: 0, input_offset: 0 },
         timeLimit: 0,
         timeRemaining: 0,
         difficulty: 'medium',
@@ -114,6 +125,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const screens = {
         splash: document.getElementById('splash-screen'),
         tutorial: document.getElementById('tutorial-screen'),
+        calibration: document.getElementById('calibration-screen'),
         leaderboard: document.getElementById('leaderboard-screen'),
         songSelect: document.getElementById('song-select-screen'),
         game: document.getElementById('game-screen'),
@@ -337,6 +349,179 @@ document.addEventListener('DOMContentLoaded', () => {
         logDebugMessage("Returned to main menu from tutorial");
     });
 
+    document.getElementById('calibration-btn').addEventListener('click', () => {
+        showScreen(screens.calibration);
+        setupGestureDetection();
+        renderCalibrationStatus();
+        logDebugMessage("Calibration screen opened");
+    });
+
+    document.getElementById('back-from-calibration').addEventListener('click', () => {
+        if (calibrationRunning) return;
+        showScreen(screens.splash);
+        pauseCamera();
+        logDebugMessage("Returned to main menu from calibration");
+    });
+
+    document.getElementById('start-calibration').addEventListener('click', runCalibration);
+
+    const CALIBRATION_PERIOD = 0.6;
+    const CALIBRATION_COUNT_IN = 4;
+    const CALIBRATION_TAPS = 12;
+    const CALIBRATION_GESTURES = 16;
+
+    function getDeviceId() {
+        let deviceId = localStorage.getItem('gesturebeats-device');
+        if (!deviceId) {
+            deviceId = `device-${Math.random().toString(36).slice(2, 12)}`;
+            localStorage.setItem('gesturebeats-device', deviceId);
+        }
+        return deviceId;
+    }
+
+    function wallNow() {
+        return performance.timeOrigin + performance.now();
+    }
+
+    function renderCalibrationStatus(message) {
+        const status = document.getElementById('calibration-status');
+        if (!status) return;
+        const { output_offset, input_offset } = gameState.calibration;
+        status.textContent = message ||
+            `Current offsets: audio ${Math.round(output_offset * 1000)} ms, camera ${Math.round(input_offset * 1000)} ms`;
+    }
+
+    function setCalibrationStep(step, instructions) {
+        document.getElementById('calibration-step').textContent = step;
+        document.getElementById('calibration-instructions').textContent = instructions;
+    }
+
+    async function loadCalibration() {
+        try {
+            const response = await fetch(`/calibration/${encodeURIComponent(getDeviceId())}`);
+            if (response.ok) {
+                const profile = await response.json();
+                gameState.calibration = {
+                    output_offset: profile.output_offset || 0,
+                    input_offset: profile.input_offset || 0
+                };
+                logDebugMessage(`Loaded timing calibration: audio ${profile.output_offset}s, camera ${profile.input_offset}s`);
+            }
+        } catch (error) {
+            logDebugMessage(`Could not load timing calibration: ${error.message}`, "warning");
+        }
+    }
+
+    async function loadMetronome(context) {
+        const load = async (name) => {
+            const response = await fetch(`static/sounds/${name}.mp3`);
+            return context.decodeAudioData(await response.arrayBuffer());
+        };
+        return { accent: await load('combo'), click: await load('hit') };
+    }
+
+    function playMetronome(context, sounds, count) {
+        // Clicks are scheduled on the audio clock; their wall times come from
+        // one reading of both clocks. Only the count-in flashes the pad, so
+        // the measured clicks are followed by ear, not by eye.
+        const pad = document.getElementById('calibration-pad');
+        const contextNow = context.currentTime;
+        const wallAtContextNow = wallNow();
+        const beats = [];
+        for (let i = 0; i < CALIBRATION_COUNT_IN + count; i++) {
+            const when = contextNow + 0.5 + i * CALIBRATION_PERIOD;
+            const source = context.createBufferSource();
+            source.buffer = i < CALIBRATION_COUNT_IN ? sounds.accent : sounds.click;
+            source.connect(context.destination);
+            source.start(when);
+            const wall = wallAtContextNow + (when - contextNow) * 1000;
+            if (i < CALIBRATION_COUNT_IN) {
+                setTimeout(() => {
+                    pad.classList.add('beat');
+                    setTimeout(() => pad.classList.remove('beat'), 100);
+                }, wall - wallNow());
+            } else {
+                beats.push(wall);
+            }
+        }
+        const done = new Promise(resolve => {
+            setTimeout(resolve, beats[beats.length - 1] + CALIBRATION_PERIOD * 1000 - wallNow());
+        });
+        return { beats, done };
+    }
+
+    function requestCalibrationResult(socket, payload) {
+        return new Promise((resolve, reject) => {
+            const onResult = (data) => { cleanup(); resolve(data); };
+            const onError = (data) => { cleanup(); reject(new Error(data.message)); };
+            const cleanup = () => {
+                socket.off('calibration_result', onResult);
+                socket.off('calibration_error', onError);
+            };
+            socket.on('calibration_result', onResult);
+            socket.on('calibration_error', onError);
+            socket.emit('finish_calibration', payload);
+        });
+    }
+
+    async function runCalibration() {
+        if (calibrationRunning) return;
+        calibrationRunning = true;
+        const startButton = document.getElementById('start-calibration');
+        const pad = document.getElementById('calibration-pad');
+        startButton.disabled = true;
+        const context = new (window.AudioContext || window.webkitAudioContext)();
+        const taps = [];
+        const onTap = (event) => {
+            if (event.type === 'keydown' && event.code !== 'Space') return;
+            event.preventDefault();
+            taps.push(performance.timeOrigin + event.timeStamp);
+        };
+        try {
+            const sounds = await loadMetronome(context);
+            const socket = getSocket();
+            
+            setCalibrationStep('Step 1: Tap to the beat', 'Press Space or tap the pad on every click after the count-in.');
+            document.addEventListener('keydown', onTap);
+            pad.addEventListener('pointerdown', onTap);
+            const tapRun = playMetronome(context, sounds, CALIBRATION_TAPS);
+            await tapRun.done;
+            document.removeEventListener('keydown', onTap);
+            pad.removeEventListener('pointerdown', onTap);
+            
+            setCalibrationStep('Step 2: Gesture to the beat', 'Switch between a fist and an open hand on every click after the count-in.');
+            socket.emit('start_calibration', { player: PLAYER_ID, device: getDeviceId(), client_wall: wallNow() });
+            const gestureRun = playMetronome(context, sounds, CALIBRATION_GESTURES);
+            await gestureRun.done;
+            
+            renderCalibrationStatus('Measuring...');
+            const result = await requestCalibrationResult(socket, {
+                player: PLAYER_ID,
+                device: getDeviceId(),
+                period: CALIBRATION_PERIOD,
+                tap_beats: tapRun.beats,
+                taps,
+                gesture_beats: gestureRun.beats
+            });
+            gameState.calibration = { output_offset: result.output_offset, input_offset: result.input_offset };
+            setCalibrationStep('Calibration saved', `Measured from ${result.taps} taps and ${result.gestures} gesture changes.`);
+            renderCalibrationStatus();
+            logDebugMessage(`Calibration saved: audio ${result.output_offset}s, camera ${result.input_offset}s`);
+        } catch (error) {
+            setCalibrationStep('Calibration failed', error.message);
+            renderCalibrationStatus();
+            logDebugMessage(`Calibration failed: ${error.message}`, "error");
+        } finally {
+            document.removeEventListener('keydown', onTap);
+            pad.removeEventListener('pointerdown', onTap);
+            context.close();
+            startButton.disabled = false;
+            calibrationRunning = false;
+        }
+    }
+
+    loadCalibration();
+
     function showScreen(screen) {
         Object.values(screens).forEach(s => s.classList.add('hidden'));
         screen.classList.remove('hidden');
@@ -356,7 +541,6 @@ document.addEventListener('DOMContentLoaded', () => {
     document.getElementById('play-again').addEventListener('click', () => {
         showScreen(screens.songSelect);
         resetGameState();
-        restartWebcam();
         logDebugMessage("Play again selected");
     });
 
@@ -481,17 +665,17 @@ document.addEventListener('DOMContentLoaded', () => {
         });
 
         try {
-            setLoadingProgress(30);
+            setLoadingProgress(15);
             const response = await fetch('/select_song', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ video_id: videoId, song_name: songName })
             });
-            setLoadingProgress(60);
             if (!response.ok) {
                 throw new Error(`Select song request failed: ${response.statusText}`);
             }
-            const songData = await response.json();
+            const job = await response.json();
+            const songData = await waitForSongJob(job, loadingText);
 
             if (!songData.name || !songData.file || !songData.bpm || !songData.multiplier) {
                 throw new Error('Invalid song data returned from server');
@@ -502,6 +686,10 @@ document.addEventListener('DOMContentLoaded', () => {
             gameState.bpm = songData.bpm;
             gameState.difficultyMultiplier = songData.multiplier;
             gameState.songDuration = songData.duration;
+            gameState.chart = songData.chart || null;
+            gameState.assets = songData.assets || null;
+            preloadSongAudio();
+            loadSongAssets(gameState.assets);
 
             const selectedSongInfo = document.getElementById('selected-song-info');
             const selectedSongTitle = document.getElementById('selected-song-title');
@@ -528,6 +716,68 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    const SONG_JOB_STAGES = {
+        queued: 'Waiting for a free worker...',
+        starting: 'Processing song...',
+        downloading: 'Downloading song...',
+        converting: 'Converting audio...',
+        analyzing: 'Analyzing beats...',
+        charting: 'Building beat chart...'
+    };
+
+    function waitForSongJob(job, loadingText) {
+        return new Promise((resolve, reject) => {
+            const socket = getSocket();
+            let settled = false;
+            let pollTimer = null;
+            
+            const cleanup = () => {
+                socket.off('song_job', onJobUpdate);
+                socket.off('connect', watchJob);
+                clearInterval(pollTimer);
+            };
+            
+            const handleJob = (data) => {
+                if (settled || !data || data.job_id !== job.job_id) return;
+                if (data.status === 'done') {
+                    settled = true;
+                    cleanup();
+                    setLoadingProgress(100);
+                    resolve(data.result);
+                } else if (data.status === 'error') {
+                    settled = true;
+                    cleanup();
+                    reject(new Error(data.error || 'Song processing failed'));
+                } else {
+                    setLoadingProgress(15 + (data.progress || 0) * 0.85);
+                    if (loadingText && SONG_JOB_STAGES[data.stage]) {
+                        loadingText.textContent = SONG_JOB_STAGES[data.stage];
+                    }
+                }
+            };
+            
+            const onJobUpdate = (data) => handleJob(data);
+            const watchJob = () => socket.emit('watch_song_job', { job_id: job.job_id });
+            
+            socket.on('song_job', onJobUpdate);
+            socket.on('connect', watchJob);
+            if (socket.connected) watchJob();
+            
+            // Progress arrives over Socket.IO; polling only covers a dropped
+            // socket or an update sent before the room was joined.
+            pollTimer = setInterval(async () => {
+                try {
+                    const response = await fetch(`/song_job/${job.job_id}`);
+                    if (response.ok) handleJob(await response.json());
+                } catch (error) {
+                    logDebugMessage(`Song job poll failed: ${error.message}`, "warning");
+                }
+            }, 3000);
+            
+            handleJob(job);
+        });
+    }
+
     function formatTime(seconds) {
         const mins = Math.floor(seconds / 60);
         const secs = Math.floor(seconds % 60);
@@ -563,6 +813,7 @@ document.addEventListener('DOMContentLoaded', () => {
     
     const gestureTypes = ['peace', 'index', 'fist', 'open_hand'];
     let lanePositions = [];
+    let laneGeometry = null;
 
     function calculateLanePositions() {
         lanePositions = [12.5, 37.5, 62.5, 87.5]; 
@@ -572,6 +823,7 @@ document.addEventListener('DOMContentLoaded', () => {
     function initializeGameLane() {
         calculateLanePositions();
         window.addEventListener('resize', calculateLanePositions);
+        window.addEventListener('resize', () => { laneGeometry = null; });
         
         initializeGestureIcons();
         
@@ -597,6 +849,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const hitBoxes = playerLane.querySelectorAll('.hit-box');
         const tiles = Array.from(playerLane.querySelectorAll('.tile'));
         const hitZoneTop = playerLane.clientHeight - 80;
+        const laneRect = playerLane.getBoundingClientRect();
 
         hitBoxes.forEach(hitBox => {
             hitBox.classList.remove('active', ...gestureTypes);
@@ -606,7 +859,6 @@ document.addEventListener('DOMContentLoaded', () => {
         const closestTiles = Array(lanePositions.length).fill(null);
         tiles.forEach(tile => {
             const tileRect = tile.getBoundingClientRect();
-            const laneRect = playerLane.getBoundingClientRect();
             const tileBottom = tileRect.bottom - laneRect.top;
             const laneIdx = lanePositions.findIndex(pos => Math.abs(parseFloat(tile.style.left) - pos) < 1);
 
@@ -758,27 +1010,152 @@ document.addEventListener('DOMContentLoaded', () => {
         }, adjustedInterval / 2); 
     }
     
+    function startChartPlayback() {
+        const chart = gameState.chart;
+        const notes = chart && chart.levels ?
+            (chart.levels[gameState.difficulty] || chart.levels[chart.default_level] || []) : [];
+        const songReady = audio.song && audio.song.readyState >= 2 && !audio.song.error;
+        
+        if (!notes.length || !songReady) {
+            logDebugMessage("No beat chart for this song, falling back to timed tile generation", "warning");
+            startTileGeneration();
+            return;
+        }
+        
+        const settings = gameState.difficultySettings[gameState.difficulty];
+        const fallDuration = settings.fallingSpeed / gameState.speedMultiplier;
+        const lane = document.querySelector('.lane');
+        const laneHeight = lane && lane.clientHeight ? lane.clientHeight : 400;
+        // Arrows fall from -80px to (100% - 80px); their centre crosses the
+        // middle of the 100px hit zone 10px before the animation ends.
+        const leadTime = fallDuration * Math.max(0, (laneHeight - 10) / laneHeight);
+        const session = ++chartSession;
+        let nextNote = 0;
+        startServerJudgment(chart.levels[gameState.difficulty] ? gameState.difficulty : chart.default_level);
+        
+        const scheduleNotes = () => {
+            if (session !== chartSession || screens.game.classList.contains('hidden')) return;
+            
+            if (gameState.isRunning) {
+                // Arrows follow the audio the player hears, output_offset
+                // behind the position the element reports.
+                const songTime = audio.song.currentTime - gameState.calibration.output_offset;
+                while (nextNote < notes.length && notes[nextNote].t - leadTime <= songTime) {
+                    const note = notes[nextNote++];
+                    if (note.t <= songTime) continue;
+                    const direction = GESTURE_LANE_MAP[note.lane] === 'fist' ? 'up' : 'down';
+                    spawnArrow(note.lane, direction, songTime - (note.t - leadTime), note.t);
+                }
+            }
+            
+            if (nextNote < notes.length) {
+                requestAnimationFrame(scheduleNotes);
+            }
+        };
+        
+        requestAnimationFrame(scheduleNotes);
+        logDebugMessage(`Beat chart loaded: ${notes.length} notes for ${gameState.difficulty}`);
+    }
+    
+    function audioClock() {
+        return {
+            song_time: audio.song ? audio.song.currentTime : 0,
+            client_wall: Date.now(),
+            paused: !audio.song || audio.song.paused || !gameState.isRunning
+        };
+    }
+    
+    function startServerJudgment(level) {
+        // Hits on charted notes are judged by the server from the gesture
+        // stream; the page only reports where the song is and shows results.
+        stopServerJudgment();
+        const socket = getSocket();
+        gameState.serverJudgment = true;
+        socket.emit('start_judgment', { player: PLAYER_ID, song: gameState.song, level, device: getDeviceId(), ...audioClock() });
+        judgmentClockTimer = setInterval(() => {
+            socket.emit('song_clock', { player: PLAYER_ID, ...audioClock() });
+        }, 250);
+        logDebugMessage(`Server judgment started for ${gameState.song} (${level})`);
+    }
+    
+    function stopServerJudgment() {
+        if (judgmentClockTimer) {
+            clearInterval(judgmentClockTimer);
+            judgmentClockTimer = null;
+        }
+        if (gameState.serverJudgment) {
+            gameState.serverJudgment = false;
+            getSocket().emit('end_judgment', { player: PLAYER_ID });
+        }
+    }
+    
+    function applyJudgment(data) {
+        if (!gameState.serverJudgment || data.player !== PLAYER_ID) return;
+        const arrowsContainer = document.getElementById(`lane-arrows-${data.lane}`);
+        if (arrowsContainer) {
+            const arrow = Array.from(arrowsContainer.querySelectorAll('.arrow'))
+                .find(a => a.dataset.noteTime !== undefined && Math.abs(Number(a.dataset.noteTime) - data.t) < 0.0005);
+            if (arrow) arrow.remove();
+        }
+        const playerState = gameState.player1;
+        const previousCombo = playerState.combo;
+        playerState.score = data.score;
+        playerState.combo = data.combo;
+        playerState.maxCombo = data.max_combo;
+        playerState.hits = data.hits;
+        const comboMultiplier = Math.min(Math.floor(previousCombo / 10) + 1, 5);
+        renderScore('player1', data.points, data.result, data.result === 'miss' ? -1 : data.lane, comboMultiplier);
+    }
+    
+    function getSocket() {
+        if (!appSocket) {
+            appSocket = io();
+        }
+        return appSocket;
+    }
+    
     function setupGestureDetection() {
-        const socket = io();
+        if (gestureDetectionStarted) return;
+        gestureDetectionStarted = true;
+        const socket = getSocket();
+        if (socket.connected) {
+            socket.emit('join_player', { player: PLAYER_ID });
+        }
         
         socket.on('connect', () => {
+            socket.emit('join_player', { player: PLAYER_ID });
             logDebugMessage("Socket.IO connected for gesture detection");
         });
         
         socket.on('gesture', (data) => {
             try {
+                const receivedAt = performance.now();
+                const receivedWall = Date.now();
                 const gesture = data.gesture.toLowerCase();
                 
-                currentGesture = gesture;
-                
-                setRightPanelGesture(gesture);
+                if (gesture !== currentGesture) {
+                    currentGesture = gesture;
+                    setRightPanelGesture(gesture);
+                    const calibrationGesture = document.getElementById('calibration-gesture');
+                    if (calibrationGesture) calibrationGesture.textContent = GESTURE_NAMES[gesture] || gesture;
+                }
                 
-                checkHits(gesture);
+                const hit = gameState.serverJudgment ? false : checkHits(gesture);
+                if (!data.heartbeat) {
+                    recordGestureLatency(data, receivedWall, receivedAt, hit);
+                }
             } catch (error) {
                 logDebugMessage(`Socket.IO message error: ${error.message}`, "error");
             }
         });
         
+        socket.on('judgment', applyJudgment);
+        
+        socket.on('judgment_error', (data) => {
+            logDebugMessage(`Server judgment unavailable: ${data.message}`, "warning");
+            gameState.serverJudgment = false;
+        });
+        
         socket.on('disconnect', () => {
             logDebugMessage("Socket.IO disconnected", "error");
         });
@@ -787,60 +1164,102 @@ document.addEventListener('DOMContentLoaded', () => {
             logDebugMessage(`Socket.IO connection error: ${error.message}`, "error");
         });
         
-        const requestGestures = () => {
-            if (gameState.isRunning && socket.connected) {
-                socket.emit('request_gesture', { player: 1 });
+        const checkHeldGesture = () => {
+            if (gameState.isRunning && !gameState.serverJudgment && currentGesture !== 'none') {
+                checkHits(currentGesture);
             }
-            setTimeout(requestGestures, 100);
+            requestAnimationFrame(checkHeldGesture);
         };
         
-        requestGestures();
+        requestAnimationFrame(checkHeldGesture);
+        setInterval(flushLatencySamples, 5000);
+    }
+    
+    function recordGestureLatency(data, receivedWall, receivedAt, hit) {
+        // Server and page share a host in normal play, so wall clocks agree
+        // closely enough for the network hop.
+        const network = data.sent_wall ? Math.max(0, receivedWall - data.sent_wall * 1000) : null;
+        const judgment = performance.now() - receivedAt;
+        latencySamples.push({
+            network: network,
+            client_judgment: judgment,
+            end_to_end: (data.server_ms != null && network != null) ? data.server_ms + network + judgment : null,
+            hit: hit
+        });
+        if (latencySamples.length > 500) {
+            latencySamples.shift();
+        }
+    }
+    
+    function flushLatencySamples() {
+        if (!latencySamples.length) return;
+        const samples = latencySamples;
+        latencySamples = [];
+        fetch('/debug/metrics', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ samples }),
+            keepalive: true
+        }).catch(error => console.error('Error reporting latency samples:', error));
+    }
+    
+    function measureLanes() {
+        // Lane and hit-zone geometry only changes on resize, so it is read
+        // once and reused by every checkHits call until then.
+        const measured = [];
+        for (let laneIdx = 0; laneIdx < 4; laneIdx++) {
+            const lane = document.querySelector(`.lane[data-lane="${laneIdx}"]`);
+            const hitZone = lane ? lane.querySelector('.hit-zone') : null;
+            measured.push(lane && hitZone && lane.clientHeight ? {
+                height: lane.clientHeight,
+                hitZoneTop: hitZone.offsetTop,
+                hitZoneBottom: hitZone.offsetTop + hitZone.offsetHeight
+            } : null);
+        }
+        // A hidden game screen measures as zero; try again next call.
+        laneGeometry = measured.every(Boolean) ? measured : null;
+        return measured;
+    }
+    
+    function arrowCenter(arrow, height, now) {
+        // Arrows fall linearly from -ARROW_SIZE to (100% - ARROW_SIZE), so
+        // where one is follows from when it started falling, without asking
+        // the layout engine.
+        const progress = Math.min(1, Math.max(0, (now - arrow.fallStart) / arrow.fallDuration));
+        return -ARROW_SIZE + progress * height + ARROW_SIZE / 2;
     }
     
     function checkHits(gesture) {
-        if (!gameState.isRunning) return;
+        if (!gameState.isRunning) return false;
+        
+        const geometry = laneGeometry || measureLanes();
+        const now = performance.now() / 1000;
         
         for (let laneIdx = 0; laneIdx < 4; laneIdx++) {
             const arrowsContainer = document.getElementById(`lane-arrows-${laneIdx}`);
-            if (!arrowsContainer) continue;
+            if (!arrowsContainer || !geometry[laneIdx]) continue;
             
-            const arrows = Array.from(arrowsContainer.querySelectorAll('.arrow'));
+            const arrows = arrowsContainer.children;
             if (!arrows.length) continue;
             
-            const lane = document.querySelector(`.lane[data-lane="${laneIdx}"]`);
-            if (!lane) continue;
-            
-            const laneRect = lane.getBoundingClientRect();
-            const hitZone = lane.querySelector('.hit-zone');
-            const hitZoneRect = hitZone ? hitZone.getBoundingClientRect() : null;
-            
-            if (!hitZoneRect) continue;
-            
-            const hitZoneTop = hitZoneRect.top - laneRect.top;
-            const hitZoneBottom = hitZoneRect.bottom - laneRect.top;
-            
-            const arrowsInHitZone = arrows.filter(arrow => {
-                const arrowRect = arrow.getBoundingClientRect();
-                const arrowCenter = arrowRect.top + (arrowRect.height / 2) - laneRect.top;
-                return arrowCenter >= hitZoneTop && arrowCenter <= hitZoneBottom;
-            });
-            
-            if (!arrowsInHitZone.length) continue;
-            
+            const { height, hitZoneTop, hitZoneBottom } = geometry[laneIdx];
             const hitZoneCenter = (hitZoneTop + hitZoneBottom) / 2;
-            arrowsInHitZone.sort((a, b) => {
-                const aRect = a.getBoundingClientRect();
-                const bRect = b.getBoundingClientRect();
-                const aCenter = aRect.top + (aRect.height / 2) - laneRect.top;
-                const bCenter = bRect.top + (bRect.height / 2) - laneRect.top;
-                return Math.abs(aCenter - hitZoneCenter) - Math.abs(bCenter - hitZoneCenter);
-            });
             
-            const closestArrow = arrowsInHitZone[0];
-            const closestArrowRect = closestArrow.getBoundingClientRect();
-            const closestArrowCenter = closestArrowRect.top + (closestArrowRect.height / 2) - laneRect.top;
+            let closestArrow = null;
+            let distanceFromCenter = Infinity;
+            for (const arrow of arrows) {
+                if (arrow.fallStart === undefined) continue;
+                const center = arrowCenter(arrow, height, now);
+                if (center < hitZoneTop || center > hitZoneBottom) continue;
+                const distance = Math.abs(center - hitZoneCenter);
+                if (distance < distanceFromCenter) {
+                    closestArrow = arrow;
+                    distanceFromCenter = distance;
+                }
+            }
+            
+            if (!closestArrow) continue;
             
-            const distanceFromCenter = Math.abs(closestArrowCenter - hitZoneCenter);
             const maxDistance = (hitZoneBottom - hitZoneTop) / 2;
             const accuracy = 1 - (distanceFromCenter / maxDistance);
             
@@ -869,10 +1288,11 @@ document.addEventListener('DOMContentLoaded', () => {
                     
                     updateScore('player1', score, feedback, laneIdx);
                     
-                    return;
+                    return true;
                 }
             }
         }
+        return false;
     }
     
     function updateScore(player, score, feedback, laneIdx) {
@@ -902,9 +1322,23 @@ document.addEventListener('DOMContentLoaded', () => {
                 playerState.maxCombo = playerState.combo;
             }
             
+            if (streakBonus > 0) {
+                feedback += ` +${streakBonus}`;
+            }
+        } else {
+            playerState.combo = 0;
+            playerState.perfectStreak = 0;
+        }
+        
+        renderScore(player, score, feedback, laneIdx, comboMultiplier);
+    }
+    
+    function renderScore(player, score, feedback, laneIdx, comboMultiplier) {
+        const playerState = gameState[player];
+        if (score > 0) {
             if (playerState.combo % 10 === 0 && playerState.combo >= 10) {
                 playSound('combo');
-            } else if (feedback === 'perfect') {
+            } else if (feedback.split(' ')[0] === 'perfect') {
                 playSound('hit');
                 if (audio.hit) {
                     audio.hit.playbackRate = 1.05;
@@ -915,13 +1349,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     audio.hit.playbackRate = 1.0;
                 }
             }
-            
-            if (streakBonus > 0) {
-                feedback += ` +${streakBonus}`;
-            }
         } else {
-            playerState.combo = 0;
-            playerState.perfectStreak = 0;
             playSound('miss');
         }
         
@@ -1011,7 +1439,7 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         
         try {
-            await restartWebcam();
+            await startCamera();
             
             showScreen(screens.game);
             
@@ -1068,11 +1496,16 @@ document.addEventListener('DOMContentLoaded', () => {
             
             try {
                 setLoadingProgress(30);
-                audio.song.src = `${gameState.songFile}`;
-                audio.song.load();
+                // Usually already buffered since the song was selected.
+                const songUrl = songAudioUrl();
+                if (audio.song.getAttribute('src') !== songUrl) {
+                    audio.song.src = songUrl;
+                    audio.song.load();
+                }
                 
                 await Promise.race([
                     new Promise(resolve => {
+                        if (audio.song.readyState >= 4) resolve();
                         audio.song.oncanplaythrough = resolve;
                     }),
                     new Promise((_, reject) => {
@@ -1113,7 +1546,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     }
                     
                     updateTimeDisplay();
-                    startTileGeneration();
+                    startChartPlayback();
                     setupGestureDetection();
                     
                     const timerInterval = setInterval(() => {
@@ -1199,6 +1632,8 @@ document.addEventListener('DOMContentLoaded', () => {
     
     function endGame() {
         gameState.isRunning = false;
+        stopServerJudgment();
+        pauseCamera();
         if (audio.song) {
             audio.song.pause();
             audio.song.currentTime = 0;
@@ -1255,6 +1690,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
     
     function resetGameState(preserveSong = false) {
+        stopServerJudgment();
         gameState.player1 = { score: 0, combo: 0, maxCombo: 0, hits: 0, totalNotes: 0 };
         gameState.player2 = { score: 0, combo: 0, maxCombo: 0, hits: 0, totalNotes: 0 };
         gameState.isRunning = false;
@@ -1268,6 +1704,10 @@ document.addEventListener('DOMContentLoaded', () => {
             gameState.bpm = 120;
             gameState.difficultyMultiplier = 1.0;
             gameState.songDuration = 0;
+            gameState.chart = null;
+            gameState.assets = null;
+            gameState.waveform = null;
+            gameState.beatGrid = null;
         }
         
         document.getElementById('score').textContent = '0';
@@ -1280,11 +1720,59 @@ document.addEventListener('DOMContentLoaded', () => {
         document.getElementById('time-value').textContent = '0:00';
         document.getElementById('header-progress-fill').style.width = '0%';
         
-        restartWebcam();
+        pauseCamera();
         
         logDebugMessage("Game state reset");
     }
     
+    function cameraRequest() {
+        // Only this page's camera: on a shared server the other stations'
+        // cameras are theirs to start and pause.
+        return {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ player: PLAYER_ID })
+        };
+    }
+    
+    async function startCamera() {
+        // Resumes the camera from standby (or opens it on the first game).
+        // Only a camera that is not delivering frames gets a full restart.
+        try {
+            const response = await fetch('/camera/start', cameraRequest());
+            if (!response.ok) {
+                throw new Error(`Camera start failed: ${response.statusText}`);
+            }
+            const result = await response.json();
+            const cameras = Object.values(result.cameras || {});
+            logDebugMessage(`Camera started in ${result.elapsed_ms} ms`);
+            if (cameras.some(camera => !camera.opened)) {
+                await restartWebcam();
+                return;
+            }
+            
+            const webcamFeed = document.getElementById('webcam1');
+            if (webcamFeed && !webcamFeed.getAttribute('src')) {
+                webcamFeed.src = `/video_feed?player=${PLAYER_ID}&t=${new Date().getTime()}`;
+            }
+        } catch (error) {
+            console.error('Error starting camera:', error);
+            logDebugMessage(`Error starting camera: ${error.message}`, "error");
+        }
+    }
+    
+    function pauseCamera() {
+        // Closing the preview stream lets the server encode nothing while
+        // the camera sits in standby between games.
+        const webcamFeed = document.getElementById('webcam1');
+        if (webcamFeed && webcamFeed.getAttribute('src')) {
+            webcamFeed.removeAttribute('src');
+        }
+        fetch('/camera/pause', cameraRequest()).catch(error => {
+            logDebugMessage(`Error pausing camera: ${error.message}`, "error");
+        });
+    }
+    
     async function restartWebcam() {
         try {
             logDebugMessage("Restarting webcam...");
@@ -1297,9 +1785,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 loadingOverlay.classList.remove('hidden');
             }
             
-            const response = await fetch('/restart_webcam', {
-                method: 'POST'
-            });
+            const response = await fetch('/restart_webcam', cameraRequest());
             
             if (!response.ok) {
                 throw new Error(`Webcam restart failed: ${response.statusText}`);
@@ -1311,7 +1797,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const webcamFeed = document.getElementById('webcam1');
             if (webcamFeed) {
                 const timestamp = new Date().getTime();
-                webcamFeed.src = `/video_feed?player=1&t=${timestamp}`;
+                webcamFeed.src = `/video_feed?player=${PLAYER_ID}&t=${timestamp}`;
             }
             
             if (loadingOverlay) {
@@ -1361,6 +1847,8 @@ document.addEventListener('DOMContentLoaded', () => {
     syncSettings();
     logDebugMessage("Game initialized");
 
+    // Matches the .arrow size in style.css.
+    const ARROW_SIZE = 80;
     const ARROW_ICONS = {
         up: '⬆️',
         down: '⬇️'
@@ -1389,7 +1877,7 @@ document.addEventListener('DOMContentLoaded', () => {
         'open_hand'   
     ];
 
-    function spawnArrow(laneIdx, direction) {
+    function spawnArrow(laneIdx, direction, lateBy = 0, noteTime = null) {
         const arrowsContainer = document.getElementById(`lane-arrows-${laneIdx}`);
         if (!arrowsContainer) return;
         
@@ -1403,6 +1891,15 @@ document.addEventListener('DOMContentLoaded', () => {
         const fallDuration = settings.fallingSpeed / gameState.speedMultiplier;
         
         arrow.style.animationDuration = `${fallDuration}s`;
+        if (lateBy > 0) {
+            arrow.style.animationDelay = `-${lateBy}s`;
+        }
+        // Read by checkHits to place the arrow from the clock.
+        arrow.fallStart = performance.now() / 1000 - Math.max(0, lateBy);
+        arrow.fallDuration = fallDuration;
+        if (noteTime !== null) {
+            arrow.dataset.noteTime = noteTime;
+        }
         
         arrowsContainer.appendChild(arrow);
         
@@ -1412,7 +1909,10 @@ document.addEventListener('DOMContentLoaded', () => {
         
         arrow.addEventListener('animationend', () => {
             if (arrow.parentElement) {
-                handleMiss('player1');
+                // Under server judgment the miss arrives as a judgment event.
+                if (!(gameState.serverJudgment && noteTime !== null)) {
+                    handleMiss('player1');
+                }
                 arrow.remove();
             }
         });
@@ -1473,10 +1973,105 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
 
+    function songAudioUrl() {
+        // The game plays the original file: the mono re-encode sounds worse
+        // and its encoder delay shifts the audio against the beat chart.
+        if (PREVIEW_AUDIO && gameState.assets && gameState.assets.preview) {
+            return gameState.assets.preview;
+        }
+        return gameState.songFile;
+    }
+    
+    function preloadSongAudio() {
+        const url = songAudioUrl();
+        if (url && audio.song.getAttribute('src') !== url) {
+            audio.song.src = url;
+            audio.song.load();
+        }
+    }
+    
+    async function fetchAsset(url) {
+        const response = await fetch(url);
+        if (!response.ok) {
+            throw new Error(`${url}: ${response.statusText}`);
+        }
+        return response.arrayBuffer();
+    }
+    
+    function parseWaveform(buffer) {
+        // audiowaveform .dat, version 1, 8-bit: a 20-byte header, then one
+        // min/max pair per pixel.
+        const view = new DataView(buffer);
+        return {
+            sampleRate: view.getInt32(8, true),
+            samplesPerPixel: view.getInt32(12, true),
+            length: view.getUint32(16, true),
+            data: new Int8Array(buffer, 20)
+        };
+    }
+    
+    async function loadSongAssets(assets) {
+        const song = gameState.song;
+        gameState.waveform = null;
+        gameState.beatGrid = null;
+        drawWaveform();
+        if (!assets || !assets.peaks || !assets.beats) return;
+        try {
+            const [peaks, beats] = await Promise.all([fetchAsset(assets.peaks), fetchAsset(assets.beats)]);
+            if (gameState.song !== song) return;
+            gameState.waveform = parseWaveform(peaks);
+            gameState.beatGrid = new Float32Array(beats);
+            drawWaveform();
+            logDebugMessage(`Loaded song assets: ${peaks.byteLength + beats.byteLength} bytes, ${gameState.beatGrid.length} beats`);
+        } catch (error) {
+            logDebugMessage(`Error loading song assets: ${error.message}`, "warning");
+        }
+    }
+    
+    function drawWaveform() {
+        const canvas = document.getElementById('song-waveform');
+        if (!canvas) return;
+        const waveform = gameState.waveform;
+        canvas.classList.toggle('hidden', !waveform);
+        if (!waveform || !waveform.length) return;
+        
+        const width = canvas.width = canvas.clientWidth || 600;
+        const height = canvas.height;
+        const middle = height / 2;
+        const perColumn = waveform.length / width;
+        const ctx = canvas.getContext('2d');
+        ctx.clearRect(0, 0, width, height);
+        ctx.fillStyle = '#4b6cb7';
+        for (let x = 0; x < width; x++) {
+            let low = 0;
+            let high = 0;
+            const end = Math.min(waveform.length, Math.ceil((x + 1) * perColumn));
+            for (let i = Math.floor(x * perColumn); i < end; i++) {
+                low = Math.min(low, waveform.data[i * 2]);
+                high = Math.max(high, waveform.data[i * 2 + 1]);
+            }
+            ctx.fillRect(x, middle - (high / 128) * middle, 1, Math.max(1, ((high - low) / 128) * middle));
+        }
+        
+        const duration = waveform.length * waveform.samplesPerPixel / waveform.sampleRate;
+        if (gameState.beatGrid && duration > 0) {
+            ctx.fillStyle = 'rgba(254, 202, 87, 0.8)';
+            gameState.beatGrid.forEach(time => {
+                ctx.fillRect(Math.round((time / duration) * width), 0, 1, 6);
+            });
+        }
+    }
+    
     function setHeaderProgress(percent) {
         const fill = document.getElementById('header-progress-fill');
         if (fill) fill.style.width = `${percent}%`;
     }
 
     let currentGesture = 'none';
+    let appSocket = null;
+    let gestureDetectionStarted = false;
+    let chartSession = 0;
+    let latencySamples = [];
+    let judgmentClockTimer = null;
+    let calibrationRunning = false;
 });
\ No newline at end of file
@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from flask import Response, request, send_file
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+from song_cache import file_digest
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+FINGERPRINT_LENGTH = 12
+PRECOMPRESS_EXTENSIONS = ('.js', '.css')
+ASSET_REFERENCE = re.compile(r'((?:src|href)=")(static/[^"?#]+)(")')
+
+
+def precompress(directories, extensions=PRECOMPRESS_EXTENSIONS):
+    # Writes .gz (and .br when the brotli package is installed) next to each
+    # JS and CSS file, skipping variants that are already newer than their
+    # source. Returns how many files were written.
+    try:
+        import brotli
+    except ImportError:
+        brotli = None
+    written = 0
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            if not filename.endswith(extensions):
+                continue
+            path = os.path.join(directory, filename)
+            variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+            data = None
+            for suffix, compress in variants:
+                target = path + suffix
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                if data is None:
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                tmp_path = f'{target}.tmp{os.getpid()}'
+                with open(tmp_path, 'wb') as f:
+                    f.write(compress(data))
+                os.replace(tmp_path, target)
+                written += 1
+    return written
+
+
+class StaticAssets:
+    # Serves files with strong ETags taken from their content, so a replay
+    # or restart revalidates to a 304 instead of downloading again, and
+    # conditional send_file answers Range with 206 for seeking. URLs that
+    # carry the current fingerprint (?v=<first 12 hex of the hash>) are
+    # immutable and cached for a year; anything else must revalidate.
+    # Content hashes are remembered per path with size and mtime, like
+    # AnalysisCache, so files are hashed once until they change.
+    def __init__(self, precompressed=True):
+        self.precompressed = precompressed
+        self.lock = threading.Lock()
+        self.hashes = {}
+
+    def etag_for(self, path):
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self.lock:
+            known = self.hashes.get(key)
+            if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+                return known[2]
+        content_hash = file_digest(path)
+        with self.lock:
+            self.hashes[key] = (stat.st_size, stat.st_mtime_ns, content_hash)
+        return content_hash
+
+    def fingerprint(self, path):
+        return self.etag_for(path)[:FINGERPRINT_LENGTH]
+
+    def versioned_url(self, url, path):
+        return f'{url}?v={self.fingerprint(path)}'
+
+    def _encoding_for(self, path):
+        # The best precompressed variant the client accepts that is not
+        # older than the file itself.
+        if not self.precompressed or not path.endswith(PRECOMPRESS_EXTENSIONS):
+            return None, path
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            variant = path + suffix
+            if (request.accept_encodings.quality(encoding) > 0 and os.path.isfile(variant) and
+                    os.path.getmtime(variant) >= os.path.getmtime(path)):
+                return encoding, variant
+        return None, path
+
+    def _cache(self, response, etag):
+        version = request.args.get('v')
+        if version and len(version) >= 8 and etag.startswith(version):
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
+
+    def send(self, directory, filename, etag=None, mimetype=None):
+        path = safe_join(directory, filename)
+        if path is None or not os.path.isfile(path):
+            raise NotFound()
+        # Absolute, so send_file does not resolve it against the app root.
+        path = os.path.abspath(path)
+        etag = etag or self.etag_for(path)
+        encoding, send_path = self._encoding_for(path)
+        if encoding:
+            # Each encoding is its own representation and needs its own tag.
+            response = send_file(send_path, mimetype=mimetype or mimetypes.guess_type(path)[0],
+                                 etag=f'{etag}-{encoding}', conditional=True)
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_file(path, mimetype=mimetype, etag=etag, conditional=True)
+        if path.endswith(PRECOMPRESS_EXTENSIONS):
+            response.vary.add('Accept-Encoding')
+        return self._cache(response, etag)
+
+    def render_page(self, path):
+        # The page itself always revalidates; the static files it references
+        # get fingerprinted URLs, so a new deploy is picked up on the next
+        # load and unchanged files are never requested again.
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        def versioned(match):
+            if not os.path.isfile(match.group(2)):
+                return match.group(0)
+            return f'{match.group(1)}{self.versioned_url(match.group(2), match.group(2))}{match.group(3)}'
+
+        body = ASSET_REFERENCE.sub(versioned, html)
+        response = Response(body, mimetype='text/html')
+        response.set_etag(hashlib.sha1(body.encode('utf-8')).hexdigest())
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
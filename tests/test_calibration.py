@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calibration import beat_offsets, estimate_offsets, robust_offset
+
+PERIOD = 0.6
+# Fixed jitter, in seconds, added to each event of the synthetic runs.
+JITTER = [0.004, -0.006, 0.002, 0.0, -0.003, 0.005, -0.001, 0.003, -0.004, 0.001, 0.006, -0.002,
+          0.002, -0.005, 0.0, 0.004]
+
+
+def beats(count, start=10.0):
+    return [start + PERIOD * i for i in range(count)]
+
+
+class BeatOffsetsTest(unittest.TestCase):
+    def test_events_are_matched_to_the_nearest_beat(self):
+        self.assertEqual([round(o, 3) for o in beat_offsets([1.0, 1.6], [0.95, 1.7], PERIOD)], [-0.05, 0.1])
+
+    def test_events_far_from_every_beat_are_dropped(self):
+        self.assertEqual(beat_offsets([1.0, 1.6], [0.0, 2.5], PERIOD), [])
+
+
+class RobustOffsetTest(unittest.TestCase):
+    def test_outliers_past_three_mads_are_rejected(self):
+        offsets = [0.1 + j for j in JITTER[:10]] + [0.28, -0.1]
+        result = robust_offset(offsets)
+        self.assertEqual(result['rejected'], 2)
+        self.assertEqual(result['events'], 10)
+        self.assertAlmostEqual(result['offset'], 0.1005, places=4)
+
+    def test_mad_floor_keeps_a_steady_players_jitter(self):
+        offsets = [0.05] * 8 + [0.075]
+        self.assertEqual(robust_offset(offsets)['rejected'], 0)
+
+    def test_too_few_events(self):
+        self.assertIsNone(robust_offset([0.1, 0.1, 0.1]))
+        self.assertIsNone(robust_offset([0.1, 0.1, 0.1, 0.5, -0.3], min_events=4))
+
+
+class EstimateOffsetsTest(unittest.TestCase):
+    def test_synthetic_run(self):
+        # Taps 40 ms late (audio output), gestures 150 ms late, so the camera
+        # pipeline adds 110 ms. One tap and one gesture are stray.
+        tap_beats = beats(12)
+        taps = [beat + 0.04 + JITTER[i] for i, beat in enumerate(tap_beats)]
+        taps[5] += 0.2
+        gesture_beats = beats(16, start=20.0)
+        gestures = [beat + 0.15 + JITTER[i] for i, beat in enumerate(gesture_beats)]
+        gestures[9] -= 0.25
+        result = estimate_offsets(tap_beats, taps, gesture_beats, gestures, PERIOD)
+        self.assertAlmostEqual(result['output_offset'], 0.04, delta=0.003)
+        self.assertAlmostEqual(result['input_offset'], 0.11, delta=0.005)
+        self.assertEqual(result['taps'], 11)
+        self.assertEqual(result['gestures'], 15)
+
+    def test_without_taps_the_whole_delay_is_input(self):
+        gesture_beats = beats(8)
+        gestures = [beat + 0.12 for beat in gesture_beats]
+        result = estimate_offsets([], [], gesture_beats, gestures, PERIOD)
+        self.assertEqual(result['output_offset'], 0.0)
+        self.assertAlmostEqual(result['input_offset'], 0.12, places=4)
+
+    def test_too_few_gestures(self):
+        with self.assertRaises(ValueError):
+            estimate_offsets([], [], beats(8), [10.0, 10.6], PERIOD)
+
+    def test_implausible_offset(self):
+        gesture_beats = beats(8)
+        taps = [beat - 0.25 for beat in gesture_beats]
+        gestures = [beat + 0.28 for beat in gesture_beats]
+        with self.assertRaises(ValueError):
+            estimate_offsets(gesture_beats, taps, gesture_beats, gestures, PERIOD)
+
+
+if __name__ == '__main__':
+    unittest.main()
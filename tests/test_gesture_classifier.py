@@ -0,0 +1,72 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gestures import classify_landmarks, landmarks_to_array
+
+SEED = 20240611
+SAMPLES = 20000
+
+
+def detect_gesture(hand_landmarks):
+    # The per-landmark rules main.py used before the lookup table, verbatim.
+    if not hand_landmarks:
+        return "none"
+    landmarks = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+    if (landmarks[8][1] < landmarks[5][1] and landmarks[12][1] < landmarks[9][1] and
+        landmarks[16][1] > landmarks[13][1] and landmarks[20][1] > landmarks[17][1]):
+        return "peace"
+    if (landmarks[8][1] < landmarks[5][1] and landmarks[12][1] > landmarks[9][1] and
+        landmarks[16][1] > landmarks[13][1] and landmarks[20][1] > landmarks[17][1]):
+        return "index"
+    if (landmarks[8][1] > landmarks[5][1] and landmarks[12][1] > landmarks[9][1] and
+        landmarks[16][1] > landmarks[13][1] and landmarks[20][1] > landmarks[17][1]):
+        return "fist"
+    if (landmarks[8][1] < landmarks[5][1] and landmarks[12][1] < landmarks[9][1] and
+        landmarks[16][1] < landmarks[13][1] and landmarks[20][1] < landmarks[17][1]):
+        return "open_hand"
+    return "none"
+
+
+def as_hand_landmarks(array):
+    # Shaped like MediaPipe's NormalizedLandmarkList.
+    return SimpleNamespace(landmark=[SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in array])
+
+
+def random_hands(rng, count):
+    hands = rng.random((count, 21, 3), dtype=np.float32)
+    # Snap a quarter of the hands to a coarse grid so tips level with their
+    # MCP joints, which neither rule set treats as extended or folded, come up.
+    snapped = rng.random(count) < 0.25
+    hands[snapped] = np.round(hands[snapped] * 4) / 4
+    return hands
+
+
+class ClassifierParityTest(unittest.TestCase):
+    def test_matches_per_landmark_rules(self):
+        hands = random_hands(np.random.default_rng(SEED), SAMPLES)
+        expected = [detect_gesture(as_hand_landmarks(hand)) for hand in hands]
+        batch = [str(label) for label in classify_landmarks(hands)]
+        mismatches = [idx for idx, (old, new) in enumerate(zip(expected, batch)) if old != new]
+        self.assertEqual(mismatches, [])
+        # Every gesture, and the level-tip case, must actually be exercised.
+        self.assertEqual(set(expected), {'none', 'peace', 'index', 'fist', 'open_hand'})
+
+    def test_single_hand_path_matches(self):
+        hands = random_hands(np.random.default_rng(SEED + 1), 2000)
+        for hand in hands:
+            hand_landmarks = as_hand_landmarks(hand)
+            self.assertEqual(classify_landmarks(landmarks_to_array(hand_landmarks)), detect_gesture(hand_landmarks))
+
+    def test_missing_hand_is_none(self):
+        self.assertEqual(detect_gesture(None), 'none')
+        self.assertEqual(classify_landmarks(np.full((21, 3), np.nan, dtype=np.float32)), 'none')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from gesture_pipeline_benchmark import SYNTHETIC_FINGERS, synthetic_landmarks
+from gestures import FINGER_MCPS, FINGER_TIPS, GestureTracker, classify_landmarks, track_sequence
+from hand_assignment import HandAssigner
+
+FPS = 30.0
+# Recorded run: a one-frame flicker, two frames without a hand, and three
+# real changes. Each entry is (gesture, frames); None means no hand.
+SCRIPT = [('fist', 6), ('index', 1), ('fist', 3), ('peace', 6), (None, 2), ('peace', 3), ('open_hand', 5)]
+# Window 5 at 0.6/0.4: the tracker switches on the third frame of a new
+# gesture and backdates started_at to its first frame.
+EXPECTED_CHANGES = [(0, 'fist', 0), (12, 'peace', 10), (23, 'open_hand', 21)]
+
+
+def hand(gesture, x=0.5, y=0.5):
+    landmarks = np.zeros((21, 3), dtype=np.float32)
+    landmarks[:, 0] = x
+    landmarks[:, 1] = y
+    landmarks[FINGER_MCPS, 1] = y - 0.05
+    for finger, extended in enumerate(SYNTHETIC_FINGERS[gesture]):
+        landmarks[FINGER_TIPS[finger], 1] = y - 0.05 + (-0.12 if extended else 0.06)
+    return landmarks
+
+
+def recorded_run():
+    frames, labels = [], []
+    for gesture, count in SCRIPT:
+        for _ in range(count):
+            frames.append(hand(gesture) if gesture else np.full((21, 3), np.nan, dtype=np.float32))
+            labels.append(gesture or 'none')
+    return np.stack(frames), labels
+
+
+class GestureTrackerTest(unittest.TestCase):
+    def test_recorded_run(self):
+        landmarks, labels = recorded_run()
+        self.assertEqual([str(label) for label in classify_landmarks(landmarks)], labels)
+        states = track_sequence(landmarks, [idx / FPS for idx in range(len(labels))])
+        changes = [(idx, state.gesture, round(state.started_at * FPS))
+                   for idx, state in enumerate(states) if state.changed]
+        self.assertEqual(changes, EXPECTED_CHANGES)
+        tracked = [state.gesture for state in states]
+        # The flicker at frame 6 and the dropout at frames 16-17 never show.
+        self.assertEqual(tracked[:12], ['fist'] * 12)
+        self.assertEqual(tracked[12:23], ['peace'] * 11)
+        self.assertEqual(tracked[23:], ['open_hand'] * 3)
+
+    def test_no_majority_keeps_the_current_gesture(self):
+        tracker = GestureTracker()
+        for idx in range(5):
+            tracker.update('fist', idx)
+        for idx, gesture in enumerate(['index', 'peace', 'index', 'peace', 'open_hand', 'index'], start=5):
+            state = tracker.update(gesture, idx)
+            self.assertEqual(state.gesture, 'fist')
+            self.assertFalse(state.changed)
+
+    def test_exit_ratio_holds_the_current_gesture(self):
+        tracker = GestureTracker(window=5, enter_ratio=0.6, exit_ratio=0.2)
+        for idx in range(5):
+            tracker.update('fist', idx)
+        states = [tracker.update('peace', idx) for idx in range(5, 9)]
+        # Peace has the majority from its third frame, but fist is still at
+        # 0.4 of the window until the fourth.
+        self.assertEqual([state.gesture for state in states], ['fist', 'fist', 'fist', 'peace'])
+        self.assertEqual(states[-1].started_at, 5)
+
+    def test_reset_forgets_history(self):
+        tracker = GestureTracker()
+        for idx in range(5):
+            tracker.update('fist', idx)
+        tracker.reset()
+        state = tracker.update('peace', 10)
+        self.assertEqual((state.gesture, state.started_at, state.changed), ('peace', 10, True))
+
+    def test_synthetic_fixture(self):
+        # The benchmark fixture: raw labels are exact, and the tracker only
+        # disagrees within a window of a label change (including dropouts).
+        landmarks, labels = synthetic_landmarks(3000, seed=0)
+        self.assertEqual([str(label) for label in classify_landmarks(landmarks)], labels)
+        states = track_sequence(landmarks, [idx / FPS for idx in range(len(labels))])
+        for idx, state in enumerate(states):
+            if state.gesture != labels[idx]:
+                recent = labels[max(0, idx - 4):idx + 1]
+                self.assertNotEqual(set(recent), {labels[idx]}, idx)
+
+
+class HandAssignerTest(unittest.TestCase):
+    def test_new_hands_go_to_the_player_on_their_side(self):
+        for hands in ([(hand('fist', 0.3), 'Right'), (hand('fist', 0.7), 'Left')],
+                      [(hand('fist', 0.7), 'Left'), (hand('fist', 0.3), 'Right')]):
+            assigner = HandAssigner([1, 2])
+            assignment = assigner.assign(hands, 0.0)
+            self.assertEqual({player: hands[idx][0][0, 0] for player, idx in assignment.items()},
+                             {1: np.float32(0.3), 2: np.float32(0.7)})
+
+    def test_players_keep_their_hands_when_crossing(self):
+        # Recorded crossing: player 1's hand moves right along y=0.3 while
+        # player 2's moves left along y=0.7, 0.04 per frame, and the camera
+        # reports the hands in a different order every frame.
+        assigner = HandAssigner([1, 2])
+        for step in range(11):
+            left = (hand('fist', 0.3 + 0.04 * step, 0.3), 'Right')
+            right = (hand('peace', 0.7 - 0.04 * step, 0.7), 'Left')
+            hands = [left, right] if step % 2 else [right, left]
+            assignment = assigner.assign(hands, step / FPS)
+            self.assertIs(hands[assignment[1]], left, step)
+            self.assertIs(hands[assignment[2]], right, step)
+
+    def test_handedness_penalty_prefers_the_matching_hand(self):
+        assigner = HandAssigner([1, 2])
+        assigner.assign([(hand('fist', 0.3), 'Right'), (hand('fist', 0.8), 'Left')], 0.0)
+        # The 'Left' hand is closer to player 1 but the penalty outweighs it.
+        assignment = assigner.assign([(hand('fist', 0.35), 'Left'), (hand('fist', 0.2), 'Right')], 0.1)
+        self.assertEqual(assignment, {1: 1})
+
+    def test_jump_past_max_jump_goes_to_a_free_player(self):
+        assigner = HandAssigner([1, 2])
+        assigner.assign([(hand('fist', 0.3), 'Right')], 0.0)
+        self.assertEqual(assigner.assign([(hand('fist', 0.8), 'Right')], 0.1), {2: 0})
+
+    def test_player_is_freed_after_forget_after(self):
+        assigner = HandAssigner([1, 2], forget_after=1.0)
+        assigner.assign([(hand('fist', 0.3), 'Right')], 0.0)
+        # Player 1 drifts past the middle of the frame and drops out.
+        for step in range(1, 9):
+            assigner.assign([(hand('fist', 0.3 + 0.04 * step), 'Right')], step / FPS)
+        self.assertEqual(assigner.assign([], 0.5), {})
+        self.assertEqual(assigner.assign([(hand('fist', 0.64), 'Right')], 0.9), {1: 0})
+        self.assertEqual(assigner.assign([], 1.5), {})
+        self.assertEqual(assigner.assign([(hand('fist', 0.64), 'Right')], 2.0), {2: 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import inference_pool
+from inference_pool import InferencePool, WorkerCrashed
+
+
+class CrashingWorker:
+    # Stands in for _ProcessWorker: configures fine, crashes on every frame.
+    spawned = 0
+
+    def __init__(self, index):
+        CrashingWorker.spawned += 1
+        self.configured = []
+
+    def call(self, command, player_id=None, payload=None):
+        if command == 'process':
+            raise WorkerCrashed('worker died')
+        if command == 'configure':
+            self.configured.append(player_id)
+
+    def alive(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class RestartBackoffTest(unittest.TestCase):
+    def setUp(self):
+        CrashingWorker.spawned = 0
+        self.now = 100.0
+        patches = [mock.patch.object(inference_pool, '_ProcessWorker', CrashingWorker),
+                   mock.patch.object(inference_pool.time, 'monotonic', lambda: self.now),
+                   mock.patch('builtins.print')]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.pool = InferencePool(workers=1, restart_delay=0.5, max_restart_delay=2.0, max_restarts=3)
+        self.frame = np.zeros((4, 4, 3), dtype=np.uint8)
+
+    def test_no_respawn_during_backoff(self):
+        self.pool.register(1)
+        self.assertEqual(self.pool.process(1, self.frame), [])
+        for _ in range(10):
+            self.assertEqual(self.pool.process(1, self.frame), [])
+        self.assertEqual(CrashingWorker.spawned, 1)
+        self.now += 0.5
+        self.pool.process(1, self.frame)
+        self.assertEqual(CrashingWorker.spawned, 2)
+
+    def test_delay_doubles_up_to_the_cap(self):
+        self.pool = InferencePool(workers=1, restart_delay=0.5, max_restart_delay=2.0, max_restarts=10)
+        self.pool.register(1)
+        delays = []
+        for _ in range(5):
+            self.pool.process(1, self.frame)
+            delays.append(self.pool.retry_at[0] - self.now)
+            self.now = self.pool.retry_at[0]
+        self.assertEqual(delays, [0.5, 1.0, 2.0, 2.0, 2.0])
+
+    def test_gives_up_after_max_restarts_until_registered_again(self):
+        self.pool.register(1)
+        for _ in range(4):
+            self.pool.process(1, self.frame)
+            self.now += 10
+        self.assertEqual(self.pool.stats()['failed_workers'], [0])
+        spawned = CrashingWorker.spawned
+        for _ in range(5):
+            self.now += 10
+            self.assertEqual(self.pool.process(1, self.frame), [])
+        self.assertEqual(CrashingWorker.spawned, spawned)
+        self.pool.register(1)
+        self.assertEqual(self.pool.stats()['failed_workers'], [])
+        self.assertEqual(CrashingWorker.spawned, spawned + 1)
+
+    def test_replacement_is_reconfigured(self):
+        self.pool.register(1, max_num_hands=2)
+        self.pool.process(1, self.frame)
+        self.now += 1
+        worker = self.pool._worker(0)
+        self.assertEqual(worker.configured, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
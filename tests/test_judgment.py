@@ -0,0 +1,117 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from judgment import JudgmentEngine, JudgmentSession
+
+LANES = ["fist", "peace", "index", "open_hand"]
+
+
+def chart(*notes):
+    return [{'t': t, 'lane': lane} for t, lane in notes]
+
+
+class JudgmentWindowTest(unittest.TestCase):
+    def test_windows(self):
+        for offset, result in ((0.0, 'perfect'), (0.07, 'perfect'), (-0.12, 'great'), (0.14, 'great'),
+                               (0.2, 'good'), (-0.24, 'good')):
+            engine = JudgmentEngine(chart((2.0, 0)), LANES)
+            self.assertEqual(engine.hit('fist', 2.0 + offset).result, result, offset)
+
+    def test_outside_every_window_is_not_a_hit(self):
+        engine = JudgmentEngine(chart((2.0, 0)), LANES)
+        self.assertIsNone(engine.hit('fist', 2.3))
+        self.assertIsNone(engine.hit('fist', 1.7))
+
+    def test_wrong_lane_and_unknown_gesture(self):
+        engine = JudgmentEngine(chart((2.0, 0)), LANES)
+        self.assertIsNone(engine.hit('peace', 2.0))
+        self.assertIsNone(engine.hit('thumbs_up', 2.0))
+
+    def test_hit_takes_the_closest_unjudged_note(self):
+        engine = JudgmentEngine(chart((1.0, 0), (1.2, 0)), LANES)
+        first = engine.hit('fist', 1.15)
+        second = engine.hit('fist', 1.15)
+        self.assertEqual((first.t, first.result), (1.2, 'perfect'))
+        self.assertEqual((second.t, second.result), (1.0, 'great'))
+        self.assertIsNone(engine.hit('fist', 1.15))
+
+    def test_scoring_combo_and_streak(self):
+        engine = JudgmentEngine(chart(*[(float(t), 0) for t in range(1, 5)]), LANES)
+        points = [engine.hit('fist', float(t)).points for t in range(1, 5)]
+        # 100 each, plus 25 and 50 for the third and fourth perfect in a row.
+        self.assertEqual(points, [100, 100, 125, 150])
+        self.assertEqual(engine.summary()['max_combo'], 4)
+
+
+class HoldAndExpireTest(unittest.TestCase):
+    def test_hold_counts_later_notes_as_good(self):
+        engine = JudgmentEngine(chart((1.0, 0), (2.0, 0), (3.0, 0)), LANES)
+        self.assertEqual(engine.hold('fist', 0.9, 1.5), [])
+        judged = engine.hold('fist', 0.9, 3.0)
+        self.assertEqual([(j.t, j.result) for j in judged], [(2.0, 'good'), (3.0, 'good')])
+
+    def test_hold_leaves_notes_near_its_start_to_hit(self):
+        engine = JudgmentEngine(chart((1.0, 0)), LANES)
+        self.assertEqual(engine.hold('fist', 0.9, 1.2), [])
+        self.assertEqual(engine.hit('fist', 0.95).result, 'perfect')
+
+    def test_long_hold_judges_each_note_once(self):
+        engine = JudgmentEngine(chart(*[(1.0 + 0.5 * i, 0) for i in range(20)]), LANES)
+        judged = []
+        song_time = 0.0
+        while song_time < 12.0:
+            judged.extend(engine.hold('fist', 0.0, song_time))
+            song_time += 1 / 30
+        self.assertEqual(len(judged), 20)
+        self.assertEqual(len({j.index for j in judged}), 20)
+        self.assertEqual(engine.hold_cursors[0], 20)
+
+    def test_expire_marks_misses_in_time_order(self):
+        engine = JudgmentEngine(chart((1.0, 1), (1.1, 0), (3.0, 0)), LANES)
+        engine.hit('fist', 1.1)
+        missed = engine.expire(2.0)
+        self.assertEqual([(j.t, j.result) for j in missed], [(1.0, 'miss')])
+        self.assertEqual(engine.combo, 0)
+        self.assertEqual(engine.expire(2.0), [])
+        self.assertEqual([j.t for j in engine.expire(3.26)], [3.0])
+        self.assertTrue(engine.finished())
+
+    def test_expire_waits_for_the_widest_window(self):
+        engine = JudgmentEngine(chart((1.0, 0)), LANES)
+        self.assertEqual(engine.expire(1.25), [])
+        self.assertEqual(len(engine.expire(1.26)), 1)
+
+
+class JudgmentSessionTest(unittest.TestCase):
+    def test_synthetic_stream(self):
+        # Clock anchored at song time 0 = wall 1000. The player hits the
+        # first note 50 ms late and holds through the second; the third is
+        # missed, and with every note judged the session ends itself.
+        session = JudgmentSession(1, 'song', 'easy', JudgmentEngine(chart((1.0, 0), (2.0, 0), (3.0, 1)), LANES))
+        session.sync(0.0, 1000.0)
+        results = []
+        results += session.update('fist', 1001.05, 1001.1, True)
+        for now in (1001.5, 1002.0, 1002.5):
+            results += session.update('fist', 1001.05, now, False)
+        results += session.update('none', 1002.6, 1003.6, True)
+        self.assertEqual([(j.t, j.result) for j in results],
+                         [(1.0, 'perfect'), (2.0, 'good'), (3.0, 'miss')])
+        self.assertTrue(session.ended)
+        self.assertEqual(session.update('fist', 1004.0, 1004.0, True), [])
+
+    def test_paused_session_judges_nothing(self):
+        session = JudgmentSession(1, 'song', 'easy', JudgmentEngine(chart((1.0, 0)), LANES))
+        session.sync(1.0, 1000.0, paused=True)
+        self.assertEqual(session.update('fist', 1000.0, 1000.0, True), [])
+
+    def test_input_offset_is_subtracted(self):
+        session = JudgmentSession(1, 'song', 'easy', JudgmentEngine(chart((1.0, 0)), LANES), input_offset=0.2)
+        session.sync(0.0, 1000.0)
+        self.assertEqual(session.update('fist', 1001.2, 1001.2, True)[0].result, 'perfect')
+
+
+if __name__ == '__main__':
+    unittest.main()
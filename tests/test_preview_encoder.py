@@ -0,0 +1,67 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from preview_encoder import PreviewEncoder
+
+
+class ScriptedFrames:
+    # Stands in for the encoder thread: each time the viewer polls without a
+    # frame, the next scripted encode is published. When the script runs out
+    # the viewer's level is recorded and the encoder is closed.
+    def __init__(self, script):
+        self.script = list(script)
+        self.encoder = None
+        self.final_levels = None
+
+    def publish(self, count, levels):
+        with self.encoder.cond:
+            self.encoder.encoded = {(level, False): b'jpeg' for level in levels}
+            self.encoder.encoded_count = count
+
+    def poll_sleep(self, seconds):
+        if self.script:
+            self.publish(*self.script.pop(0))
+        else:
+            self.final_levels = sorted(self.encoder.clients.values())
+            self.encoder.close()
+
+
+def make_encoder(script):
+    frames = ScriptedFrames(script)
+    encoder = PreviewEncoder(bus=None, max_fps=15, poll_sleep=frames.poll_sleep)
+    encoder._ensure_thread = lambda: None
+    frames.encoder = encoder
+    return encoder, frames
+
+
+class PreviewLevelTest(unittest.TestCase):
+    def test_one_switch_moves_exactly_one_level(self):
+        # Frame 2 is skipped, so the viewer steps down from level 0. Frame 4
+        # is still encoded for the old subscriptions only, and frame 5 is the
+        # first one at level 1; that gap must not count as a second miss.
+        encoder, frames = make_encoder([
+            (1, [0]),
+            (3, [0]),
+            (4, [0]),
+            (5, [1]),
+            (6, [1]),
+        ])
+        list(encoder.stream(level=0))
+        self.assertEqual(frames.final_levels, [1])
+
+    def test_keeping_up_stays_on_level(self):
+        encoder, frames = make_encoder([(count, [0]) for count in range(1, 8)])
+        list(encoder.stream(level=0))
+        self.assertEqual(frames.final_levels, [0])
+
+    def test_level_is_clamped_to_the_ladder(self):
+        encoder, frames = make_encoder([(1, [3]), (3, [3])])
+        list(encoder.stream(level=10))
+        self.assertEqual(frames.final_levels, [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
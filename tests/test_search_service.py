@@ -0,0 +1,148 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_service import RateLimited, SearchService, TokenBucket
+
+
+class FakeClock:
+    # Time only moves when a test (or the bucket's sleep) advances it.
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeExtractor:
+    def __init__(self, release=None):
+        self.calls = []
+        self.release = release
+
+    def extract_info(self, url, download=False):
+        prefix, query = url.split(':', 1)
+        self.calls.append(query)
+        if self.release is not None:
+            self.release.wait(5)
+        count = int(prefix[len('ytsearch'):])
+        return {'entries': [{'id': f'{query}-{i}', 'title': query} for i in range(count)]}
+
+
+def make_service(clock, extractor, **kwargs):
+    kwargs.setdefault('rate', 1000.0)
+    kwargs.setdefault('burst', 1000)
+    return SearchService(extractor_factory=lambda: extractor, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, capacity=3, clock=clock, sleep=clock.sleep)
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+        clock.now += 0.5
+        self.assertEqual(bucket.acquire(), 0.0)
+
+    def test_refill_is_capped_at_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=2, clock=clock, sleep=clock.sleep)
+        clock.now += 60
+        self.assertEqual([bucket.acquire() for _ in range(2)], [0.0, 0.0])
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+
+    def test_waits_within_max_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=4.0, capacity=1, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        self.assertEqual(bucket.acquire(max_wait=1.0), 0.0)
+        self.assertEqual(clock.slept, [0.25])
+
+    def test_gives_up_past_max_wait(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=0.5, capacity=1, clock=clock, sleep=clock.sleep)
+        bucket.acquire()
+        self.assertAlmostEqual(bucket.acquire(max_wait=1.0), 2.0)
+        self.assertEqual(clock.slept, [])
+
+
+class SearchServiceTest(unittest.TestCase):
+    def test_cache_hit_within_ttl(self):
+        clock = FakeClock()
+        extractor = FakeExtractor()
+        service = make_service(clock, extractor, ttl=60)
+        first = service.search('Canon in D')
+        clock.now += 59
+        self.assertEqual(service.search('  canon  IN d '), first)
+        self.assertEqual(extractor.calls, ['canon in d'])
+        self.assertEqual(service.stats()['hits'], 1)
+
+    def test_entry_expires_after_ttl(self):
+        clock = FakeClock()
+        extractor = FakeExtractor()
+        service = make_service(clock, extractor, ttl=60)
+        service.search('canon')
+        clock.now += 61
+        service.search('canon')
+        self.assertEqual(extractor.calls, ['canon', 'canon'])
+        self.assertEqual(service.stats()['misses'], 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        clock = FakeClock()
+        extractor = FakeExtractor()
+        service = make_service(clock, extractor, max_entries=2)
+        service.search('a')
+        service.search('b')
+        service.search('a')
+        service.search('c')
+        self.assertEqual(service.stats()['cached'], 2)
+        service.search('a')
+        service.search('b')
+        self.assertEqual(extractor.calls, ['a', 'b', 'c', 'b'])
+
+    def test_concurrent_identical_queries_share_one_call(self):
+        clock = FakeClock()
+        release = threading.Event()
+        extractor = FakeExtractor(release)
+        service = make_service(clock, extractor)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(service.search('the box')))
+                   for _ in range(4)]
+        for t in threads:
+            t.start()
+        # Release the extractor only once every other caller is waiting on it.
+        for _ in range(500):
+            if service.stats()['coalesced'] == 3:
+                break
+            threading.Event().wait(0.01)
+        release.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(extractor.calls, ['the box'])
+        self.assertEqual(service.stats()['coalesced'], 3)
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r == results[0] for r in results))
+
+    def test_rate_limited_search_raises(self):
+        clock = FakeClock()
+        extractor = FakeExtractor()
+        service = make_service(clock, extractor, rate=0.1, burst=1, max_wait=1.0)
+        service.search('a')
+        with self.assertRaises(RateLimited) as raised:
+            service.search('b')
+        self.assertAlmostEqual(raised.exception.retry_after, 10.0)
+        self.assertEqual(service.stats()['rate_limited'], 1)
+        clock.now += 10
+        service.search('b')
+        self.assertEqual(extractor.calls, ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()